@@ -0,0 +1,26 @@
+"""
+Admin token check for the endpoints that change server state.
+
+The API allows any origin, so endpoints that rewrite models or the collusion
+graph only answer requests carrying the shared admin token in the
+X-Admin-Token header. The header is never sent by browsers on their own,
+unlike cookies. Without a configured token these endpoints are disabled.
+
+Configuration (environment variables):
+    ADMIN_TOKEN  Shared secret for admin endpoints (default: unset, disabled)
+"""
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """FastAPI dependency: 403 while no ADMIN_TOKEN is set, 401 on a missing or wrong token."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token")
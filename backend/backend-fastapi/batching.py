@@ -0,0 +1,81 @@
+"""
+Micro-batching for single-item endpoints.
+
+Concurrent single-item requests are gathered for a short window and scored
+as one matrix on the inference pool, then each waiting request gets its own
+result back.
+
+Configuration (environment variables):
+    MICROBATCH_MAX_WAIT_MS  Max time the first item waits for others (default: 2)
+    MICROBATCH_MAX_SIZE     Batch size that triggers an immediate flush (default: 64)
+"""
+import asyncio
+import os
+
+from executor import run_inference
+from metrics import observe_batch
+
+MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", 2))
+MAX_BATCH_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", 64))
+
+
+class MicroBatcher:
+    """
+    Gathers concurrent submissions and scores them together.
+
+    Args:
+        score_batch: Picklable function taking a list of items and returning
+            a list of results in the same order
+        max_batch_size: Batch size that triggers an immediate flush
+        max_wait_ms: Max time the first item in a batch waits for others
+    """
+
+    def __init__(self, score_batch, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._items = []
+        self._futures = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, item):
+        """Add an item to the current batch and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._items.append(item)
+        self._futures.append(future)
+
+        if len(self._items) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Hand the current batch to the inference pool."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        items, futures = self._items, self._futures
+        self._items, self._futures = [], []
+        if items:
+            task = asyncio.create_task(self._run(items, futures))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items, futures):
+        """Score one batch and fan the results (or the error) back out."""
+        observe_batch(len(items))
+        try:
+            results = await run_inference(self.score_batch, items)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,283 @@
+"""
+Benchmark the four detection endpoints in-process.
+
+Drives the FastAPI app through its ASGI interface (fastapi.testclient, which
+needs httpx) on synthetic models from benchmarks/synthetic.py, generating
+them first if needed. For each scenario and batch size it reports
+throughput, p50/p99 latency and memory (RSS growth and peak RSS during the
+scenario) as JSON, and compares the results against a stored baseline.
+
+Run from the backend-fastapi folder:
+    python -m benchmarks.run                          # all scenarios, default sizes
+    python -m benchmarks.run --sizes 1,100,10000 --scenarios spending,welfare
+    python -m benchmarks.run --save-baseline          # store the results as the baseline
+
+Model settings (FOREST_ENGINE, INFERENCE_EXECUTOR, MODEL_ARTIFACTS_DIR...)
+are taken from the environment as usual and recorded in the output.
+Request bodies are encoded once up front, so client-side JSON encoding is
+not part of the measured latency. /legal/batch-analyze is measured with a
+cold result cache.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks import synthetic
+
+BENCHMARKS_FOLDER = Path(__file__).parent
+DEFAULT_DATA = BENCHMARKS_FOLDER / "data"
+DEFAULT_BASELINE = BENCHMARKS_FOLDER / "baseline.json"
+DEFAULT_SIZES = (1, 10, 100, 1000, 10000, 100000)
+
+# Scenario -> (method path, largest batch the endpoint accepts)
+SCENARIOS = {
+    "spending": ("/spending/analyze", None),
+    "spending_single": ("/spending/check-single", 1),
+    "welfare": ("/welfare/analyze", None),
+    "welfare_single": ("/welfare/check-single", 1),
+    "legal": ("/legal/batch-analyze", None),
+    "bidrigging": ("/bidrigging/analyze-batch", 1000),
+    "bidrigging_single": ("/bidrigging/analyze", 1)
+}
+
+# Environment variables recorded with the results
+SETTINGS = (
+    "FOREST_ENGINE", "INFERENCE_EXECUTOR", "INFERENCE_WORKERS", "INFERENCE_MAX_QUEUE",
+    "MODEL_ARTIFACTS_DIR", "MICROBATCH_MAX_WAIT_MS", "MICROBATCH_MAX_SIZE"
+)
+
+
+def _proc_status_mb(field: str):
+    """A memory field of /proc/self/status (e.g. VmRSS) in MB, or None off Linux."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process (the peak so far where /proc is missing)."""
+    rss = _proc_status_mb("VmRSS")
+    if rss is not None:
+        return rss
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def reset_peak_rss() -> bool:
+    """Reset this process's peak RSS (VmHWM), so it covers only what runs next (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def build_payload(scenario: str, rng, size: int, vocabulary: list, vendor_codes: list):
+    """Request body of one scenario at one batch size."""
+    if scenario == "spending":
+        return synthetic.spending_payload(rng, size)
+    if scenario == "spending_single":
+        return synthetic.spending_payload(rng, 1)["transactions"][0]
+    if scenario == "welfare":
+        return synthetic.welfare_payload(rng, size)
+    if scenario == "welfare_single":
+        return synthetic.welfare_payload(rng, 1)["claims"][0]
+    if scenario == "legal":
+        return synthetic.legal_payload(rng, vocabulary, size)
+    if scenario == "bidrigging":
+        return synthetic.bidrigging_payload(rng, vendor_codes, size)
+    return {"vendor_id": synthetic.bidrigging_payload(rng, vendor_codes, 1)["vendor_ids"][0]}
+
+
+def measure(client, path: str, body: bytes, min_requests: int, max_requests: int, min_seconds: float,
+            before=None) -> list:
+    """
+    Send the same request until enough samples are collected.
+
+    Returns:
+        Per-request latencies in seconds
+    """
+    headers = {"content-type": "application/json"}
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < max_requests and (
+        len(latencies) < min_requests or time.perf_counter() - started < min_seconds
+    ):
+        if before is not None:
+            before()
+        request_started = time.perf_counter()
+        response = client.post(path, content=body, headers=headers)
+        latencies.append(time.perf_counter() - request_started)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+    return latencies
+
+
+def run_benchmarks(data: Path, scenarios: list, sizes: list, min_requests: int, max_requests: int,
+                   min_seconds: float) -> dict:
+    """
+    Start the app on the synthetic models and benchmark each scenario.
+
+    Returns:
+        Dict with run metadata and one result per (scenario, batch size)
+    """
+    # Load every model before serving, and keep Louvain off the benchmark's CPU
+    os.environ.setdefault("MODEL_LOADING", "blocking")
+    os.environ.setdefault("GRAPH_FEATURES_JOB", "off")
+
+    import models.loader as loader
+    loader.LLM_FOLDER = data
+    loader.ARTIFACTS_FOLDER = Path(os.getenv("MODEL_ARTIFACTS_DIR", data / "artifacts"))
+
+    from fastapi.testclient import TestClient
+
+    import main
+    from routers import legal
+
+    rng = np.random.default_rng(synthetic.SEED)
+    vocabulary = json.loads((data / "vocabulary.json").read_text())
+
+    results = []
+    with TestClient(main.app) as client:
+        vendor_codes = list(loader.get_model("bid_rigging_graph").nodes())
+        startup_rss = rss_mb()
+
+        for scenario in scenarios:
+            path, max_size = SCENARIOS[scenario]
+            before = legal._result_cache.clear if scenario == "legal" else None
+            for size in sorted({min(size, max_size or size) for size in sizes}):
+                body = json.dumps(build_payload(scenario, rng, size, vocabulary, vendor_codes)).encode()
+
+                # Memory is measured per scenario: RSS before and after, and the peak in between
+                has_peak = reset_peak_rss()
+                rss_before = rss_mb()
+
+                # Warm up (first-call allocations, micro-batcher, caches)
+                measure(client, path, body, 1, 1, 0, before)
+                latencies = np.array(measure(client, path, body, min_requests, max_requests, min_seconds, before))
+                rss_after = rss_mb()
+
+                result = {
+                    "scenario": scenario,
+                    "endpoint": path,
+                    "batch_size": size,
+                    "requests": len(latencies),
+                    "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+                    "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3),
+                    "mean_ms": round(float(latencies.mean()) * 1000, 3),
+                    "items_per_sec": round(size * len(latencies) / float(latencies.sum()), 1),
+                    "rss_mb": rss_after,
+                    "rss_delta_mb": round(rss_after - rss_before, 1),
+                    "peak_rss_mb": _proc_status_mb("VmHWM") if has_peak else None
+                }
+                results.append(result)
+                print(
+                    f"⏱️ {scenario:<18} n={size:<7} p50 {result['p50_ms']:>10.2f} ms  "
+                    f"p99 {result['p99_ms']:>10.2f} ms  {result['items_per_sec']:>12,.0f} items/s  "
+                    f"rss {result['rss_mb']:,.0f} MB ({result['rss_delta_mb']:+,.1f})"
+                )
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "synthetic": json.loads((data / "synthetic.json").read_text()),
+            "settings": {name: os.environ[name] for name in SETTINGS if name in os.environ},
+            "startup_rss_mb": startup_rss
+        },
+        "results": results
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Compare results with a baseline run.
+
+    A result regresses when its p50 latency is more than `tolerance` slower,
+    or its throughput more than `tolerance` lower, than the baseline's.
+
+    Returns:
+        Regressed results, with their baseline values
+    """
+    previous = {(r["scenario"], r["batch_size"]): r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        base = previous.get((result["scenario"], result["batch_size"]))
+        if base is None:
+            continue
+        p50_ratio = result["p50_ms"] / base["p50_ms"] if base["p50_ms"] else 1.0
+        throughput_ratio = result["items_per_sec"] / base["items_per_sec"] if base["items_per_sec"] else 1.0
+        result["baseline_p50_ms"] = base["p50_ms"]
+        result["baseline_items_per_sec"] = base["items_per_sec"]
+        result["p50_ratio"] = round(p50_ratio, 3)
+
+        regressed = p50_ratio > 1 + tolerance or throughput_ratio < 1 / (1 + tolerance)
+        marker = "❌" if regressed else ("🚀" if p50_ratio < 1 / (1 + tolerance) else "✅")
+        print(
+            f"{marker} {result['scenario']:<18} n={result['batch_size']:<7} "
+            f"p50 {base['p50_ms']:.2f} -> {result['p50_ms']:.2f} ms (x{p50_ratio:.2f})  "
+            f"throughput x{throughput_ratio:.2f}"
+        )
+        if regressed:
+            regressions.append(result)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the detection endpoints in-process")
+    parser.add_argument("--data", type=Path, default=DEFAULT_DATA, help="Synthetic models folder (generated if missing)")
+    parser.add_argument("--vendors", type=int, default=synthetic.DEFAULT_VENDORS)
+    parser.add_argument("--edges", type=int, default=synthetic.DEFAULT_EDGES)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated batch sizes")
+    parser.add_argument("--min-requests", type=int, default=5)
+    parser.add_argument("--max-requests", type=int, default=200)
+    parser.add_argument("--min-seconds", type=float, default=2.0, help="Min measuring time per scenario and size")
+    parser.add_argument("--out", type=Path, default=BENCHMARKS_FOLDER / "results.json")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    if not synthetic.has_models(args.data, args.vendors, args.edges):
+        print(f"📦 Generating synthetic models in {args.data}...")
+        synthetic.generate_models(args.data, args.vendors, args.edges)
+
+    report = run_benchmarks(args.data, scenarios, sizes, args.min_requests, args.max_requests, args.min_seconds)
+
+    exit_code = 0
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"✅ Saved baseline to {args.baseline}")
+    elif args.baseline.exists():
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        report["regressions"] = len(regressions)
+        if regressions:
+            print(f"❌ {len(regressions)} result(s) regressed by more than {args.tolerance:.0%}")
+            exit_code = 1
+
+    args.out.write_text(json.dumps(report, indent=2))
+    print(f"✅ Wrote {args.out}")
+    sys.exit(exit_code)
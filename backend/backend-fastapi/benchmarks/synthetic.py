@@ -0,0 +1,240 @@
+"""
+Synthetic models and request datasets shaped like the production ones.
+
+Models (written with the llm folder's file names, so the loader can use the
+folder as its LLM_FOLDER):
+    spending_anomaly_model.pkl   IsolationForest on Amount + V1..V28 (29 features)
+    fraud_detection_model.pkl    RandomForestClassifier on the 5 welfare claim features
+    text_vectorizer.pkl          TfidfVectorizer with a 5000-term vocabulary
+    legal_nlp_model.pkl          LogisticRegression on the TF-IDF features
+    bid_rigging_graph.pkl        Co-bid graph with heavy-tailed vendor activity
+    vendor_names.pkl             Vendor code -> name
+
+Everything is generated from a fixed seed, so a given set of arguments always
+produces the same models and payloads. Generate from the backend-fastapi
+folder with:
+    python -m benchmarks.synthetic --out benchmarks/data
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import joblib
+import networkx as nx
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest, RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+SEED = 42
+
+# Same columns as the training notebook (and routers/spending.py)
+SPENDING_COLUMNS = ["Amount"] + [f"V{i}" for i in range(1, 29)]
+
+# Default co-bid graph size, in the range of the Prozorro collusion graph
+DEFAULT_VENDORS = 200_000
+DEFAULT_EDGES = 1_000_000
+
+VOCABULARY_SIZE = 5000
+SUSPICIOUS_SHARE = 0.1
+
+_SYLLABLES = ["ка", "ро", "ті", "бу", "дом", "енер", "гео", "тех", "агро", "пром", "сервіс", "буд", "інвест", "лан"]
+
+
+def make_vocabulary(rng, size: int = VOCABULARY_SIZE) -> list:
+    """Distinct lowercase pseudo-words."""
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    words = set()
+    while len(words) < size:
+        length = int(rng.integers(4, 11))
+        words.add("".join(rng.choice(letters, length)))
+    return sorted(words)
+
+
+def make_documents(rng, vocabulary: list, n_docs: int, words_per_doc: int = 40) -> tuple:
+    """
+    Documents drawn from the vocabulary, labelled by their share of "suspicious" words.
+
+    Returns:
+        Tuple of (documents, labels)
+    """
+    n_suspicious = int(len(vocabulary) * SUSPICIOUS_SHARE)
+    # Zipf-like word frequencies, as in natural text
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+
+    words = rng.choice(len(vocabulary), size=(n_docs, words_per_doc), p=weights)
+    suspicious_share = (words < n_suspicious).mean(axis=1)
+    labels = (suspicious_share > np.median(suspicious_share)).astype(int)
+    vocabulary = np.array(vocabulary)
+    documents = [" ".join(vocabulary[row]) for row in words]
+    return documents, labels
+
+
+def make_transactions(rng, n: int) -> pd.DataFrame:
+    """creditcard.csv-shaped transactions (PCA components V1..V28 and a log-normal Amount)."""
+    data = rng.normal(size=(n, len(SPENDING_COLUMNS)))
+    data[:, 0] = np.round(rng.lognormal(mean=3.0, sigma=1.5, size=n), 2)
+    return pd.DataFrame(data, columns=SPENDING_COLUMNS)
+
+
+def make_claims(rng, n: int) -> pd.DataFrame:
+    """Welfare claims with the notebook's feature columns."""
+    duration = rng.integers(0, 30, size=n)
+    total_cost = np.round(rng.lognormal(mean=8.0, sigma=1.0, size=n), 2)
+    return pd.DataFrame({
+        "Duration_Days": duration,
+        "Total_Cost": total_cost,
+        "InscClaimAmtReimbursed": np.round(total_cost * rng.uniform(0.5, 1.0, size=n), 2),
+        "OPAnnualReimbursementAmt": np.round(rng.lognormal(mean=7.0, sigma=1.0, size=n), 2),
+        "IPAnnualReimbursementAmt": np.round(rng.lognormal(mean=8.0, sigma=1.5, size=n), 2)
+    })
+
+
+def make_vendor_codes(rng, n_vendors: int) -> np.ndarray:
+    """Distinct 8-digit EDRPOU-like vendor codes."""
+    codes = rng.choice(90_000_000, size=n_vendors, replace=False) + 10_000_000
+    return np.array([str(code) for code in codes])
+
+
+def make_vendor_name(rng) -> str:
+    parts = rng.choice(_SYLLABLES, size=int(rng.integers(2, 4)))
+    return f'ТОВ "{"".join(parts).upper()}"'
+
+
+def make_cobid_graph(rng, n_vendors: int, n_edges: int) -> tuple:
+    """
+    Co-bid graph with heavy-tailed vendor activity.
+
+    Edge endpoints are drawn with Zipf-like weights, so a few vendors bid with
+    thousands of others (the hubs that make lookups expensive) while most
+    have a handful of connections. Weights (co-bid counts) start at the
+    notebook's threshold of 3 and are geometric above it.
+
+    Returns:
+        Tuple of (networkx graph, vendor code -> name dict)
+    """
+    codes = make_vendor_codes(rng, n_vendors)
+    activity = 1.0 / np.arange(1, n_vendors + 1) ** 0.8
+    activity /= activity.sum()
+
+    # Oversample, then drop self-loops and duplicate pairs
+    n_draws = int(n_edges * 1.3)
+    a = rng.choice(n_vendors, size=n_draws, p=activity)
+    b = rng.choice(n_vendors, size=n_draws, p=activity)
+    low, high = np.minimum(a, b), np.maximum(a, b)
+    keep = low != high
+    keys = np.unique(low[keep].astype(np.int64) * n_vendors + high[keep])[:n_edges]
+    rng.shuffle(keys)
+    weights = 3 + rng.geometric(0.3, size=len(keys)) - 1
+
+    graph = nx.Graph()
+    graph.add_weighted_edges_from(zip(codes[keys // n_vendors].tolist(), codes[keys % n_vendors].tolist(), weights.tolist()))
+
+    # Names for most network vendors plus some that never co-bid
+    named = rng.random(n_vendors) < 0.9
+    vendor_names = {code: make_vendor_name(rng) for code in codes[named].tolist()}
+    return graph, vendor_names
+
+
+def generate_models(out: Path, n_vendors: int = DEFAULT_VENDORS, n_edges: int = DEFAULT_EDGES, seed: int = SEED):
+    """
+    Train and save all synthetic models into a folder.
+
+    Args:
+        out: Output folder (used as the loader's llm folder)
+        n_vendors: Vendors in the co-bid graph
+        n_edges: Edges in the co-bid graph
+        seed: Random seed
+    """
+    out.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+
+    transactions = make_transactions(rng, 50_000)
+    spending = IsolationForest(n_estimators=100, random_state=seed).fit(transactions)
+    joblib.dump(spending, out / "spending_anomaly_model.pkl")
+    print(f"✅ spending_anomaly_model.pkl ({time.perf_counter() - started:.1f}s)")
+
+    claims = make_claims(rng, 50_000)
+    labels = ((claims["Total_Cost"] > claims["Total_Cost"].quantile(0.9)) | (claims["Duration_Days"] > 25)).astype(int)
+    welfare = RandomForestClassifier(n_estimators=100, max_depth=12, random_state=seed, n_jobs=-1).fit(claims, labels)
+    joblib.dump(welfare, out / "fraud_detection_model.pkl")
+    print(f"✅ fraud_detection_model.pkl ({time.perf_counter() - started:.1f}s)")
+
+    vocabulary = make_vocabulary(rng)
+    documents, labels = make_documents(rng, vocabulary, 20_000)
+    vectorizer = TfidfVectorizer(max_features=VOCABULARY_SIZE)
+    legal = LogisticRegression(max_iter=1000).fit(vectorizer.fit_transform(documents), labels)
+    joblib.dump(vectorizer, out / "text_vectorizer.pkl")
+    joblib.dump(legal, out / "legal_nlp_model.pkl")
+    (out / "vocabulary.json").write_text(json.dumps(vocabulary))
+    print(f"✅ text_vectorizer.pkl & legal_nlp_model.pkl ({time.perf_counter() - started:.1f}s)")
+
+    graph, vendor_names = make_cobid_graph(rng, n_vendors, n_edges)
+    joblib.dump(graph, out / "bid_rigging_graph.pkl")
+    joblib.dump(vendor_names, out / "vendor_names.pkl")
+    print(
+        f"✅ bid_rigging_graph.pkl & vendor_names.pkl: {graph.number_of_nodes():,} vendors, "
+        f"{graph.number_of_edges():,} edges ({time.perf_counter() - started:.1f}s)"
+    )
+
+    meta = {"seed": seed, "vendors": n_vendors, "edges": n_edges}
+    (out / "synthetic.json").write_text(json.dumps(meta))
+
+
+def has_models(folder: Path, n_vendors: int, n_edges: int, seed: int = SEED) -> bool:
+    """Check whether a folder holds models generated with these arguments."""
+    try:
+        meta = json.loads((folder / "synthetic.json").read_text())
+    except (FileNotFoundError, ValueError):
+        return False
+    return meta == {"seed": seed, "vendors": n_vendors, "edges": n_edges}
+
+
+# ============== Request payloads ==============
+
+def spending_payload(rng, n: int) -> dict:
+    """Body of POST /spending/analyze with n transactions."""
+    df = make_transactions(rng, n)
+    df.columns = [column.lower() for column in df.columns]
+    return {"transactions": df.to_dict(orient="records")}
+
+
+def welfare_payload(rng, n: int) -> dict:
+    """Body of POST /welfare/analyze with n claims."""
+    df = make_claims(rng, n)
+    df.columns = [
+        "duration_days", "total_cost", "insc_claim_amt_reimbursed",
+        "op_annual_reimbursement_amt", "ip_annual_reimbursement_amt"
+    ]
+    records = df.to_dict(orient="records")
+    for i, record in enumerate(records):
+        record["claim_id"] = f"CLM{i:07d}"
+        record["duration_days"] = int(record["duration_days"])
+    return {"claims": records}
+
+
+def legal_payload(rng, vocabulary: list, n: int) -> list:
+    """Body of POST /legal/batch-analyze with n distinct documents."""
+    documents, _ = make_documents(rng, vocabulary, n)
+    return [{"text": text} for text in documents]
+
+
+def bidrigging_payload(rng, vendor_codes: list, n: int) -> dict:
+    """Body of POST /bidrigging/analyze-batch with n participants."""
+    picks = rng.choice(len(vendor_codes), size=min(n, len(vendor_codes)), replace=False)
+    return {"vendor_ids": [vendor_codes[i] for i in picks.tolist()], "lot_id": "BENCH-LOT"}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark models")
+    parser.add_argument("--out", type=Path, default=Path(__file__).parent / "data")
+    parser.add_argument("--vendors", type=int, default=DEFAULT_VENDORS)
+    parser.add_argument("--edges", type=int, default=DEFAULT_EDGES)
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    generate_models(args.out, args.vendors, args.edges, args.seed)
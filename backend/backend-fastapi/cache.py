@@ -0,0 +1,134 @@
+"""
+In-process LRU/TTL result cache with a bounded memory budget.
+"""
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Approximate per-entry bookkeeping cost (OrderedDict node + tuple)
+ENTRY_OVERHEAD_BYTES = 120
+
+
+def content_key(text: str) -> bytes:
+    """Hash text into a compact cache key."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and a memory budget.
+
+    Entries are tied to the model objects they were computed with; calling
+    bind() with different objects (e.g. after a reload) clears the cache and
+    starts a new generation. Callers pass the generation returned by bind()
+    to get() and put(), so a result computed with the previous models is
+    never stored or returned once the cache moved on.
+
+    Args:
+        max_bytes: Approximate memory budget for keys and values
+        ttl_seconds: Entry lifetime (0 disables expiry)
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._bound = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def bind(self, *models) -> int:
+        """
+        Clear the cache if it was filled with different model objects.
+
+        Returns:
+            Generation of the bound models, to pass to get() and put()
+        """
+        with self._lock:
+            if self._bound is not None and (
+                len(self._bound) != len(models)
+                or any(old is not new for old, new in zip(self._bound, models))
+            ):
+                self._entries.clear()
+                self._bytes = 0
+                self._generation += 1
+                self.invalidations += 1
+            self._bound = models
+            return self._generation
+
+    def get(self, key, generation: int = None):
+        """Get a cached value, or None on a miss, an expired entry or another generation."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (generation is not None and entry[3] != generation):
+                self.misses += 1
+                return None
+
+            value, expires_at, size, _ = entry
+            if self.ttl_seconds and expires_at < time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation: int = None):
+        """
+        Store a value, evicting least recently used entries over budget.
+
+        The value is dropped if the cache was rebound to other models since
+        `generation` was returned by bind().
+        """
+        size = sys.getsizeof(key) + sys.getsizeof(value) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if generation is None:
+                generation = self._generation
+            elif generation != self._generation:
+                return
+
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size, generation)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Get hit/miss/eviction counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,173 @@
+"""
+Executor layer for running CPU-bound model inference off the event loop.
+
+All routers submit sklearn, pandas and networkx work through run_inference()
+or run_blocking() so a heavy batch never blocks /health or other requests.
+
+Configuration (environment variables):
+    INFERENCE_EXECUTOR   "thread" (default) or "process"
+    INFERENCE_WORKERS    Number of pool workers (default: CPU count)
+    INFERENCE_MAX_QUEUE  Max tasks queued or running before returning 429 (default: 4 x workers)
+"""
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from fastapi import HTTPException
+
+from metrics import INFERENCE_QUEUE_DEPTH, INFERENCE_REJECTED, stage
+from models.loader import MODEL_GROUPS, get_model_status, load_all_models
+
+EXECUTOR_KIND = os.getenv("INFERENCE_EXECUTOR", "thread").lower()
+MAX_WORKERS = int(os.getenv("INFERENCE_WORKERS", os.cpu_count() or 1))
+MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", MAX_WORKERS * 4))
+
+# Global executor state (_pending counts tasks queued or running on the pools)
+_executors = {}
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _init_process_worker():
+    """
+    Load the models a process pool worker did not inherit.
+
+    Workers are forked where possible, so they start with exactly the models
+    the parent had published when they were created and load nothing from
+    disk. Workers of other start methods load every group.
+    """
+    status = get_model_status()
+    missing = [group for group in MODEL_GROUPS if status.get(group, {}).get("state") != "ready"]
+    if missing:
+        load_all_models(missing)
+
+
+def get_executor(kind: str) -> Executor:
+    """
+    Get (creating on first use) the executor of the given kind.
+
+    Args:
+        kind: "thread" or "process"
+
+    Returns:
+        The shared executor
+    """
+    executor = _executors.get(kind)
+    if executor is None:
+        if kind == "process":
+            method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+            executor = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS,
+                mp_context=multiprocessing.get_context(method),
+                initializer=_init_process_worker
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="inference")
+        _executors[kind] = executor
+    return executor
+
+
+def start_executors():
+    """Create the configured executor at application startup."""
+    if EXECUTOR_KIND not in ("thread", "process"):
+        raise ValueError(f"Unknown INFERENCE_EXECUTOR: {EXECUTOR_KIND}")
+    get_executor(EXECUTOR_KIND)
+    print(f"⚙️ Inference executor: {EXECUTOR_KIND} pool ({MAX_WORKERS} workers, queue {MAX_QUEUE})")
+
+
+def shutdown_executors():
+    """Shut down all executors, waiting for running tasks."""
+    for executor in _executors.values():
+        executor.shutdown(wait=True, cancel_futures=True)
+    _executors.clear()
+
+
+def recycle_executor(kind: str):
+    """
+    Replace an executor with a fresh one, e.g. to reload models in process workers.
+
+    Call it after the new models are published: the new process workers are
+    forked from the current registry. The old executor finishes its running
+    and queued tasks in the background.
+    """
+    executor = _executors.pop(kind, None)
+    if executor is not None:
+        executor.shutdown(wait=False)
+        get_executor(kind)
+
+
+def get_executor_stats() -> dict:
+    """Get executor configuration and current queue depth."""
+    return {
+        "kind": EXECUTOR_KIND,
+        "workers": MAX_WORKERS,
+        "max_queue": MAX_QUEUE,
+        "pending": _pending
+    }
+
+
+def _release(future=None):
+    """Free a queue slot once a task has finished (or was cancelled before it ran)."""
+    global _pending
+    
+    with _pending_lock:
+        _pending -= 1
+    INFERENCE_QUEUE_DEPTH.dec()
+
+
+async def _submit(kind: str, func, *args):
+    """Submit a call to an executor, rejecting it with 429 when the queue is full."""
+    global _pending
+    
+    with _pending_lock:
+        if _pending >= MAX_QUEUE:
+            INFERENCE_REJECTED.inc()
+            raise HTTPException(
+                status_code=429,
+                detail="Inference queue is full, retry later",
+                headers={"Retry-After": "1"}
+            )
+        _pending += 1
+    INFERENCE_QUEUE_DEPTH.inc()
+    
+    if kind == "thread":
+        # Carry the request context, so stages timed inside func keep their route
+        call = partial(contextvars.copy_context().run, func, *args)
+    else:
+        call = partial(func, *args)
+    try:
+        future = get_executor(kind).submit(call)
+    except BaseException:
+        _release()
+        raise
+    # The slot is freed when the task is done, not when the request stops
+    # waiting: a cancelled request (client disconnect) leaves its task running
+    future.add_done_callback(_release)
+    
+    # Queue wait plus run time, as a stage named after the function
+    with stage(func.__name__):
+        return await asyncio.wrap_future(future)
+
+
+async def run_inference(func, *args):
+    """
+    Run model inference on the configured pool.
+
+    In process mode `func` and its arguments must be picklable, and `func`
+    must look up models with get_model() since each worker has its own copy.
+    """
+    return await _submit(EXECUTOR_KIND, func, *args)
+
+
+async def run_blocking(func, *args):
+    """
+    Run blocking work on the thread pool.
+
+    Used for work that needs the parent process's objects (uploaded files,
+    the in-memory collusion graph) and so cannot go to a process pool.
+    """
+    return await _submit("thread", func, *args)
@@ -8,13 +8,35 @@ Supports 4 fraud detection modules:
 3. Welfare/Healthcare Fraud Detection (Random Forest)
 4. Bid Rigging/Collusion Detection (Graph Analysis)
 """
+import asyncio
+import os
+import signal
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from models.loader import load_all_models, get_all_models
+from admin import require_admin
+from executor import EXECUTOR_KIND, recycle_executor, start_executors, shutdown_executors
+from metrics import MetricsMiddleware, render_metrics
+from models.loader import (
+    MODEL_GROUPS,
+    get_all_models,
+    get_model_status,
+    reload_models,
+    start_model_loading,
+    stop_background_jobs,
+    wait_for_models
+)
 from routers import spending, legal, welfare, bidrigging
-from schemas import HealthCheckResponse
+from schemas import HealthCheckResponse, ModelReloadResponse, ModelStatus
+
+
+# Process pool recycles scheduled by /reload (referenced until they finish)
+_recycle_tasks = set()
 
 
 @asynccontextmanager
@@ -22,10 +44,13 @@ async def lifespan(app: FastAPI):
     """Load ML models on startup, cleanup on shutdown."""
     print("🚀 Starting Fraud Detection API...")
     print("📦 Loading ML models from llm folder...")
-    load_all_models()
-    print("✅ Model loading complete!")
+    # Each router serves as soon as its own models are ready (see /health)
+    start_model_loading()
+    start_executors()
     yield
     print("👋 Shutting down Fraud Detection API...")
+    stop_background_jobs()
+    shutdown_executors()
 
 
 app = FastAPI(
@@ -53,6 +78,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request duration and in-flight metrics (outermost, so it sees every request)
+app.add_middleware(MetricsMiddleware)
+
 # Mount routers
 app.include_router(spending.router)
 app.include_router(legal.router)
@@ -72,15 +100,26 @@ async def root():
             "welfare": "/welfare/analyze",
             "bidrigging": "/bidrigging/analyze",
             "health": "/health",
+            "reload": "/reload",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
 
 
+def model_status_response(status: dict) -> ModelStatus:
+    """Convert a model group status from the loader into its response schema."""
+    loaded_at = status["loaded_at"]
+    return ModelStatus(
+        **{**status, "loaded_at": datetime.fromtimestamp(loaded_at, timezone.utc).isoformat() if loaded_at else None}
+    )
+
+
 @app.get("/health", response_model=HealthCheckResponse, tags=["Health"])
 async def health_check():
-    """Check API health and model loading status."""
+    """Check API health and per-module model state, version and load time."""
     models = get_all_models()
+    groups = get_model_status()
     
     expected_models = [
         "spending_anomaly",
@@ -91,8 +130,12 @@ async def health_check():
         "welfare_fraud"
     ]
     
+    failed_groups = {group for group, status in groups.items() if status["state"] == "failed"}
     models_loaded = [name for name in expected_models if name in models]
-    models_failed = [name for name in expected_models if name not in models]
+    models_failed = [
+        name for name in expected_models
+        if name not in models and any(name in MODEL_GROUPS[group][1] for group in failed_groups)
+    ]
     
     status = "healthy" if len(models_loaded) > 0 else "degraded"
     if len(models_failed) == len(expected_models):
@@ -101,10 +144,91 @@ async def health_check():
     return HealthCheckResponse(
         status=status,
         models_loaded=models_loaded,
-        models_failed=models_failed
+        models_failed=models_failed,
+        models={group: model_status_response(group_status) for group, group_status in groups.items()}
     )
 
 
+@app.get("/health/{module}", response_model=ModelStatus, tags=["Health"])
+async def module_health_check(module: str):
+    """
+    Readiness of one module's models (spending, legal, bidrigging, welfare).
+    
+    Returns 503 until the module's models are ready, so readiness probes can
+    be gated per module.
+    """
+    status = get_model_status().get(module)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown module: {module}")
+    if status["state"] != "ready":
+        raise HTTPException(status_code=503, detail=f"{module} models are {status['state']}")
+    return model_status_response(status)
+
+
+async def recycle_after_reload(groups: list, versions: dict):
+    """
+    Replace the process pool once reloaded groups are published.
+    
+    Process pool workers hold their own copies of the models. The new workers
+    are forked with the newly published versions, and the old ones finish
+    their running tasks. Nothing is replaced if every load failed.
+    """
+    await asyncio.to_thread(wait_for_models, groups)
+    status = get_model_status()
+    if any(status[group]["version"] > versions.get(group, 0) for group in groups):
+        recycle_executor("process")
+
+
+@app.post(
+    "/reload",
+    response_model=ModelReloadResponse,
+    status_code=202,
+    tags=["Health"],
+    dependencies=[Depends(require_admin)]
+)
+async def reload(module: Optional[List[str]] = Query(None, description="Modules to reload (default: all)")):
+    """
+    Hot-reload models from disk without restarting the server.
+    
+    New versions load and warm up in the background and are swapped in
+    atomically; in-flight requests finish on the old version, and a failed
+    load keeps the old version active. Poll /health for the new version.
+    
+    Under serve.py the request is forwarded to the supervisor, which reloads
+    all modules once and replaces its workers with ones sharing the new models.
+    
+    Requires the X-Admin-Token header (see admin.py).
+    """
+    supervisor_pid = os.getenv("FRAUD_API_SUPERVISOR_PID")
+    if supervisor_pid:
+        unknown = [group for group in module or [] if group not in MODEL_GROUPS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown model groups: {', '.join(unknown)}")
+        os.kill(int(supervisor_pid), signal.SIGHUP)
+        return ModelReloadResponse(models={
+            group: model_status_response(status) for group, status in get_model_status().items()
+        })
+    
+    versions = {group: status["version"] for group, status in get_model_status().items()}
+    try:
+        groups = reload_models(module)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if EXECUTOR_KIND == "process":
+        task = asyncio.create_task(recycle_after_reload(list(groups), versions))
+        _recycle_tasks.add(task)
+        task.add_done_callback(_recycle_tasks.discard)
+    
+    return ModelReloadResponse(models={group: model_status_response(status) for group, status in groups.items()})
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def get_metrics():
+    """Request, stage, batch and model call metrics in Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,293 @@
+"""
+Lightweight in-process metrics exposed at /metrics in Prometheus text format.
+
+Recorded metrics:
+    fraud_http_request_duration_seconds  Whole request, by method, route and status
+    fraud_http_requests_in_flight        Requests currently being handled
+    fraud_stage_duration_seconds         Per-stage time, by route and stage; every
+                                         route has parse (body parsing and Pydantic
+                                         validation), endpoint and serialize stages,
+                                         and routers add their own (features, inference...)
+    fraud_batch_size                     Items per batch, by route
+    fraud_model_call_duration_seconds    Model method calls, by model and method
+    fraud_inference_queue_depth          Tasks queued or running on the executors
+    fraud_inference_rejected_total       Tasks rejected with 429
+    fraud_model_load_seconds             Load and warmup time of the active version
+    fraud_model_version                  Active version of each model group
+
+An observation is a bisect and an update under a per-metric lock, a few
+microseconds. With the process executor, stages and model calls that run
+inside worker processes are recorded in the workers and not exported; the
+parent still records each route's stages and the inference call as a whole.
+"""
+import bisect
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi.routing import APIRoute
+
+# Latency buckets in seconds (100 us .. 30 s)
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+BATCH_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+# Metrics in registration order
+_registry = []
+
+# Route path of the request being handled, and its stage timestamps
+_current_route = contextvars.ContextVar("current_route", default="")
+_route_timings = contextvars.ContextVar("route_timings", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """
+    Base class of a labelled metric.
+
+    Args:
+        name: Prometheus metric name
+        documentation: HELP text
+        labelnames: Label names; values are passed positionally when recording
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if not self.labelnames and self.kind != "histogram":
+            self._values[()] = 0
+        _registry.append(self)
+
+    def samples(self) -> list:
+        """Get (suffix, label string, value) tuples for the exposition."""
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("", _format_labels(self.labelnames, labels), value) for labels, value in items]
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Monotonic counter."""
+
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """
+    Fixed-bucket histogram.
+
+    Args:
+        buckets: Sorted upper bounds (the +Inf bucket is implicit)
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def samples(self) -> list:
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+
+        samples = []
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                samples.append(("_bucket", _format_labels(self.labelnames, labels, f'le="{le}"'), cumulative))
+            samples.append(("_sum", _format_labels(self.labelnames, labels), total))
+            samples.append(("_count", _format_labels(self.labelnames, labels), cumulative))
+        return samples
+
+
+REQUEST_SECONDS = Histogram(
+    "fraud_http_request_duration_seconds", "HTTP request duration", ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = Gauge("fraud_http_requests_in_flight", "HTTP requests being handled")
+STAGE_SECONDS = Histogram("fraud_stage_duration_seconds", "Duration of one request stage", ("route", "stage"))
+BATCH_SIZE = Histogram("fraud_batch_size", "Items scored per batch", ("route",), buckets=BATCH_BUCKETS)
+MODEL_CALL_SECONDS = Histogram(
+    "fraud_model_call_duration_seconds", "Duration of model method calls", ("model", "method")
+)
+INFERENCE_QUEUE_DEPTH = Gauge("fraud_inference_queue_depth", "Executor tasks queued or running")
+INFERENCE_REJECTED = Counter("fraud_inference_rejected_total", "Executor tasks rejected because the queue was full")
+MODEL_LOAD_SECONDS = Gauge("fraud_model_load_seconds", "Load and warmup time of the active model version", ("group",))
+MODEL_VERSION = Gauge("fraud_model_version", "Active model version", ("group",))
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a stage of the current route."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, _current_route.get(), name)
+
+
+@contextmanager
+def model_call(model: str, method: str):
+    """Time a model method call."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        MODEL_CALL_SECONDS.observe(time.perf_counter() - started, model, method)
+
+
+def observe_batch(size: int):
+    """Record the size of a batch scored for the current route."""
+    BATCH_SIZE.observe(size, _current_route.get())
+
+
+def render_metrics() -> str:
+    """Render all metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute recording parse, endpoint and serialize stages.
+
+    The endpoint is wrapped so the time before it runs (body parsing and
+    validation) and after it returns (response validation and serialization)
+    can be told apart. Use as `APIRouter(route_class=TimedRoute)`.
+    """
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if inspect.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def timed_call(*args, **kwargs):
+                timings = _route_timings.get()
+                timings.append(time.perf_counter())
+                try:
+                    return await call(*args, **kwargs)
+                finally:
+                    timings.append(time.perf_counter())
+        else:
+            @functools.wraps(call)
+            def timed_call(*args, **kwargs):
+                timings = _route_timings.get()
+                timings.append(time.perf_counter())
+                try:
+                    return call(*args, **kwargs)
+                finally:
+                    timings.append(time.perf_counter())
+        self.dependant.call = timed_call
+
+        handler = super().get_route_handler()
+        path = self.path_format
+
+        async def timed_handler(request):
+            route_token = _current_route.set(path)
+            timings = [time.perf_counter()]
+            timings_token = _route_timings.set(timings)
+            try:
+                return await handler(request)
+            finally:
+                timings.append(time.perf_counter())
+                if len(timings) == 4:
+                    started, called, returned, finished = timings
+                    STAGE_SECONDS.observe(called - started, path, "parse")
+                    STAGE_SECONDS.observe(returned - called, path, "endpoint")
+                    STAGE_SECONDS.observe(finished - returned, path, "serialize")
+                _route_timings.reset(timings_token)
+                _current_route.reset(route_token)
+
+        return timed_handler
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request duration and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # Label by route template, so path parameters do not create new series
+            route = scope.get("route")
+            path = getattr(route, "path_format", None) or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - started, scope["method"], path, status)
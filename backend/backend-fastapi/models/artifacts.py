@@ -0,0 +1,280 @@
+"""
+Compact on-disk model artifacts opened with memory maps.
+
+The pickled forests, collusion graph and vendor name dict are exported once
+into directories of plain .npy arrays plus a meta.json. Loading opens every
+array with mmap_mode="r", so startup takes milliseconds and all uvicorn
+workers share the same pages through the OS page cache.
+
+Layout (one directory per model under the artifacts folder):
+    spending_anomaly/  FlatForest arrays of the Isolation Forest
+    welfare_fraud/     FlatForest arrays of the Random Forest + classes
+    bid_rigging/       CSRGraph arrays (see models/collusion_graph.py)
+    graph_features/    Vendor centrality/community columns (see models/graph_features.py)
+
+Every meta.json records the artifact FORMAT_VERSION and the size, mtime and
+sha256 of the pickles it was exported from. The loader only uses an artifact
+whose format matches and whose source pickles are unchanged (or absent, for
+artifact-only deployments); otherwise it warns and loads the pickles. Forest
+artifacts are only used with FOREST_ENGINE=compiled, since the default
+engine scores with the sklearn estimators themselves.
+
+Export from the backend-fastapi folder:
+    python -m models.artifacts [--llm-folder PATH] [--out PATH]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+import joblib
+import numpy as np
+
+from models.collusion_graph import GRAPH_ARRAYS, CSRGraph, csr_from_networkx
+from models.forest import CompiledIsolationForest, CompiledRandomForest, FlatForest
+from models.graph_features import FEATURE_ARRAYS, GraphFeatures
+
+META_FILE = "meta.json"
+
+# Bumped whenever the array layout changes (2: vendor table + CSR graph arrays)
+FORMAT_VERSION = 2
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_signature(path: Path) -> dict:
+    """Identify a source pickle by name, size, mtime and content hash."""
+    stat = path.stat()
+    return {
+        "file": path.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": _file_hash(path)
+    }
+
+
+def _same_source(path: Path, signature: dict) -> bool:
+    """Check a pickle against its recorded signature (hashing only if the mtime moved)."""
+    stat = path.stat()
+    if stat.st_size != signature["size"]:
+        return False
+    if stat.st_mtime_ns == signature["mtime_ns"]:
+        return True
+    return _file_hash(path) == signature["sha256"]
+
+
+def _save_arrays(folder: Path, arrays: dict, meta: dict, sources=()):
+    """
+    Write arrays as .npy files plus a meta.json into a folder.
+
+    The files are written into a staging folder that is then swapped in, so
+    readers never see a partly written artifact (processes that mapped the
+    previous files keep reading them).
+    """
+    staging = folder.with_name(f".{folder.name}.tmp-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    for name, array in arrays.items():
+        np.save(staging / f"{name}.npy", np.ascontiguousarray(array))
+    meta = {"format": FORMAT_VERSION, **meta, "sources": [source_signature(path) for path in sources]}
+    (staging / META_FILE).write_text(json.dumps(meta, indent=2))
+
+    # A directory cannot be renamed over a non-empty one: move the old one aside first
+    previous = folder.with_name(f".{folder.name}.old-{os.getpid()}")
+    if folder.exists():
+        os.replace(folder, previous)
+    os.replace(staging, folder)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+def _load_arrays(folder: Path, names) -> dict:
+    """Memory-map the named .npy arrays of an artifact folder."""
+    return {name: np.load(folder / f"{name}.npy", mmap_mode="r") for name in names}
+
+
+def has_artifact(folder: Path) -> bool:
+    """Check whether an exported artifact exists in a folder."""
+    return (folder / META_FILE).exists()
+
+
+def _read_meta(folder: Path) -> dict:
+    return json.loads((folder / META_FILE).read_text())
+
+
+def check_artifact(folder: Path, source_folder: Path) -> Optional[str]:
+    """
+    Check that an artifact can be used in place of its pickles.
+
+    Args:
+        folder: Artifact folder
+        source_folder: Folder holding the source pickles (the llm folder)
+
+    Returns:
+        None if the artifact is usable, else the reason it is not
+    """
+    meta = _read_meta(folder)
+    version = meta.get("format", 1)
+    if version != FORMAT_VERSION:
+        return f"format {version}, expected {FORMAT_VERSION}"
+    for signature in meta.get("sources", []):
+        path = source_folder / signature["file"]
+        if path.exists() and not _same_source(path, signature):
+            return f"{signature['file']} changed since the export"
+    return None
+
+
+# ============== Forests ==============
+
+def export_forest(estimator, folder: Path, sources=()):
+    """
+    Export a fitted IsolationForest or RandomForestClassifier.
+
+    Args:
+        estimator: Fitted sklearn forest
+        folder: Output artifact folder
+        sources: Pickle paths the estimator was loaded from
+    """
+    arrays = {}
+    if hasattr(estimator, "offset_"):
+        compiled = CompiledIsolationForest.from_estimator(estimator)
+        meta = {
+            "kind": "isolation_forest",
+            "offset": float(compiled.offset_),
+            "denominator": float(compiled.denominator)
+        }
+    else:
+        compiled = CompiledRandomForest.from_estimator(estimator)
+        meta = {"kind": "random_forest"}
+        arrays["classes"] = np.asarray(compiled.classes_)
+
+    forest = compiled.forest
+    for name in FlatForest.ARRAYS:
+        arrays[name] = getattr(forest, name)
+    meta["max_depth"] = int(forest.max_depth)
+    meta["n_features"] = int(estimator.n_features_in_)
+    _save_arrays(folder, arrays, meta, sources)
+
+
+def load_forest(folder: Path, source_folder: Optional[Path] = None):
+    """
+    Load an exported forest as a compiled, memory-mapped model.
+
+    Args:
+        folder: Artifact folder
+        source_folder: Folder holding the source pickle; when it still exists
+            the sklearn estimator is loaded from it on the first batch above
+            COMPILED_MAX_ROWS, so large batches keep going through sklearn
+
+    Returns:
+        CompiledIsolationForest or CompiledRandomForest
+    """
+    meta = _read_meta(folder)
+    arrays = _load_arrays(folder, FlatForest.ARRAYS)
+    forest = FlatForest(max_depth=meta["max_depth"], **arrays)
+
+    load_estimator = None
+    if source_folder is not None:
+        paths = [source_folder / signature["file"] for signature in meta.get("sources", [])]
+        path = next((p for p in paths if p.exists()), None)
+        if path is not None:
+            load_estimator = partial(joblib.load, path)
+
+    if meta["kind"] == "isolation_forest":
+        return CompiledIsolationForest(forest, meta["offset"], meta["denominator"], load_estimator=load_estimator)
+    return CompiledRandomForest(forest, np.load(folder / "classes.npy"), load_estimator=load_estimator)
+
+
+# ============== Collusion graph + vendor names ==============
+
+def export_graph(graph, vendor_names: dict, folder: Path, sources=()):
+    """
+    Export the NetworkX collusion graph and the vendor name dict.
+
+    Args:
+        graph: Undirected NetworkX graph with co-bid "weight" edge attributes
+        vendor_names: participant_code -> participant_name dict
+        folder: Output artifact folder
+        sources: Pickle paths the graph and names were loaded from
+    """
+    save_graph(csr_from_networkx(graph, vendor_names), folder, sources)
+
+
+def save_graph(graph: CSRGraph, folder: Path, sources=()):
+    """Write a CSRGraph (with its vendor table) as the bid_rigging artifact."""
+    _save_arrays(folder, graph.arrays(), {
+        "kind": "collusion_graph",
+        "n_vendors": len(graph.vendors.codes),
+        "n_nodes": graph.number_of_nodes(),
+        "n_edges": graph.number_of_edges()
+    }, sources)
+
+
+def load_graph(folder: Path) -> CSRGraph:
+    """Load an exported collusion graph as a memory-mapped CSRGraph."""
+    return CSRGraph.from_arrays(_load_arrays(folder, GRAPH_ARRAYS))
+
+
+# ============== Graph features ==============
+
+def save_graph_features(features: GraphFeatures, folder: Path):
+    """Write precomputed graph features with the fingerprint of their graph."""
+    _save_arrays(folder, features.arrays, {
+        "kind": "graph_features",
+        "graph_fingerprint": features.fingerprint
+    })
+
+
+def load_graph_features(folder: Path) -> GraphFeatures:
+    """Load precomputed graph features as memory maps."""
+    meta = _read_meta(folder)
+    return GraphFeatures(_load_arrays(folder, FEATURE_ARRAYS), meta["graph_fingerprint"])
+
+
+# ============== Export CLI ==============
+
+def export_all(llm_folder: Path, out_folder: Path):
+    """Export every pickled model found in the llm folder."""
+    exports = [
+        ("spending_anomaly", ["spending_anomaly_model.pkl"]),
+        ("welfare_fraud", ["fraud_detection_model.pkl", "Welfare Delivery.pkl"]),
+    ]
+    for name, filenames in exports:
+        path = next((llm_folder / f for f in filenames if (llm_folder / f).exists()), None)
+        if path is None:
+            print(f"⚠️ Skipped {name}: no model file found")
+            continue
+        started = time.perf_counter()
+        export_forest(joblib.load(path), out_folder / name, [path])
+        print(f"✅ Exported {name} from {path.name} in {time.perf_counter() - started:.2f}s")
+
+    graph_path = llm_folder / "bid_rigging_graph.pkl"
+    names_path = llm_folder / "vendor_names.pkl"
+    if graph_path.exists() and names_path.exists():
+        started = time.perf_counter()
+        export_graph(
+            joblib.load(graph_path), joblib.load(names_path), out_folder / "bid_rigging", [graph_path, names_path]
+        )
+        print(f"✅ Exported bid_rigging in {time.perf_counter() - started:.2f}s")
+    else:
+        print("⚠️ Skipped bid_rigging: graph or vendor names not found")
+
+
+if __name__ == "__main__":
+    from models.loader import LLM_FOLDER, ARTIFACTS_FOLDER
+
+    parser = argparse.ArgumentParser(description="Export model pickles to mmap-able artifacts")
+    parser.add_argument("--llm-folder", type=Path, default=LLM_FOLDER)
+    parser.add_argument("--out", type=Path, default=ARTIFACTS_FOLDER)
+    args = parser.parse_args()
+    export_all(args.llm_folder, args.out)
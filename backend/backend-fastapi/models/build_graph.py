@@ -0,0 +1,300 @@
+"""
+Out-of-core collusion graph builder for the full Prozorro dataset.
+
+Builds the same graph as bid-rigging-collusion-detector.ipynb (one co-bid per
+pair of distinct bidders on a lot, edges for pairs with count >= THRESHOLD)
+without holding the dataset or the pair dict in memory:
+
+    1. Read the CSV in chunks, encode participant codes to integers and
+       spill (lot hash, vendor id) bids to disk, sharded by lot.
+    2. For each lot shard (in a process pool) generate the bidder pairs of
+       every lot as integer keys, count them with sort-based array
+       aggregation and spill partial counts sharded by pair key.
+    3. For each pair shard (in a process pool) sum the partial counts and
+       keep the pairs that reach the threshold.
+    4. Assemble the CSR graph with components and the vendor name table and
+       write the bid_rigging artifact that models/loader.py consumes.
+
+Run from the backend-fastapi folder:
+    python -m models.build_graph Competitive_procurements.csv [--out PATH]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from models.artifacts import save_graph
+from models.collusion_graph import CSRGraph, VendorTable, pack_strings
+from models.graph_updates import THRESHOLD
+
+CSV_COLUMNS = ["lot_id", "participant_code", "participant_name"]
+
+# Max pair keys a worker buffers before spilling partial counts to disk
+SPILL_PAIRS = 20_000_000
+
+
+def _log(started: float, message: str):
+    print(f"[{time.perf_counter() - started:8.1f}s] {message}", flush=True)
+
+
+# ============== Pass 1: encode and shard bids ==============
+
+def shard_bids(csv_path: Path, work_dir: Path, n_shards: int, chunksize: int, started: float) -> tuple:
+    """
+    Stream the CSV, encode vendors and spill bids sharded by lot.
+
+    Returns:
+        Tuple of (vendor codes in id order, code -> name dict)
+    """
+    vendor_ids = {}
+    names = {}
+    rows = 0
+
+    reader = pd.read_csv(csv_path, usecols=CSV_COLUMNS, dtype=str, chunksize=chunksize)
+    for chunk_number, chunk in enumerate(reader):
+        chunk = chunk.dropna(subset=["lot_id", "participant_code"])
+
+        # Last name seen wins, as with set_index(...).to_dict() in the notebook
+        named = chunk.dropna(subset=["participant_name"])
+        names.update(zip(named["participant_code"], named["participant_name"]))
+
+        for code in chunk["participant_code"].unique():
+            if code not in vendor_ids:
+                vendor_ids[code] = len(vendor_ids)
+
+        lots = pd.util.hash_array(chunk["lot_id"].to_numpy()).view(np.int64)
+        vendors = chunk["participant_code"].map(vendor_ids).to_numpy(dtype=np.int64)
+        shards = lots % n_shards
+        for shard in np.unique(shards):
+            mask = shards == shard
+            np.save(work_dir / "bids" / f"{shard}_{chunk_number}.npy", np.stack([lots[mask], vendors[mask]]))
+
+        rows += len(chunk)
+        _log(started, f"Read {rows:,} bids, {len(vendor_ids):,} vendors")
+
+    return list(vendor_ids), names
+
+
+# ============== Pass 2: count pairs per lot shard ==============
+
+def _lot_pairs(vendors: np.ndarray, starts: np.ndarray, size: int) -> tuple:
+    """All (a, b) bidder pairs of equally sized lots starting at `starts`."""
+    i, j = np.triu_indices(size, 1)
+    return vendors[starts[:, None] + i].ravel(), vendors[starts[:, None] + j].ravel()
+
+
+def _spill_counts(keys: list, work_dir: Path, lot_shard: int, part: int, n_shards: int):
+    """Aggregate buffered pair keys and spill the counts sharded by key."""
+    keys, counts = np.unique(np.concatenate(keys), return_counts=True)
+    shards = keys % n_shards
+    for shard in np.unique(shards):
+        mask = shards == shard
+        np.save(work_dir / "pairs" / f"{shard}_{lot_shard}_{part}.npy", np.stack([keys[mask], counts[mask]]))
+
+
+def count_lot_shard(work_dir: Path, lot_shard: int, n_vendors: int, n_shards: int) -> tuple:
+    """
+    Count the bidder pairs of every lot in one lot shard.
+
+    Returns:
+        Tuple of (lot_shard, competitive lots, pairs counted)
+    """
+    files = sorted((work_dir / "bids").glob(f"{lot_shard}_*.npy"))
+    if not files:
+        return lot_shard, 0, 0
+    lots, vendors = np.concatenate([np.load(f) for f in files], axis=1)
+
+    # Unique bidders per lot, grouped by lot
+    order = np.lexsort((vendors, lots))
+    lots, vendors = lots[order], vendors[order]
+    keep = np.ones(len(lots), dtype=bool)
+    keep[1:] = (lots[1:] != lots[:-1]) | (vendors[1:] != vendors[:-1])
+    lots, vendors = lots[keep], vendors[keep]
+
+    starts = np.flatnonzero(np.r_[True, lots[1:] != lots[:-1]])
+    sizes = np.diff(np.r_[starts, len(lots)])
+
+    buffer, buffered, part, n_pairs = [], 0, 0, 0
+    for size in np.unique(sizes[sizes > 1]):
+        group_starts = starts[sizes == size]
+        pairs_per_lot = size * (size - 1) // 2
+        step = max(1, SPILL_PAIRS // pairs_per_lot)
+        for offset in range(0, len(group_starts), step):
+            a, b = _lot_pairs(vendors, group_starts[offset:offset + step], size)
+            buffer.append(np.minimum(a, b) * n_vendors + np.maximum(a, b))
+            buffered += len(a)
+            n_pairs += len(a)
+            if buffered >= SPILL_PAIRS:
+                _spill_counts(buffer, work_dir, lot_shard, part, n_shards)
+                buffer, buffered, part = [], 0, part + 1
+    if buffer:
+        _spill_counts(buffer, work_dir, lot_shard, part, n_shards)
+
+    return lot_shard, int(np.count_nonzero(sizes > 1)), n_pairs
+
+
+# ============== Pass 3: merge counts per pair shard ==============
+
+def merge_pair_shard(work_dir: Path, pair_shard: int, threshold: int) -> tuple:
+    """
+    Sum the partial counts of one pair shard.
+
+    Returns:
+        Tuple of (pair keys, counts) of the pairs reaching the threshold
+    """
+    files = list((work_dir / "pairs").glob(f"{pair_shard}_*.npy"))
+    if not files:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    keys, counts = np.concatenate([np.load(f) for f in files], axis=1)
+    keys, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=counts).astype(np.int64)
+    edges = totals >= threshold
+    return keys[edges], totals[edges]
+
+
+# ============== Assemble ==============
+
+def connected_components(n_vertices: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Component label (smallest member id) per vertex, by vectorized hooking and pointer jumping."""
+    labels = np.arange(n_vertices)
+    while True:
+        lowest = np.minimum(labels[src], labels[dst])
+        hooked = labels.copy()
+        np.minimum.at(hooked, labels[src], lowest)
+        np.minimum.at(hooked, labels[dst], lowest)
+        while True:
+            jumped = hooked[hooked]
+            if np.array_equal(jumped, hooked):
+                break
+            hooked = jumped
+        if np.array_equal(hooked, labels):
+            return labels
+        labels = hooked
+
+
+def assemble_graph(codes: list, names: dict, keys: np.ndarray, weights: np.ndarray) -> CSRGraph:
+    """
+    Build the CSRGraph from thresholded pair keys.
+
+    Args:
+        codes: Vendor codes in encoding (first appearance) order
+        names: code -> name dict
+        keys: Pair keys a * n_vendors + b
+        weights: Co-bid count per pair
+    """
+    n_vendors = len(codes)
+
+    # Vendor ids become positions in the sorted code array
+    order = np.argsort(np.array(codes, dtype=object), kind="stable")
+    position = np.empty(n_vendors, dtype=np.int64)
+    position[order] = np.arange(n_vendors)
+    sorted_codes = [codes[i] for i in order]
+
+    a, b = position[keys // n_vendors], position[keys % n_vendors]
+    rows, cols = np.r_[a, b], np.r_[b, a]
+    weights = np.r_[weights, weights]
+    edge_order = np.lexsort((cols, -weights, rows))
+
+    degree = np.bincount(rows, minlength=n_vendors)
+    indptr = np.zeros(n_vendors + 1, dtype=np.int64)
+    np.cumsum(degree, out=indptr[1:])
+    in_graph = (degree > 0).astype(np.uint8)
+
+    # Nodes in first-appearance order of the dataset
+    node_order = position[np.flatnonzero(in_graph[position])]
+
+    component = np.full(n_vendors, -1, dtype=np.int32)
+    labels = connected_components(n_vendors, a, b)[in_graph == 1]
+    component[in_graph == 1] = np.unique(labels, return_inverse=True)[1]
+
+    encoded = [code.encode("utf-8") for code in sorted_codes]
+    width = max((len(code) for code in encoded), default=1)
+    name_offsets, name_blob = pack_strings(names.get(code, "") for code in sorted_codes)
+    vendors = VendorTable(
+        np.array(encoded, dtype=f"S{width}"),
+        name_offsets,
+        name_blob,
+        np.array([code in names for code in sorted_codes], dtype=np.uint8)
+    )
+
+    return CSRGraph(
+        vendors,
+        in_graph,
+        node_order.astype(np.int32),
+        indptr,
+        cols[edge_order].astype(np.int32),
+        weights[edge_order].astype(np.int32),
+        degree.astype(np.int32),
+        component
+    )
+
+
+def build_graph(csv_path: Path, out_folder: Path, workers: int, n_shards: int, chunksize: int,
+                threshold: int = THRESHOLD, work_dir: Path = None):
+    """
+    Build the collusion graph artifact from a Competitive_procurements CSV.
+
+    Args:
+        csv_path: CSV with lot_id, participant_code and participant_name columns
+        out_folder: Output bid_rigging artifact folder
+        workers: Process pool size
+        n_shards: Number of lot shards and pair shards
+        chunksize: CSV rows per chunk
+        threshold: Co-bid count at which a pair becomes an edge
+        work_dir: Folder for spill files (a temporary folder by default)
+    """
+    started = time.perf_counter()
+    work_dir = Path(tempfile.mkdtemp(prefix="collusion-graph-", dir=work_dir))
+    (work_dir / "bids").mkdir()
+    (work_dir / "pairs").mkdir()
+
+    try:
+        codes, names = shard_bids(csv_path, work_dir, n_shards, chunksize, started)
+        n_vendors = len(codes)
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(count_lot_shard, work_dir, shard, n_vendors, n_shards) for shard in range(n_shards)]
+            total_lots, total_pairs = 0, 0
+            for done, future in enumerate(as_completed(futures), 1):
+                _, n_lots, n_pairs = future.result()
+                total_lots += n_lots
+                total_pairs += n_pairs
+                _log(started, f"Counted lot shard {done}/{n_shards}: {total_lots:,} lots, {total_pairs:,} pairs")
+
+            futures = [pool.submit(merge_pair_shard, work_dir, shard, threshold) for shard in range(n_shards)]
+            keys, weights = [], []
+            for done, future in enumerate(as_completed(futures), 1):
+                shard_keys, shard_weights = future.result()
+                keys.append(shard_keys)
+                weights.append(shard_weights)
+                _log(started, f"Merged pair shard {done}/{n_shards}: {sum(len(k) for k in keys):,} edges")
+
+        graph = assemble_graph(codes, names, np.concatenate(keys), np.concatenate(weights))
+        save_graph(graph, out_folder)
+        _log(started, (
+            f"✅ Wrote {out_folder}: {graph.number_of_nodes():,} vendors in the network, "
+            f"{graph.number_of_edges():,} suspicious links"
+        ))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    from models.loader import ARTIFACTS_FOLDER
+
+    parser = argparse.ArgumentParser(description="Build the collusion graph artifact from procurement bids")
+    parser.add_argument("csv", type=Path, help="Competitive_procurements.csv")
+    parser.add_argument("--out", type=Path, default=ARTIFACTS_FOLDER / "bid_rigging")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--shards", type=int, default=64)
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    parser.add_argument("--threshold", type=int, default=THRESHOLD)
+    parser.add_argument("--work-dir", type=Path, default=None)
+    args = parser.parse_args()
+    build_graph(args.csv, args.out, args.workers, args.shards, args.chunksize, args.threshold, args.work_dir)
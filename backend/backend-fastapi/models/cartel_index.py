@@ -0,0 +1,95 @@
+"""
+Cartel index for the bid rigging collusion graph.
+
+Connected components of the co-bidding graph are computed once at load time
+so vendor lookups and network statistics are plain dictionary reads.
+"""
+import networkx as nx
+import numpy as np
+
+# Minimum component size treated as a cartel (per the training notebook)
+MIN_CARTEL_SIZE = 3
+
+
+class ComponentLookup:
+    """Dict-style vendor -> component id lookup over a CSRGraph's component array."""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def get(self, vendor_id, default=None):
+        index = self.graph.node_index(vendor_id)
+        return default if index is None else int(self.graph.component[index])
+
+
+def build_csr_cartel_index(graph) -> dict:
+    """Build the cartel index from the precomputed components of a CSRGraph."""
+    labels = np.asarray(graph.component)
+    component_sizes = np.bincount(labels[labels >= 0]).tolist()
+
+    stats = {
+        "total_vendors": graph.number_of_nodes(),
+        "total_connections": graph.number_of_edges(),
+        "total_cartels": sum(1 for size in component_sizes if size >= MIN_CARTEL_SIZE),
+        "largest_cartel_size": max(component_sizes) if component_sizes else 0
+    }
+
+    return {
+        "component_of": ComponentLookup(graph),
+        "component_sizes": component_sizes,
+        "stats": stats
+    }
+
+
+def build_cartel_index(graph) -> dict:
+    """
+    Build the cartel index for a collusion graph.
+
+    Args:
+        graph: NetworkX graph of vendors linked by co-bid counts, or a
+            CSRGraph artifact with precomputed components
+
+    Returns:
+        Dict with the vendor -> component id map, component sizes and
+        network-wide statistics
+    """
+    if hasattr(graph, "component"):
+        return build_csr_cartel_index(graph)
+
+    component_of = {}
+    component_sizes = []
+
+    for component_id, component in enumerate(nx.connected_components(graph)):
+        component_sizes.append(len(component))
+        for vendor in component:
+            component_of[vendor] = component_id
+
+    stats = {
+        "total_vendors": graph.number_of_nodes(),
+        "total_connections": graph.number_of_edges(),
+        "total_cartels": sum(1 for size in component_sizes if size >= MIN_CARTEL_SIZE),
+        "largest_cartel_size": max(component_sizes) if component_sizes else 0
+    }
+
+    return {
+        "component_of": component_of,
+        "component_sizes": component_sizes,
+        "stats": stats
+    }
+
+
+def get_cartel_size(index: dict, vendor_id: str):
+    """
+    Get the size of the component a vendor belongs to.
+
+    Args:
+        index: Cartel index built by build_cartel_index
+        vendor_id: Vendor/participant code
+
+    Returns:
+        Component size, or None if the vendor is not in the graph
+    """
+    component_id = index["component_of"].get(vendor_id)
+    if component_id is None:
+        return None
+    return index["component_sizes"][component_id]
@@ -0,0 +1,507 @@
+"""
+Compact CSR engine for the bid rigging collusion graph.
+
+Vendors get integer ids (their position in the sorted code array). The
+adjacency is stored as CSR indptr/indices/weights arrays with each row
+pre-sorted by co-bid weight, plus precomputed degree and connected
+component arrays, so the serving path never touches NetworkX objects:
+a vendor's top connections are an array slice and its connection count
+is one array read.
+"""
+import hashlib
+
+import networkx as nx
+import numpy as np
+
+# Array names of a CSRGraph, as stored in the bid_rigging artifact
+GRAPH_ARRAYS = (
+    "codes", "name_offsets", "name_blob", "has_name", "in_graph", "node_order",
+    "indptr", "indices", "weights", "degree", "component"
+)
+
+
+def pack_strings(strings) -> tuple:
+    """Pack strings into (offsets, utf-8 blob) arrays."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return offsets, blob
+
+
+class VendorTable:
+    """
+    Sorted vendor codes with optional names.
+
+    Vendor ids are positions in the sorted code array, so code lookups are a
+    binary search and no per-vendor Python objects are kept in memory.
+    """
+
+    def __init__(self, codes, name_offsets, name_blob, has_name):
+        self.codes = codes
+        self.name_offsets = name_offsets
+        self.name_blob = name_blob
+        self.has_name = has_name
+
+    def vendor_index(self, code):
+        """Get the integer id of a vendor code, or None if unknown."""
+        key = str(code).encode("utf-8")
+        if len(key) > self.codes.dtype.itemsize:
+            return None
+        index = int(np.searchsorted(self.codes, key))
+        if index < len(self.codes) and self.codes[index] == key:
+            return index
+        return None
+
+    def code(self, index: int) -> str:
+        """Get the vendor code for an integer id."""
+        return self.codes[index].decode("utf-8")
+
+    def name(self, index: int, default=None):
+        """Get the vendor name for an integer id."""
+        if not self.has_name[index]:
+            return default
+        start, end = self.name_offsets[index], self.name_offsets[index + 1]
+        return self.name_blob[start:end].tobytes().decode("utf-8")
+
+    def get(self, code, default=None):
+        """Dict-style name lookup by vendor code."""
+        index = self.vendor_index(code)
+        return default if index is None else self.name(index, default)
+
+    def __contains__(self, code) -> bool:
+        index = self.vendor_index(code)
+        return index is not None and bool(self.has_name[index])
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.has_name))
+
+
+class CSRGraph:
+    """
+    Read-only collusion graph over CSR arrays.
+
+    Rows of the adjacency are sorted by co-bid weight, heaviest first (ties
+    keep the NetworkX adjacency order). The integer-id methods are what the
+    routers use; a small NetworkX-compatible subset keyed by vendor code is
+    kept for callers that expect a Graph.
+
+    Args:
+        vendors: VendorTable the integer ids refer to
+        in_graph: 1 for vendors that are graph nodes
+        node_order: Node ids in the original graph's node order
+        indptr: Row offsets into indices/weights (length n_vendors + 1)
+        indices: Neighbor ids
+        weights: Co-bid counts per edge
+        degree: Number of neighbors per vendor
+        component: Connected component id per vendor (-1 if not a node)
+    """
+
+    def __init__(self, vendors: VendorTable, in_graph, node_order, indptr, indices, weights, degree, component):
+        self.vendors = vendors
+        self.in_graph = in_graph
+        self.node_order = node_order
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.degree = degree
+        self.component = component
+        self._fingerprint = None
+        self._node_positions = None
+
+    @classmethod
+    def from_arrays(cls, arrays: dict):
+        """Build a graph from a dict of GRAPH_ARRAYS (e.g. memory maps)."""
+        vendors = VendorTable(arrays["codes"], arrays["name_offsets"], arrays["name_blob"], arrays["has_name"])
+        return cls(vendors, *(arrays[name] for name in GRAPH_ARRAYS[4:]))
+
+    def arrays(self) -> dict:
+        """Get the GRAPH_ARRAYS of this graph by name."""
+        vendors = self.vendors
+        arrays = {
+            "codes": vendors.codes,
+            "name_offsets": vendors.name_offsets,
+            "name_blob": vendors.name_blob,
+            "has_name": vendors.has_name
+        }
+        for name in GRAPH_ARRAYS[4:]:
+            arrays[name] = getattr(self, name)
+        return arrays
+
+    def fingerprint(self) -> str:
+        """Hash of the vendor codes and adjacency, to tie derived data to this graph."""
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for array in (self.vendors.codes, self.indptr, self.indices, self.weights):
+                digest.update(np.ascontiguousarray(array).data)
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    # ---------- Integer-id API ----------
+
+    def node_index(self, vendor_id):
+        """Get the integer id of a graph node, or None if it is not a node."""
+        index = self.vendors.vendor_index(vendor_id)
+        if index is None or not self.in_graph[index]:
+            return None
+        return index
+
+    def node_position(self, index: int) -> int:
+        """Get a node's position in node_order (stable across updates, new nodes are appended)."""
+        if self._node_positions is None:
+            positions = np.full(len(self.in_graph), -1, dtype=np.int64)
+            positions[self.node_order] = np.arange(len(self.node_order))
+            self._node_positions = positions
+        return int(self._node_positions[index])
+
+    def top_neighbors(self, index: int, limit: int) -> tuple:
+        """
+        Get a node's strongest connections.
+
+        Args:
+            index: Integer node id
+            limit: Max number of neighbors
+
+        Returns:
+            Tuple of (neighbor ids, weights) array slices, heaviest first
+        """
+        start = self.indptr[index]
+        end = min(self.indptr[index + 1], start + limit)
+        return self.indices[start:end], self.weights[start:end]
+
+    def edge_weight(self, index: int, other: int):
+        """Get the co-bid count of edge (index, other), or None if absent."""
+        row = slice(self.indptr[index], self.indptr[index + 1])
+        match = np.flatnonzero(self.indices[row] == other)
+        return int(self.weights[row][match[0]]) if len(match) else None
+
+    # ---------- NetworkX-compatible subset ----------
+
+    def _row(self, vendor_id):
+        index = self.node_index(vendor_id)
+        if index is None:
+            raise KeyError(vendor_id)
+        return slice(self.indptr[index], self.indptr[index + 1])
+
+    def __contains__(self, vendor_id) -> bool:
+        return self.node_index(vendor_id) is not None
+
+    def __getitem__(self, vendor_id) -> dict:
+        row = self._row(vendor_id)
+        return {
+            self.vendors.code(neighbor): {"weight": int(weight)}
+            for neighbor, weight in zip(self.indices[row], self.weights[row])
+        }
+
+    def __len__(self) -> int:
+        return len(self.node_order)
+
+    def neighbors(self, vendor_id):
+        """Iterate over a vendor's neighbors, heaviest edge first."""
+        for neighbor in self.indices[self._row(vendor_id)]:
+            yield self.vendors.code(neighbor)
+
+    def get_edge_data(self, u, v, default=None):
+        """Get the attribute dict of edge (u, v)."""
+        index, other = self.node_index(u), self.node_index(v)
+        if index is None or other is None:
+            return default
+        weight = self.edge_weight(index, other)
+        return default if weight is None else {"weight": weight}
+
+    def nodes(self):
+        """Iterate over node codes in the original node order."""
+        for index in self.node_order:
+            yield self.vendors.code(index)
+
+    def number_of_nodes(self) -> int:
+        return len(self.node_order)
+
+    def number_of_edges(self) -> int:
+        return len(self.indices) // 2
+
+
+def csr_from_networkx(graph, vendor_names: dict) -> CSRGraph:
+    """
+    Convert the NetworkX collusion graph and vendor name dict.
+
+    Args:
+        graph: Undirected NetworkX graph with co-bid "weight" edge attributes
+        vendor_names: participant_code -> participant_name dict
+
+    Returns:
+        CSRGraph whose vendors cover both graph nodes and named vendors
+    """
+    names = {str(code): name for code, name in vendor_names.items()}
+    nodes = {str(node): node for node in graph.nodes()}
+    codes = sorted(set(nodes) | set(names))
+    index_of = {code: i for i, code in enumerate(codes)}
+    n_vendors = len(codes)
+
+    node_order = np.array([index_of[code] for code in nodes], dtype=np.int32)
+    in_graph = np.zeros(n_vendors, dtype=np.uint8)
+    in_graph[node_order] = 1
+
+    component = np.full(n_vendors, -1, dtype=np.int32)
+    for component_id, members in enumerate(nx.connected_components(graph)):
+        for node in members:
+            component[index_of[str(node)]] = component_id
+
+    indptr = np.zeros(n_vendors + 1, dtype=np.int64)
+    indices, weights = [], []
+    for i, code in enumerate(codes):
+        if in_graph[i]:
+            # Stable sort keeps the adjacency order between equal weights
+            row = sorted(
+                ((index_of[str(neighbor)], data.get("weight", 1)) for neighbor, data in graph[nodes[code]].items()),
+                key=lambda edge: -edge[1]
+            )
+            indices.extend(neighbor for neighbor, _ in row)
+            weights.extend(weight for _, weight in row)
+        indptr[i + 1] = len(indices)
+
+    encoded = [code.encode("utf-8") for code in codes]
+    width = max((len(code) for code in encoded), default=1)
+    name_offsets, name_blob = pack_strings(
+        "" if names.get(code) is None else str(names[code]) for code in codes
+    )
+    vendors = VendorTable(
+        np.array(encoded, dtype=f"S{width}"),
+        name_offsets,
+        name_blob,
+        np.array([code in names for code in codes], dtype=np.uint8)
+    )
+
+    return CSRGraph(
+        vendors,
+        in_graph,
+        node_order,
+        indptr,
+        np.array(indices, dtype=np.int32),
+        np.array(weights, dtype=np.int32),
+        np.diff(indptr).astype(np.int32),
+        component
+    )
+
+
+def with_updates(graph: CSRGraph, edge_weights: dict, names: dict, new_labels: dict) -> CSRGraph:
+    """
+    Build a new graph with edges added or re-weighted and vendors named.
+
+    The source graph is not modified, so readers holding it are unaffected.
+    Vendors keep their relative order (new codes are inserted into the sorted
+    code array), existing edges keep their position among equal weights and
+    new edges and nodes are appended, as NetworkX add_edge would.
+
+    Args:
+        graph: Current graph
+        edge_weights: (code_a, code_b) -> new co-bid count for changed edges
+        names: code -> name for new or renamed vendors
+        new_labels: code -> component label for vendors that become nodes
+
+    Returns:
+        The updated CSRGraph
+    """
+    vendors = graph.vendors
+    n_old = len(vendors.codes)
+
+    # ---------- Vendor codes ----------
+    touched = dict.fromkeys(code for pair in edge_weights for code in pair)
+    touched.update(dict.fromkeys(names))
+    added = sorted(code for code in touched if vendors.vendor_index(code) is None)
+    if added:
+        encoded = [code.encode("utf-8") for code in added]
+        width = max(vendors.codes.dtype.itemsize, max(len(code) for code in encoded))
+        merged = np.concatenate([
+            np.asarray(vendors.codes).astype(f"S{width}"),
+            np.array(encoded, dtype=f"S{width}")
+        ])
+        order = np.argsort(merged, kind="stable")
+        codes = merged[order]
+        position = np.empty(len(merged), dtype=np.int64)
+        position[order] = np.arange(len(merged))
+        old_to_new = position[:n_old]
+    else:
+        codes = np.asarray(vendors.codes)
+        old_to_new = np.arange(n_old)
+    n_vendors = len(codes)
+    index_of = {code: int(np.searchsorted(codes, code.encode("utf-8"))) for code in touched}
+
+    # ---------- Vendor names (offsets + blob gather) ----------
+    has_name = np.zeros(n_vendors, dtype=np.uint8)
+    has_name[old_to_new] = vendors.has_name
+    lengths = np.zeros(n_vendors, dtype=np.int64)
+    lengths[old_to_new] = np.diff(vendors.name_offsets)
+    source = np.zeros(n_vendors, dtype=np.int64)
+    source[old_to_new] = vendors.name_offsets[:-1]
+
+    extra_offsets, extra_blob = pack_strings("" if name is None else str(name) for name in names.values())
+    for i, code in enumerate(names):
+        index = index_of[code]
+        has_name[index] = 1
+        lengths[index] = extra_offsets[i + 1] - extra_offsets[i]
+        source[index] = len(vendors.name_blob) + extra_offsets[i]
+
+    name_offsets = np.zeros(n_vendors + 1, dtype=np.int64)
+    np.cumsum(lengths, out=name_offsets[1:])
+    gather = np.repeat(source - name_offsets[:-1], lengths) + np.arange(name_offsets[-1])
+    name_blob = np.concatenate([np.asarray(vendors.name_blob), extra_blob])[gather]
+
+    # ---------- Edges ----------
+    rows = old_to_new[np.repeat(np.arange(n_old), np.diff(graph.indptr))]
+    cols = old_to_new[np.asarray(graph.indices)]
+    weights = np.asarray(graph.weights).astype(np.int64)
+
+    update_rows, update_cols, update_weights = [], [], []
+    for (a, b), weight in edge_weights.items():
+        update_rows += [index_of[a], index_of[b]]
+        update_cols += [index_of[b], index_of[a]]
+        update_weights += [weight, weight]
+    update_rows = np.array(update_rows, dtype=np.int64)
+    update_cols = np.array(update_cols, dtype=np.int64)
+    update_weights = np.array(update_weights, dtype=np.int64)
+
+    # Re-weight edges that already exist, append the rest
+    keys = rows * n_vendors + cols
+    update_keys = update_rows * n_vendors + update_cols
+    key_order = np.argsort(keys)
+    found = np.searchsorted(keys[key_order], update_keys)
+    found = np.minimum(found, max(len(keys) - 1, 0))
+    exists = keys[key_order][found] == update_keys if len(keys) else np.zeros(len(update_keys), dtype=bool)
+    weights[key_order[found[exists]]] = update_weights[exists]
+
+    rows = np.concatenate([rows, update_rows[~exists]])
+    cols = np.concatenate([cols, update_cols[~exists]])
+    weights = np.concatenate([weights, update_weights[~exists]])
+
+    edge_order = np.lexsort((np.arange(len(rows)), -weights, rows))
+    degree = np.bincount(rows, minlength=n_vendors)
+    indptr = np.zeros(n_vendors + 1, dtype=np.int64)
+    np.cumsum(degree, out=indptr[1:])
+
+    # ---------- Nodes and components ----------
+    in_graph = np.zeros(n_vendors, dtype=np.uint8)
+    in_graph[old_to_new] = graph.in_graph
+    new_nodes = [index_of[code] for code in touched if code in new_labels]
+    node_order = np.concatenate([old_to_new[np.asarray(graph.node_order)], new_nodes]).astype(np.int32)
+    in_graph[new_nodes] = 1
+
+    component = np.full(n_vendors, -1, dtype=np.int32)
+    component[old_to_new] = graph.component
+    for code, label in new_labels.items():
+        component[index_of[code]] = label
+
+    return CSRGraph(
+        VendorTable(codes, name_offsets, name_blob, has_name),
+        in_graph,
+        node_order,
+        indptr,
+        cols[edge_order].astype(np.int32),
+        weights[edge_order].astype(np.int32),
+        degree.astype(np.int32),
+        component
+    )
+
+
+def _strong_prefix(graph: CSRGraph, index: int, min_weight: int, limit: int) -> slice:
+    """Slice of a row holding its (at most `limit`) strongest edges with weight >= min_weight."""
+    start, end = int(graph.indptr[index]), int(graph.indptr[index + 1])
+    end = min(end, start + limit)
+    # Rows are sorted by weight descending, so the qualifying edges are a prefix
+    count = int(np.searchsorted(-np.asarray(graph.weights[start:end]), -min_weight, side="right"))
+    return slice(start, start + count)
+
+
+def ego_network(graph: CSRGraph, index: int, hops: int, max_nodes: int, max_edges: int,
+                min_weight: int = 1, scan_limit: int = 5000) -> dict:
+    """
+    Bounded breadth-first ego network around a vendor.
+
+    Each hop adds the strongest not-yet-seen neighbors of the frontier until
+    max_nodes is reached, and every row read is capped (at the remaining node
+    budget while expanding, at scan_limit while collecting edges), so the cost
+    is bounded by the caps rather than by hub degrees.
+
+    Args:
+        graph: CSRGraph
+        index: Center vendor id
+        hops: BFS depth
+        max_nodes: Max nodes including the center
+        max_edges: Max edges returned (strongest first)
+        min_weight: Ignore edges with fewer co-bids
+        scan_limit: Max row entries read per node while collecting edges (an
+            edge is only missed if it is outside both endpoints' scans)
+
+    Returns:
+        Dict with node ids (BFS order), their hop distances, edges as
+        (source position, target position, weight) arrays into the node list,
+        and whether any cap cut the result short
+    """
+    nodes = [index]
+    hop_of = [0]
+    seen = {index}
+    truncated = False
+
+    frontier = [index]
+    for hop in range(1, hops + 1):
+        budget = max_nodes - len(nodes)
+        if budget <= 0 or not frontier:
+            truncated = truncated or (budget <= 0 and bool(frontier))
+            break
+
+        neighbors, weights = [], []
+        for node in frontier:
+            row = _strong_prefix(graph, node, min_weight, budget + len(seen))
+            neighbors.append(np.asarray(graph.indices[row]))
+            weights.append(np.asarray(graph.weights[row]))
+        neighbors = np.concatenate(neighbors)
+        weights = np.concatenate(weights)
+
+        # Strongest connection to the frontier first, each new vendor once
+        order = np.argsort(-weights, kind="stable")
+        frontier = []
+        for neighbor in neighbors[order].tolist():
+            if neighbor in seen:
+                continue
+            if len(frontier) >= budget:
+                truncated = True
+                break
+            seen.add(neighbor)
+            frontier.append(neighbor)
+        nodes.extend(frontier)
+        hop_of.extend([hop] * len(frontier))
+
+    # Edges among the selected nodes. Both endpoints' rows are scanned, so an
+    # edge cut from a hub's capped row is still found from the other side.
+    ids = np.array(nodes, dtype=np.int64)
+    rows = [_strong_prefix(graph, node, min_weight, scan_limit) for node in nodes]
+    lengths = np.array([row.stop - row.start for row in rows], dtype=np.int64)
+    sources = np.repeat(ids, lengths)
+    targets = np.concatenate([np.asarray(graph.indices[row]) for row in rows]).astype(np.int64)
+    edge_weights = np.concatenate([np.asarray(graph.weights[row]) for row in rows]).astype(np.int64)
+    hits = np.isin(targets, ids)
+    sources, targets, edge_weights = sources[hits], targets[hits], edge_weights[hits]
+
+    keys = np.minimum(sources, targets) * len(graph.degree) + np.maximum(sources, targets)
+    _, first = np.unique(keys, return_index=True)
+    # Strongest first, ties in discovery order
+    first.sort()
+    order = first[np.argsort(-edge_weights[first], kind="stable")]
+    if len(order) > max_edges:
+        order = order[:max_edges]
+        truncated = True
+
+    # Edge endpoints as positions in the node list
+    position = np.argsort(ids, kind="stable")
+    sorted_ids = ids[position]
+    sources = position[np.searchsorted(sorted_ids, sources[order])]
+    targets = position[np.searchsorted(sorted_ids, targets[order])]
+
+    return {
+        "nodes": ids,
+        "hops": np.array(hop_of, dtype=np.int32),
+        "sources": sources,
+        "targets": targets,
+        "weights": edge_weights[order],
+        "truncated": truncated
+    }
@@ -0,0 +1,329 @@
+"""
+Flat array-based evaluator for the Isolation Forest and Random Forest models.
+
+At load time every tree of a fitted forest is packed into shared NumPy node
+arrays (feature, threshold, children, leaf values). A batch is then pushed
+through all trees at once, one vectorized step per tree level, instead of
+going through sklearn's per-tree estimator machinery on every call.
+"""
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Rows evaluated per traversal block; bounds the (rows x trees) index arrays
+BLOCK_SIZE = 4096
+
+# Larger batches are faster through sklearn's compiled per-tree traversal,
+# so the flat evaluator only handles small, latency-sensitive batches when
+# the sklearn estimator is available
+COMPILED_MAX_ROWS = 128
+
+# Guards the one-time load of estimators attached lazily to artifact forests
+_estimator_lock = threading.Lock()
+
+
+def _average_path_length(n_samples) -> np.ndarray:
+    """Average path length of an unsuccessful BST search over n samples."""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n_samples)
+    result[n_samples == 2] = 1.0
+    mask = n_samples > 2
+    result[mask] = (
+        2.0 * (np.log(n_samples[mask] - 1.0) + np.euler_gamma)
+        - 2.0 * (n_samples[mask] - 1.0) / n_samples[mask]
+    )
+    return result
+
+
+def _node_depths(tree) -> np.ndarray:
+    """Depth of every node in a fitted sklearn tree (root = 0)."""
+    depths = np.zeros(tree.node_count, dtype=np.float64)
+    for node in range(tree.node_count):
+        left, right = tree.children_left[node], tree.children_right[node]
+        if left != -1:
+            depths[left] = depths[right] = depths[node] + 1
+    return depths
+
+
+class FlatForest:
+    """
+    All trees of a forest packed into flat node arrays.
+
+    Child indices are global into the packed arrays; leaves point to
+    themselves so finished rows stay put while deeper trees keep walking.
+    The arrays may be read-only memory maps (see models/artifacts.py).
+
+    Args:
+        roots: Root node index of each tree
+        feature: Input column tested at each node
+        threshold: Split threshold at each node (inf at leaves)
+        left: Left child of each node
+        right: Right child of each node
+        value: Leaf values, shape (n_nodes, n_outputs)
+        max_depth: Depth of the deepest tree
+    """
+
+    ARRAYS = ("roots", "feature", "threshold", "left", "right", "value")
+
+    def __init__(self, roots, feature, threshold, left, right, value, max_depth: int):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_trees(cls, trees, tree_features, leaf_values):
+        """
+        Pack fitted sklearn trees.
+
+        Args:
+            trees: Fitted sklearn Tree objects (estimator.tree_)
+            tree_features: Per-tree map from tree feature index to input column
+                (None when trees see the input columns directly)
+            leaf_values: Per-tree arrays of shape (node_count, n_outputs)
+        """
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        roots = offsets[:-1].astype(np.int64)
+
+        features, thresholds, left, right = [], [], [], []
+        for tree, feature_map, offset in zip(trees, tree_features, roots):
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(tree.node_count) + offset
+            feature = np.where(is_leaf, 0, tree.feature)
+            if feature_map is not None:
+                feature = np.asarray(feature_map)[feature]
+            features.append(feature)
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            right.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+
+        return cls(
+            roots=roots,
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(left).astype(np.int64),
+            right=np.concatenate(right).astype(np.int64),
+            value=np.concatenate(leaf_values),
+            max_depth=max(tree.max_depth for tree in trees)
+        )
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Find the leaf each row reaches in every tree.
+
+        Args:
+            X: float32 matrix of shape (n, n_features)
+
+        Returns:
+            Global leaf indices of shape (n, n_trees)
+        """
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        rows = np.arange(len(X))[:, None]
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def leaf_sum(self, X: np.ndarray) -> np.ndarray:
+        """Sum of leaf values over all trees, shape (n, n_outputs)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        total = np.zeros((len(X), self.value.shape[1]), dtype=np.float64)
+        for start in range(0, len(X), BLOCK_SIZE):
+            block = X[start:start + BLOCK_SIZE]
+            total[start:start + BLOCK_SIZE] = self.value[self.apply(block)].sum(axis=1)
+        return total
+
+
+class _SklearnHandoff:
+    """
+    Delegation of large batches to the source sklearn estimator.
+
+    Forests loaded from an artifact only carry a load_estimator callable;
+    the estimator is then unpickled on the first batch that needs it.
+    """
+
+    estimator = None
+    load_estimator = None
+
+    def _large_batch_estimator(self, X):
+        """The sklearn estimator to score X with, or None to use the flat arrays."""
+        if len(X) <= COMPILED_MAX_ROWS:
+            return None
+        if self.estimator is None and self.load_estimator is not None:
+            with _estimator_lock:
+                if self.estimator is None and self.load_estimator is not None:
+                    try:
+                        self.estimator = self.load_estimator()
+                    except Exception as e:
+                        print(f"⚠️ Could not load the sklearn estimator, using the compiled forest: {e}")
+                    self.load_estimator = None
+        return self.estimator
+
+    def _as_estimator_input(self, X):
+        """Wrap a bare matrix with the feature names the estimator was fitted on."""
+        names = getattr(self.estimator, "feature_names_in_", None)
+        if names is not None and not hasattr(X, "columns"):
+            return pd.DataFrame(X, columns=names, copy=False)
+        return X
+
+
+class CompiledIsolationForest(_SklearnHandoff):
+    """
+    Drop-in decision_function/score_samples/predict for a fitted IsolationForest.
+
+    Batches above COMPILED_MAX_ROWS are delegated to the sklearn estimator
+    when one is attached or can be loaded.
+
+    Args:
+        forest: FlatForest whose leaf values are path lengths
+        offset: The estimator's offset_
+        denominator: n_trees x average path length of max_samples
+        estimator: Source sklearn IsolationForest, if available
+        load_estimator: Callable loading the source estimator on first use
+    """
+
+    def __init__(self, forest: FlatForest, offset: float, denominator: float, estimator=None, load_estimator=None):
+        self.forest = forest
+        self.offset_ = offset
+        self.denominator = denominator
+        self.estimator = estimator
+        self.load_estimator = load_estimator
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        """Compile a fitted sklearn IsolationForest."""
+        n_features = estimator.n_features_in_
+
+        trees, tree_features, leaf_values = [], [], []
+        for tree_estimator, features in zip(estimator.estimators_, estimator.estimators_features_):
+            tree = tree_estimator.tree_
+            trees.append(tree)
+            tree_features.append(features if len(features) != n_features else None)
+            # Path length to a leaf plus the expected remaining depth of its samples
+            path_length = _node_depths(tree) + _average_path_length(tree.n_node_samples)
+            leaf_values.append(path_length[:, None])
+
+        denominator = len(trees) * _average_path_length([estimator.max_samples_])[0]
+        return cls(FlatForest.from_trees(trees, tree_features, leaf_values), estimator.offset_, denominator, estimator)
+
+    def score_samples(self, X) -> np.ndarray:
+        """Opposite of the anomaly score, as IsolationForest.score_samples."""
+        if self._large_batch_estimator(X) is not None:
+            return self.estimator.score_samples(self._as_estimator_input(X))
+        depths = self.forest.leaf_sum(np.asarray(X))[:, 0]
+        if self.denominator == 0:
+            return -np.ones_like(depths)
+        return -(2 ** (-depths / self.denominator))
+
+    def decision_function(self, X) -> np.ndarray:
+        """Anomaly score shifted by offset_ (negative = anomaly)."""
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X) -> np.ndarray:
+        """-1 for anomalies, 1 for normal samples."""
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+
+class CompiledRandomForest(_SklearnHandoff):
+    """
+    Drop-in predict_proba/predict for a fitted single-output RandomForestClassifier.
+
+    Batches above COMPILED_MAX_ROWS are delegated to the sklearn estimator
+    when one is attached or can be loaded.
+
+    Args:
+        forest: FlatForest whose leaf values are class fractions
+        classes: The estimator's classes_
+        estimator: Source sklearn RandomForestClassifier, if available
+        load_estimator: Callable loading the source estimator on first use
+    """
+
+    def __init__(self, forest: FlatForest, classes, estimator=None, load_estimator=None):
+        self.forest = forest
+        self.classes_ = classes
+        self.n_trees = len(forest.roots)
+        self.estimator = estimator
+        self.load_estimator = load_estimator
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        """Compile a fitted sklearn RandomForestClassifier."""
+        trees, leaf_values = [], []
+        for tree_estimator in estimator.estimators_:
+            tree = tree_estimator.tree_
+            trees.append(tree)
+            value = tree.value[:, 0, :]
+            leaf_values.append(value / value.sum(axis=1, keepdims=True))
+
+        forest = FlatForest.from_trees(trees, [None] * len(trees), leaf_values)
+        return cls(forest, estimator.classes_, estimator)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Mean class probabilities over all trees."""
+        if self._large_batch_estimator(X) is not None:
+            return self.estimator.predict_proba(self._as_estimator_input(X))
+        return self.forest.leaf_sum(np.asarray(X)) / self.n_trees
+
+    def predict(self, X) -> np.ndarray:
+        """Class with the highest mean probability."""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def make_probe(estimator, n_samples: int = 512) -> np.ndarray:
+    """Random inputs spread over the split thresholds the forest actually uses."""
+    rng = np.random.default_rng(0)
+    n_features = estimator.n_features_in_
+    low, high = np.full(n_features, -1.0), np.full(n_features, 1.0)
+
+    for tree_estimator in estimator.estimators_:
+        tree = tree_estimator.tree_
+        split = tree.children_left != -1
+        for feature, threshold in zip(tree.feature[split], tree.threshold[split]):
+            low[feature] = min(low[feature], threshold)
+            high[feature] = max(high[feature], threshold)
+
+    margin = (high - low) * 0.1
+    return rng.uniform(low - margin, high + margin, size=(n_samples, n_features))
+
+
+def compile_forest(estimator):
+    """
+    Compile a fitted forest and check it against sklearn on a probe batch.
+
+    Args:
+        estimator: Fitted IsolationForest or RandomForestClassifier
+
+    Returns:
+        The compiled model, or the original estimator if it is unsupported
+        or its scores do not match within float tolerance
+    """
+    if not hasattr(estimator, "estimators_"):
+        return estimator
+
+    probe = make_probe(estimator)
+    with warnings.catch_warnings():
+        # The probe is a plain array; the estimators may be fitted on DataFrames
+        warnings.simplefilter("ignore", UserWarning)
+        # The check runs on the flat arrays alone: with the estimator attached
+        # the probe batch would be handed straight back to sklearn
+        if hasattr(estimator, "offset_"):
+            compiled = CompiledIsolationForest.from_estimator(estimator)
+            compiled.estimator = None
+            expected, actual = estimator.decision_function(probe), compiled.decision_function(probe)
+        elif hasattr(estimator, "predict_proba") and getattr(estimator, "n_outputs_", 0) == 1:
+            compiled = CompiledRandomForest.from_estimator(estimator)
+            compiled.estimator = None
+            expected, actual = estimator.predict_proba(probe), compiled.predict_proba(probe)
+        else:
+            return estimator
+
+    if not np.allclose(expected, actual, rtol=1e-7, atol=1e-9):
+        print(f"⚠️ Compiled {type(estimator).__name__} does not match sklearn, keeping sklearn")
+        return estimator
+    compiled.estimator = estimator
+    return compiled
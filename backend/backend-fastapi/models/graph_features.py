@@ -0,0 +1,167 @@
+"""
+Precomputed centrality and community features of the collusion graph.
+
+Per-vendor columns (indexed by CSRGraph vendor id, -1/0 for vendors
+outside the network):
+    weighted_degree      Total co-bids with connected vendors
+    pagerank             Weighted PageRank
+    pagerank_percentile  Share of network vendors with a lower PageRank
+    clustering           Clustering coefficient
+    community            Louvain community id (largest community = 0)
+plus community_sizes, indexed by community id.
+
+Features are computed once per graph (Louvain takes minutes on the full
+dataset), stored as an artifact next to the graph and read in O(1) per
+request. Compute offline from the backend-fastapi folder with:
+    python -m models.graph_features [--graph PATH] [--out PATH]
+or let the API compute them at startup, in a child process running this
+same command.
+"""
+import argparse
+import time
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+
+FEATURE_ARRAYS = ("weighted_degree", "pagerank", "pagerank_percentile", "clustering", "community", "community_sizes")
+
+# Seed for the Louvain partition, so recomputing gives the same communities
+LOUVAIN_SEED = 42
+
+
+class GraphFeatures:
+    """
+    Columnar vendor features tied to one graph.
+
+    Args:
+        arrays: Dict of FEATURE_ARRAYS
+        fingerprint: CSRGraph.fingerprint() of the graph they were computed on
+    """
+
+    def __init__(self, arrays: dict, fingerprint: str):
+        self.arrays = arrays
+        self.fingerprint = fingerprint
+        for name in FEATURE_ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def for_vendor(self, index: int) -> dict:
+        """Get the features of one vendor id."""
+        community = int(self.community[index])
+        return {
+            "weighted_degree": float(self.weighted_degree[index]),
+            "pagerank": float(self.pagerank[index]),
+            "pagerank_percentile": float(self.pagerank_percentile[index]),
+            "clustering": float(self.clustering[index]),
+            "community_id": community if community >= 0 else None,
+            "community_size": int(self.community_sizes[community]) if community >= 0 else None
+        }
+
+
+def weighted_pagerank(graph, alpha: float = 0.85, max_iter: int = 100, tol: float = 1e-06) -> np.ndarray:
+    """
+    Weighted PageRank by power iteration over the CSR arrays.
+
+    Same parameters and convergence test as networkx.pagerank; every network
+    vendor has at least one edge, so there are no dangling nodes.
+    """
+    n_vendors = len(graph.degree)
+    nodes = np.asarray(graph.in_graph, dtype=bool)
+    n_nodes = int(nodes.sum())
+    if n_nodes == 0:
+        return np.zeros(n_vendors)
+
+    rows = np.repeat(np.arange(n_vendors), np.asarray(graph.degree))
+    cols = np.asarray(graph.indices)
+    weights = np.asarray(graph.weights, dtype=np.float64)
+    out_weight = np.bincount(rows, weights=weights, minlength=n_vendors)
+    share = weights / out_weight[rows]
+
+    rank = np.where(nodes, 1.0 / n_nodes, 0.0)
+    teleport = np.where(nodes, (1.0 - alpha) / n_nodes, 0.0)
+    for _ in range(max_iter):
+        previous = rank
+        rank = alpha * np.bincount(cols, weights=previous[rows] * share, minlength=n_vendors) + teleport
+        if np.abs(rank - previous).sum() < n_nodes * tol:
+            break
+    return rank
+
+
+def compute_graph_features(graph, seed: int = LOUVAIN_SEED) -> GraphFeatures:
+    """
+    Compute all vendor features of a CSRGraph.
+
+    Args:
+        graph: CSRGraph
+        seed: Louvain random seed
+
+    Returns:
+        GraphFeatures for the graph
+    """
+    n_vendors = len(graph.degree)
+    rows = np.repeat(np.arange(n_vendors), np.asarray(graph.degree))
+    cols = np.asarray(graph.indices)
+    weights = np.asarray(graph.weights)
+
+    weighted_degree = np.bincount(rows, weights=weights, minlength=n_vendors)
+    pagerank = weighted_pagerank(graph)
+
+    nodes = np.flatnonzero(graph.in_graph)
+    percentile = np.zeros(n_vendors)
+    if len(nodes) > 1:
+        order = np.argsort(pagerank[nodes], kind="stable")
+        percentile[nodes[order]] = np.arange(len(nodes)) / (len(nodes) - 1)
+
+    # Clustering and Louvain run on an integer-id NetworkX view of the graph
+    upper = rows < cols
+    nx_graph = nx.Graph()
+    nx_graph.add_nodes_from(nodes.tolist())
+    nx_graph.add_weighted_edges_from(zip(rows[upper].tolist(), cols[upper].tolist(), weights[upper].tolist()))
+
+    clustering = np.zeros(n_vendors)
+    for node, value in nx.clustering(nx_graph).items():
+        clustering[node] = value
+
+    communities = nx.community.louvain_communities(nx_graph, weight="weight", seed=seed)
+    communities.sort(key=len, reverse=True)
+    community = np.full(n_vendors, -1, dtype=np.int32)
+    for community_id, members in enumerate(communities):
+        community[list(members)] = community_id
+
+    arrays = {
+        "weighted_degree": weighted_degree,
+        "pagerank": pagerank,
+        "pagerank_percentile": percentile,
+        "clustering": clustering,
+        "community": community,
+        "community_sizes": np.array([len(members) for members in communities], dtype=np.int32)
+    }
+    return GraphFeatures(arrays, graph.fingerprint())
+
+
+if __name__ == "__main__":
+    from models.artifacts import load_graph, save_graph_features
+
+    parser = argparse.ArgumentParser(description="Precompute collusion graph features")
+    parser.add_argument("--graph", type=Path, help="Exported graph artifact folder (default: the configured graph)")
+    parser.add_argument("--out", type=Path, help="Output folder (default: graph_features in the artifacts folder)")
+    parser.add_argument("--seed", type=int, default=LOUVAIN_SEED)
+    args = parser.parse_args()
+
+    # The API passes both paths, so its child process skips importing the loader
+    started = time.perf_counter()
+    if args.graph is not None:
+        graph = load_graph(args.graph)
+    else:
+        from models.loader import load_bid_rigging_graph
+        graph = load_bid_rigging_graph()
+    if args.out is None:
+        from models.loader import ARTIFACTS_FOLDER
+        args.out = ARTIFACTS_FOLDER / "graph_features"
+
+    features = compute_graph_features(graph, args.seed)
+    save_graph_features(features, args.out)
+    print(
+        f"✅ Wrote {args.out}: {len(features.community_sizes):,} communities "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
@@ -0,0 +1,369 @@
+"""
+Incremental collusion graph updates from new procurement lots.
+
+Mirrors the offline build in bid-rigging-collusion-detector.ipynb: every
+pair of distinct bidders on a lot counts one co-bid, and a pair becomes an
+edge once its count reaches THRESHOLD. New lots update the counts, promote
+pairs that cross the threshold and merge components with a union-find, then
+a new CSRGraph snapshot is built. Readers keep using the snapshot they
+already hold, so ingestion never blocks lookups.
+
+Pairs below the threshold in the offline data are not stored in the graph,
+so their counts start from the lots ingested here. At most MAX_PENDING_PAIRS
+sub-threshold counts are kept; the least recently counted pairs are dropped
+first.
+
+Ingested lots are recorded in a LotJournal next to the graph artifact and
+replayed whenever the graph is loaded, so they survive restarts and reloads
+until the graph is re-exported with them.
+"""
+import itertools
+import json
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process servers only, see serve.py
+    fcntl = None
+
+from models.collusion_graph import CSRGraph, with_updates
+
+# Minimum co-bid count for a vendor pair to become an edge (per the training notebook)
+THRESHOLD = 3
+
+# Max sub-threshold pair counts kept between ingestions
+MAX_PENDING_PAIRS = int(os.getenv("MAX_PENDING_PAIRS", 1_000_000))
+
+# Journal of the ingested lots, in the artifacts folder
+LOT_JOURNAL_FILE = "ingested_lots.jsonl"
+
+
+class UnionFind:
+    """
+    Union-find over integer component labels.
+
+    Args:
+        n_labels: Number of initial labels (0..n_labels - 1)
+    """
+
+    def __init__(self, n_labels: int):
+        self.parent = list(range(n_labels))
+
+    def add(self) -> int:
+        """Create a new singleton label."""
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, label: int) -> int:
+        """Get the root label (with path halving)."""
+        parent = self.parent
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    def union(self, a: int, b: int):
+        """Merge the sets containing labels a and b."""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    def roots(self) -> np.ndarray:
+        """Root label of every label, resolved by vectorized pointer jumping."""
+        roots = np.array(self.parent, dtype=np.int64)
+        while True:
+            jumped = roots[roots]
+            if np.array_equal(jumped, roots):
+                return roots
+            roots = jumped
+
+
+class LotJournal:
+    """
+    Append-only JSON-lines record of the lots ingested into one base graph.
+
+    The first line holds the fingerprint of the base graph (as loaded from
+    the pickles or the artifact), every following line one lot. A journal
+    written for another base graph (re-exported or retrained since) is
+    ignored, and moved aside by the next append. Each append is a single
+    write of whole lines, so readers only ever skip a partial last line.
+
+    Args:
+        path: Journal file
+        base_fingerprint: CSRGraph.fingerprint() of the base graph
+    """
+
+    def __init__(self, path: Path, base_fingerprint: str):
+        self.path = path
+        self.base_fingerprint = base_fingerprint
+
+    def _header(self):
+        """Base fingerprint recorded in the journal, or None if there is no journal."""
+        try:
+            with open(self.path, "rb") as f:
+                line = f.readline()
+        except FileNotFoundError:
+            return None
+        return json.loads(line)["base"] if line.endswith(b"\n") else None
+
+    def stale(self) -> bool:
+        """Check whether the journal was written for another base graph."""
+        base = self._header()
+        return base is not None and base != self.base_fingerprint
+
+    @contextmanager
+    def locked(self):
+        """Hold the journal's file lock, shared by all processes ingesting into it."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Closing the file releases the lock
+            yield
+
+    def read(self, offset: int = 0) -> tuple:
+        """
+        Read the lots appended after a byte offset.
+
+        Args:
+            offset: Offset returned by a previous read() or append()
+
+        Returns:
+            Tuple of (lots, offset after the last complete line); no lots
+            if the journal is missing or stale
+        """
+        if self._header() != self.base_fingerprint:
+            return [], offset
+        with open(self.path, "rb") as f:
+            start = max(offset, len(f.readline()))
+            f.seek(start)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        lots = []
+        for line in data[:end].splitlines():
+            lot = json.loads(line)
+            lots.append((lot["lot_id"], lot["participant_codes"], lot["participant_names"]))
+        return lots, start + end
+
+    def append(self, lots) -> int:
+        """
+        Durably append lots (call with the lock held).
+
+        Args:
+            lots: List of (lot_id, participant_codes, participant_names)
+
+        Returns:
+            Offset after the appended lines
+        """
+        base = self._header()
+        if base is not None and base != self.base_fingerprint:
+            os.replace(self.path, self.path.with_name(f"{self.path.stem}.{base[:12]}{self.path.suffix}"))
+
+        lines = []
+        if self._header() is None:
+            lines.append({"base": self.base_fingerprint})
+        lines += [
+            {"lot_id": lot_id, "participant_codes": list(codes), "participant_names": dict(names or {})}
+            for lot_id, codes, names in lots
+        ]
+        data = "".join(json.dumps(line) + "\n" for line in lines).encode()
+
+        with open(self.path, "ab") as f:
+            # Drop the partial line of an interrupted append
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                with open(self.path, "rb") as tail:
+                    tail.seek(size - 1)
+                    if tail.read(1) != b"\n":
+                        tail.seek(0)
+                        f.truncate(tail.read().rfind(b"\n") + 1)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+
+class GraphUpdater:
+    """
+    Applies new procurement lots to the collusion graph.
+
+    ingest() builds a new CSRGraph without changing the updater's state; the
+    caller records the lots, publishes the graph and then calls commit(), so
+    lots whose update failed to build are not marked as ingested. The
+    previous snapshot is left untouched. Callers serialize these calls.
+
+    With a journal, record() appends the staged lots to it before they are
+    published, and replay() applies the lots other processes (or earlier
+    runs) appended since this updater last read it.
+
+    Args:
+        graph: Current CSRGraph
+        threshold: Co-bid count at which a pair becomes an edge
+        max_pending_pairs: Max sub-threshold pair counts kept
+        journal: LotJournal of the graph, or None to keep lots in memory only
+    """
+
+    def __init__(
+        self,
+        graph: CSRGraph,
+        threshold: int = THRESHOLD,
+        max_pending_pairs: int = MAX_PENDING_PAIRS,
+        journal: LotJournal = None
+    ):
+        self.graph = graph
+        self.threshold = threshold
+        self.max_pending_pairs = max_pending_pairs
+        self.journal = journal
+        self.journal_offset = 0
+        self.pair_counts = OrderedDict()
+        self.seen_lots = set()
+        self._staged = None
+        self._lots = None
+        self._recorded_offset = None
+
+    @contextmanager
+    def locked(self):
+        """Hold the journal lock, so replay() and record() see every other writer's lots."""
+        if self.journal is None:
+            yield
+            return
+        with self.journal.locked():
+            yield
+
+    def replay(self) -> int:
+        """
+        Apply and commit the journal lots this updater has not seen yet.
+
+        Returns:
+            Number of lots ingested (lots already seen are skipped)
+        """
+        if self.journal is None:
+            return 0
+        lots, offset = self.journal.read(self.journal_offset)
+        ingested = 0
+        if lots:
+            _, stats = self.ingest(lots)
+            self.commit()
+            ingested = stats["lots_ingested"]
+        self.journal_offset = offset
+        return ingested
+
+    def record(self):
+        """Append the lots staged by the last ingest() to the journal."""
+        if self.journal is None or not self._lots:
+            return
+        self._recorded_offset = self.journal.append(self._lots)
+
+    def ingest(self, lots) -> tuple:
+        """
+        Count co-bids of new lots and build the updated graph (staged until commit()).
+
+        Args:
+            lots: Iterable of (lot_id, participant_codes, participant_names)
+
+        Returns:
+            Tuple of (new CSRGraph, stats dict)
+        """
+        graph = self.graph
+        labels = UnionFind(int(np.max(graph.component, initial=-1)) + 1)
+        new_labels = {}
+        edge_weights = {}
+        names = {}
+        new_lots = set()
+        # Changed counts of sub-threshold pairs (0 = promoted to an edge)
+        counts = {}
+        added, updated = set(), set()
+        stats = {"lots_ingested": 0, "lots_skipped": 0, "pairs_counted": 0}
+
+        def label_of(code):
+            index = graph.node_index(code)
+            if index is not None:
+                return int(graph.component[index])
+            if code not in new_labels:
+                new_labels[code] = labels.add()
+            return new_labels[code]
+
+        accepted = []
+        for lot in lots:
+            lot_id, participant_codes, participant_names = lot
+            if lot_id in self.seen_lots or lot_id in new_lots:
+                stats["lots_skipped"] += 1
+                continue
+            new_lots.add(lot_id)
+            accepted.append(lot)
+            stats["lots_ingested"] += 1
+            names.update(participant_names or {})
+
+            unique_bidders = sorted(set(map(str, participant_codes)))
+            for pair in itertools.combinations(unique_bidders, 2):
+                stats["pairs_counted"] += 1
+                weight = edge_weights.get(pair)
+                if weight is None:
+                    a, b = graph.node_index(pair[0]), graph.node_index(pair[1])
+                    if a is not None and b is not None:
+                        weight = graph.edge_weight(a, b)
+
+                if weight is not None:
+                    edge_weights[pair] = weight + 1
+                    if pair not in added:
+                        updated.add(pair)
+                    continue
+
+                count = counts.get(pair, self.pair_counts.get(pair, 0)) + 1
+                if count < self.threshold:
+                    counts[pair] = count
+                    continue
+
+                # Pair crossed the threshold: promote it to an edge
+                counts[pair] = 0
+                edge_weights[pair] = count
+                labels.union(label_of(pair[0]), label_of(pair[1]))
+                added.add(pair)
+
+        if edge_weights or names:
+            graph = with_updates(graph, edge_weights, names, new_labels)
+            # Collapse merged labels and renumber components densely
+            nodes = graph.component >= 0
+            roots = labels.roots()[graph.component[nodes]]
+            graph.component[nodes] = np.unique(roots, return_inverse=True)[1]
+
+        stats["edges_added"] = len(added)
+        stats["edges_updated"] = len(updated)
+        self._staged = (graph, new_lots, counts)
+        self._lots = accepted
+        self._recorded_offset = None
+        return graph, stats
+
+    def commit(self) -> dict:
+        """
+        Make the last ingest() the updater's state, once its graph is published.
+
+        Returns:
+            Dict with the number of pending pairs and of pairs dropped to stay
+            within max_pending_pairs
+        """
+        graph, new_lots, counts = self._staged
+        self._staged = None
+        self.graph = graph
+        self.seen_lots |= new_lots
+        if self._recorded_offset is not None:
+            self.journal_offset = self._recorded_offset
+        self._lots = None
+
+        pair_counts = self.pair_counts
+        for pair, count in counts.items():
+            pair_counts.pop(pair, None)
+            if count:
+                # Re-inserted at the end: recently counted pairs are kept longest
+                pair_counts[pair] = count
+
+        evicted = 0
+        while len(pair_counts) > self.max_pending_pairs:
+            pair_counts.popitem(last=False)
+            evicted += 1
+        return {"pending_pairs": len(pair_counts), "pairs_evicted": evicted}
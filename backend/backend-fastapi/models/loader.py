@@ -1,17 +1,96 @@
 """
 Model loader module for loading trained ML models from the llm folder.
+
+Models are loaded in groups (one per router) in parallel background threads,
+warmed up with a probe batch and published into a versioned registry; a
+group can be reloaded at runtime and is swapped in atomically.
 """
 import os
-import joblib
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import joblib
+import numpy as np
+import pandas as pd
+# Packages of the pickled models, imported up front: groups are unpickled in
+# parallel threads, and importing them concurrently can deadlock
+import sklearn.ensemble  # noqa: F401
+import sklearn.feature_extraction.text  # noqa: F401
+import sklearn.linear_model  # noqa: F401
+
+from models.artifacts import (
+    check_artifact,
+    has_artifact,
+    load_forest,
+    load_graph,
+    load_graph_features,
+    save_graph
+)
+from metrics import MODEL_LOAD_SECONDS, MODEL_VERSION
+from models.cartel_index import build_cartel_index
+from models.collusion_graph import csr_from_networkx
+from models.forest import compile_forest
+from models.graph_updates import LOT_JOURNAL_FILE, GraphUpdater, LotJournal
+from models.vendor_search import VendorSearchIndex
+
 # Path to the llm folder containing the trained models
 # backend-fastapi -> backend -> Fraud_Detection -> llm
 LLM_FOLDER = Path(__file__).parent.parent.parent.parent / "llm"
 
-# Global model storage
+# "compiled" swaps the forests for the flat array evaluator in models/forest.py
+FOREST_ENGINE = os.getenv("FOREST_ENGINE", "sklearn").lower()
+
+# Memory-mapped artifacts exported by `python -m models.artifacts`; each model
+# is loaded from here when its artifact exists, else from the pickles. Forest
+# artifacts are only used with FOREST_ENGINE=compiled
+ARTIFACTS_FOLDER = Path(os.getenv("MODEL_ARTIFACTS_DIR", LLM_FOLDER / "artifacts"))
+
+# "off" disables computing missing/stale graph features in a background subprocess
+GRAPH_FEATURES_JOB = os.getenv("GRAPH_FEATURES_JOB", "background").lower()
+
+# "background" (default) serves requests while models load, "blocking" waits
+# for all of them before accepting traffic
+MODEL_LOADING = os.getenv("MODEL_LOADING", "background").lower()
+
+# Comma-separated MODEL_GROUPS loaded on first use instead of at startup
+LAZY_MODELS = {group.strip() for group in os.getenv("LAZY_MODELS", "").split(",") if group.strip()}
+
+# Rows of the warmup batch run on every loaded model before it is published
+PROBE_ROWS = 64
+
+# Global model storage (replaced as a whole on every update, see set_models)
 _models = {}
 
+# Versioned registry: group -> state/version/load time, and running load threads
+_registry_lock = threading.Lock()
+_model_status = {}
+_load_threads = {}
+
+# Background jobs by name (see _start_job): False while running, True if a
+# rerun was requested
+_jobs_lock = threading.Lock()
+_job_pending = {}
+# Child processes of running jobs, stopped at shutdown (see stop_background_jobs)
+_job_processes = set()
+
+
+def _reset_after_fork():
+    """Drop the parent's locks and thread bookkeeping in a forked child (the threads are not copied)."""
+    global _registry_lock, _jobs_lock
+    _registry_lock = threading.Lock()
+    _jobs_lock = threading.Lock()
+    _load_threads.clear()
+    _job_pending.clear()
+    _job_processes.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
 
 def get_llm_folder() -> Path:
     """Get the path to the llm folder."""
@@ -35,63 +114,543 @@ def load_model(filename: str):
     return joblib.load(model_path)
 
 
-def load_all_models():
+def use_artifact(name: str) -> bool:
     """
-    Load all required models at application startup.
+    Check whether a model should be loaded from its artifact.
     
-    Returns:
-        Dict containing all loaded models
+    Artifacts of an older format, or exported from pickles that have changed
+    since, are skipped with a warning so the pickles are loaded instead.
     """
-    global _models
+    folder = ARTIFACTS_FOLDER / name
+    if not has_artifact(folder):
+        return False
+    problem = check_artifact(folder, LLM_FOLDER)
+    if problem is not None:
+        print(f"⚠️ Ignoring {name} artifact ({problem}), re-export with python -m models.artifacts")
+        return False
+    return True
+
+
+def load_bid_rigging_graph():
+    """
+    Load the collusion graph as a CSRGraph.
     
-    # Spending Anomaly Model (Isolation Forest)
-    try:
-        _models["spending_anomaly"] = load_model("spending_anomaly_model.pkl")
+    Uses the mmap artifact when it exists, else converts the pickles; the
+    serving path uses the CSR engine and NetworkX is only needed to convert.
+    """
+    if use_artifact("bid_rigging"):
+        graph = load_graph(ARTIFACTS_FOLDER / "bid_rigging")
+        print("✅ Loaded: bid_rigging artifact (mmap)")
+    else:
+        graph = csr_from_networkx(load_model("bid_rigging_graph.pkl"), load_model("vendor_names.pkl"))
+        print("✅ Loaded: bid_rigging_graph.pkl & vendor_names.pkl")
+    return graph
+
+
+def _probe_frame(model, n_rows: int = PROBE_ROWS):
+    """Zero feature rows for warming a forest (a DataFrame if it was fitted on one)."""
+    # Compiled forests keep their sklearn estimator (None when loaded from an artifact)
+    estimator = model.estimator if hasattr(model, "forest") else model
+    if hasattr(estimator, "n_features_in_"):
+        n_features = estimator.n_features_in_
+    else:
+        n_features = int(np.max(model.forest.feature)) + 1
+    X = np.zeros((n_rows, n_features))
+    names = getattr(estimator, "feature_names_in_", None)
+    return pd.DataFrame(X, columns=names) if names is not None else X
+
+
+def load_spending_models() -> dict:
+    """
+    Load and warm the spending anomaly Isolation Forest.
+    
+    The mmap artifact is only used by the compiled engine; it hands batches
+    above COMPILED_MAX_ROWS to the sklearn estimator, unpickled on first use.
+    """
+    if FOREST_ENGINE == "compiled" and use_artifact("spending_anomaly"):
+        model = load_forest(ARTIFACTS_FOLDER / "spending_anomaly", LLM_FOLDER)
+        print("✅ Loaded: spending_anomaly artifact (mmap)")
+    else:
+        model = load_model("spending_anomaly_model.pkl")
         print("✅ Loaded: spending_anomaly_model.pkl")
-    except Exception as e:
-        print(f"❌ Failed to load spending_anomaly_model.pkl: {e}")
     
-    # Legal Document Scanner (NLP Model + Vectorizer)
-    try:
-        _models["legal_nlp"] = load_model("legal_nlp_model.pkl")
-        _models["text_vectorizer"] = load_model("text_vectorizer.pkl")
-        print("✅ Loaded: legal_nlp_model.pkl & text_vectorizer.pkl")
-    except Exception as e:
-        print(f"❌ Failed to load legal NLP models: {e}")
+    if FOREST_ENGINE == "compiled":
+        model = compile_forest(model)
+        print(f"⚡ Forest engine for spending_anomaly: {type(model).__name__}")
+    
+    scores = model.decision_function(_probe_frame(model))
+    if not np.all(np.isfinite(scores)):
+        raise ValueError("spending_anomaly returned non-finite scores on the probe batch")
+    return {"spending_anomaly": model}
+
+
+def load_legal_models() -> dict:
+    """Load and warm the legal NLP model and its vectorizer."""
+    nlp_model = load_model("legal_nlp_model.pkl")
+    vectorizer = load_model("text_vectorizer.pkl")
+    print("✅ Loaded: legal_nlp_model.pkl & text_vectorizer.pkl")
+    
+    nlp_model.predict_proba(vectorizer.transform(["contract payment approved"] * PROBE_ROWS))
+    return {"legal_nlp": nlp_model, "text_vectorizer": vectorizer}
+
+
+def load_bid_rigging_models() -> dict:
+    """
+    Load the collusion graph and build its cartel and search indexes.
+    
+    Lots ingested through the API since the graph was exported are replayed
+    from the lot journal (see models/graph_updates.py).
+    """
+    graph = load_bid_rigging_graph()
+    updater = GraphUpdater(graph, journal=LotJournal(ARTIFACTS_FOLDER / LOT_JOURNAL_FILE, graph.fingerprint()))
+    if updater.journal.stale():
+        print("⚠️ Ignoring the lot journal of another graph, it is moved aside on the next ingestion")
+    replayed = updater.replay()
+    if replayed:
+        graph = updater.graph
+        print(f"✅ Replayed {replayed} ingested lots from {LOT_JOURNAL_FILE}")
     
-    # Bid Rigging Graph + Vendor Names
+    models = {
+        "bid_rigging_graph": graph,
+        "vendor_names": graph.vendors,
+        "cartel_index": build_cartel_index(graph),
+        "vendor_search": VendorSearchIndex(graph.vendors, graph.degree),
+        "graph_updater": updater
+    }
+    
+    # Precomputed graph features, only if they match the loaded graph
     try:
-        _models["bid_rigging_graph"] = load_model("bid_rigging_graph.pkl")
-        _models["vendor_names"] = load_model("vendor_names.pkl")
-        print("✅ Loaded: bid_rigging_graph.pkl & vendor_names.pkl")
+        if use_artifact("graph_features"):
+            features = load_graph_features(ARTIFACTS_FOLDER / "graph_features")
+            if features.fingerprint == graph.fingerprint():
+                models["graph_features"] = features
+                print("✅ Loaded: graph_features artifact (mmap)")
+            else:
+                print("⚠️ graph_features artifact is stale, ignoring it")
     except Exception as e:
-        print(f"❌ Failed to load bid rigging models: {e}")
+        print(f"❌ Failed to load graph features: {e}")
+    
+    if len(graph):
+        graph.top_neighbors(int(graph.node_order[0]), 10)
+    return models
+
+
+def load_welfare_models() -> dict:
+    """
+    Load and warm the welfare fraud Random Forest.
     
+    As for spending, the mmap artifact is only used by the compiled engine.
+    """
     # Note: welfare-delivery.ipynb saves as 'fraud_detection_model.pkl' but we don't have it
     # The notebook saves to 'Welfare Delivery.pkl' - let's try both
-    try:
+    if FOREST_ENGINE == "compiled" and use_artifact("welfare_fraud"):
+        model = load_forest(ARTIFACTS_FOLDER / "welfare_fraud", LLM_FOLDER)
+        print("✅ Loaded: welfare_fraud artifact (mmap)")
+    else:
         try:
-            _models["welfare_fraud"] = load_model("fraud_detection_model.pkl")
+            model = load_model("fraud_detection_model.pkl")
         except FileNotFoundError:
-            _models["welfare_fraud"] = load_model("Welfare Delivery.pkl")
+            model = load_model("Welfare Delivery.pkl")
         print("✅ Loaded: welfare fraud detection model")
+    
+    if FOREST_ENGINE == "compiled":
+        model = compile_forest(model)
+        print(f"⚡ Forest engine for welfare_fraud: {type(model).__name__}")
+    
+    model.predict_proba(_probe_frame(model))
+    return {"welfare_fraud": model}
+
+
+# Model groups, named after their router: each group is loaded, warmed up and
+# swapped in as one unit and gets its own state and version in /health
+MODEL_GROUPS = {
+    "spending": (load_spending_models, ("spending_anomaly",)),
+    "legal": (load_legal_models, ("legal_nlp", "text_vectorizer")),
+    "bidrigging": (
+        load_bid_rigging_models,
+        ("bid_rigging_graph", "vendor_names", "cartel_index", "vendor_search", "graph_updater")
+    ),
+    "welfare": (load_welfare_models, ("welfare_fraud",))
+}
+
+# Model name -> group name
+_model_groups = {name: group for group, (_, names) in MODEL_GROUPS.items() for name in names}
+
+
+def _new_status() -> dict:
+    return {
+        "state": "pending",
+        "version": 0,
+        "loaded_at": None,
+        "load_seconds": None,
+        "reloading": False,
+        "error": None
+    }
+
+
+def _mark_loading(group: str) -> dict:
+    """Flag a group as loading (or reloading, if a version is active); call with _registry_lock held."""
+    status = _model_status.setdefault(group, _new_status())
+    if status["version"]:
+        status["reloading"] = True
+    else:
+        status["state"] = "loading"
+    return status
+
+
+def load_model_group(group: str) -> bool:
+    """
+    Load, warm up and publish one model group.
+    
+    The new models are swapped in together only after they loaded and passed
+    the probe batch; requests already running keep the previous objects, and
+    if loading fails the previous version stays active.
+    
+    Args:
+        group: Key of MODEL_GROUPS
+        
+    Returns:
+        True if a new version was published
+    """
+    loader, _ = MODEL_GROUPS[group]
+    
+    with _registry_lock:
+        status = _mark_loading(group)
+    
+    started = time.perf_counter()
+    try:
+        models = loader()
     except Exception as e:
-        print(f"❌ Failed to load welfare fraud model: {e}")
+        print(f"❌ Failed to load {group} models: {e}")
+        with _registry_lock:
+            status["reloading"] = False
+            status["error"] = str(e)
+            if not status["version"]:
+                status["state"] = "failed"
+        return False
+    
+    set_models(**models)
+    with _registry_lock:
+        status.update(
+            state="ready",
+            version=status["version"] + 1,
+            loaded_at=time.time(),
+            load_seconds=round(time.perf_counter() - started, 3),
+            reloading=False,
+            error=None
+        )
+    MODEL_LOAD_SECONDS.set(status["load_seconds"], group)
+    MODEL_VERSION.set(status["version"], group)
+    print(f"✅ {group} models ready (version {status['version']}, {status['load_seconds']:.2f}s)")
+    return True
+
+
+def _run_group_load(group: str):
+    """Body of a background load thread."""
+    try:
+        if load_model_group(group) and group == "bidrigging":
+            refresh_graph_features(persist=True)
+    finally:
+        with _registry_lock:
+            _load_threads.pop(group, None)
+
+
+def start_model_group(group: str) -> threading.Thread:
+    """
+    Load (or reload) a model group in a background thread.
     
+    Returns:
+        The loading thread (the running one if the group is already loading)
+    """
+    with _registry_lock:
+        thread = _load_threads.get(group)
+        if thread is None:
+            _mark_loading(group)
+            thread = threading.Thread(target=_run_group_load, args=(group,), name=f"load-{group}", daemon=True)
+            _load_threads[group] = thread
+            thread.start()
+    return thread
+
+
+def start_model_loading():
+    """
+    Start loading all model groups at application startup.
+    
+    Groups load in parallel and each router serves as soon as its own group is
+    ready. Groups listed in LAZY_MODELS are loaded on first use instead. With
+    MODEL_LOADING=blocking startup waits until every non-lazy group is done.
+    Groups that are already loaded (e.g. by the serve.py parent process
+    before forking workers) are kept.
+    """
+    for group in MODEL_GROUPS:
+        with _registry_lock:
+            status = _model_status.setdefault(group, _new_status())
+        if group not in LAZY_MODELS and status["state"] != "ready":
+            start_model_group(group)
+    
+    if MODEL_LOADING == "blocking":
+        wait_for_models()
+
+
+def wait_for_models(groups=None, timeout: float = None):
+    """Wait until the given groups (default: all) are no longer loading."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for group in groups or MODEL_GROUPS:
+        with _registry_lock:
+            thread = _load_threads.get(group)
+        if thread is not None:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+
+def reload_models(groups=None) -> dict:
+    """
+    Reload model groups from disk in the background (hot reload).
+    
+    Args:
+        groups: Group names to reload (default: all)
+        
+    Returns:
+        Status of the reloaded groups
+    """
+    groups = list(groups or MODEL_GROUPS)
+    unknown = [group for group in groups if group not in MODEL_GROUPS]
+    if unknown:
+        raise ValueError(f"Unknown model groups: {', '.join(unknown)}")
+    
+    for group in groups:
+        start_model_group(group)
+    status = get_model_status()
+    return {group: status[group] for group in groups}
+
+
+def load_all_models(groups=None):
+    """
+    Load model groups in parallel and wait for them.
+    
+    Used by process pool workers, which must have every model before they
+    take tasks. Failed groups are reported and skipped.
+    
+    Args:
+        groups: Group names to load (default: all)
+        
+    Returns:
+        Dict containing all loaded models
+    """
+    groups = list(groups or MODEL_GROUPS)
+    with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="load") as pool:
+        list(pool.map(load_model_group, groups))
     return _models
 
 
+def get_model_status() -> dict:
+    """Get a copy of the state, version and load time of every model group."""
+    with _registry_lock:
+        return {group: dict(status) for group, status in _model_status.items()}
+
+
 def get_model(name: str):
     """
     Get a loaded model by name.
     
+    A model of a lazy group that was never loaded starts loading in the
+    background; callers get None (and answer 503) until it is ready.
+    
     Args:
         name: Key name of the model
         
     Returns:
         The model object or None if not found
     """
-    return _models.get(name)
+    model = _models.get(name)
+    if model is None:
+        group = _model_groups.get(name)
+        if group in LAZY_MODELS and _model_status.get(group, {}).get("state") == "pending":
+            start_model_group(group)
+    return model
+
+
+def get_models(*names) -> tuple:
+    """
+    Get several models from the same registry snapshot.
+    
+    Use this for models that must match each other (e.g. a classifier and
+    its vectorizer), so a reload between two lookups cannot mix versions.
+    """
+    models = _models
+    for name in names:
+        if name not in models:
+            get_model(name)
+    return tuple(models.get(name) for name in names)
+
+
+def set_models(**models):
+    """
+    Publish updated models.
+    
+    The registry dict is replaced, never mutated, so a snapshot taken by
+    get_models() stays consistent and requests that already fetched the
+    previous objects keep using them.
+    """
+    global _models
+    
+    with _registry_lock:
+        _models = {**_models, **models}
+
+
+def _start_job(name: str, work):
+    """
+    Run work() in a background thread, coalescing requests.
+    
+    A job requested while it is running runs once more afterwards, so the
+    last request always sees the latest models.
+    
+    Returns:
+        The job thread, or None if the job is already running
+    """
+    def run():
+        while True:
+            try:
+                work()
+            except Exception as e:
+                print(f"❌ Background job {name} failed: {e}")
+            
+            with _jobs_lock:
+                if not _job_pending[name]:
+                    del _job_pending[name]
+                    return
+                _job_pending[name] = False
+    
+    with _jobs_lock:
+        if name in _job_pending:
+            _job_pending[name] = True
+            return None
+        _job_pending[name] = False
+    
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def swap_models(expected: dict, **models) -> bool:
+    """
+    Publish updated models only if the registry still holds the expected objects.
+    
+    A compare-and-swap for updates derived from a model (e.g. an ingested
+    graph), so they never overwrite a version that a reload published in
+    the meantime.
+    
+    Args:
+        expected: Model name -> object the update was derived from
+        
+    Returns:
+        True if the models were published
+    """
+    global _models
+    
+    with _registry_lock:
+        if any(_models.get(name) is not model for name, model in expected.items()):
+            return False
+        _models = {**_models, **models}
+        return True
+
+
+def _compute_graph_features(graph, folder: Path = None):
+    """
+    Compute the features of a graph in a child process.
+    
+    Runs `python -m models.graph_features` on a temporary export of the
+    graph. Clustering and Louvain hold the GIL for minutes and build a
+    NetworkX copy of the whole graph; in a child process they do not stall
+    requests, and that memory goes back to the OS when the child exits.
+    
+    Args:
+        graph: CSRGraph
+        folder: Artifact folder to write (replaced atomically), or None to
+            keep the features only in memory
+        
+    Returns:
+        The features, memory-mapped from the written files
+    """
+    with tempfile.TemporaryDirectory(prefix="graph-features-") as tmp:
+        graph_folder = Path(tmp) / "bid_rigging"
+        folder = folder or Path(tmp) / "graph_features"
+        save_graph(graph, graph_folder)
+        process = subprocess.Popen(
+            [sys.executable, "-m", "models.graph_features", "--graph", str(graph_folder), "--out", str(folder)],
+            cwd=Path(__file__).parent.parent
+        )
+        _job_processes.add(process)
+        try:
+            returncode = process.wait()
+        finally:
+            _job_processes.discard(process)
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, process.args)
+        # Memory maps stay valid once the temporary files are removed
+        return load_graph_features(folder)
+
+
+def refresh_graph_features(persist: bool = False):
+    """
+    Compute graph features for the current graph in a background subprocess.
+    
+    A thread waits for the child process (see _compute_graph_features) and
+    publishes the result. Lookups keep working without features (or with
+    the previous ones) until the new ones are published. A refresh requested
+    while one is running is run once more afterwards, for the latest graph.
+    
+    Args:
+        persist: Also write the features artifact (for the graph loaded at startup)
+        
+    Returns:
+        The job thread, or None if the job is disabled or already running
+    """
+    if GRAPH_FEATURES_JOB == "off":
+        return None
+    
+    def work():
+        graph = _models.get("bid_rigging_graph")
+        features = _models.get("graph_features")
+        if graph is None or (features is not None and features.fingerprint == graph.fingerprint()):
+            return
+        
+        started = time.perf_counter()
+        try:
+            features = _compute_graph_features(graph, ARTIFACTS_FOLDER / "graph_features" if persist else None)
+            swap_models({"bid_rigging_graph": graph}, graph_features=features)
+            print(f"✅ Computed graph features in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            print(f"❌ Failed to compute graph features: {e}")
+    
+    return _start_job("graph-features", work)
+
+
+def stop_background_jobs():
+    """Stop the child processes of running jobs, so they do not outlive the API."""
+    for process in list(_job_processes):
+        process.terminate()
+
+
+def refresh_vendor_search():
+    """
+    Rebuild the vendor search index for the current graph in a background thread.
+    
+    Search keeps answering from the previous index until the new one is
+    published. Each index carries its own vendor table, so its results stay
+    consistent; vendors added since are just not found yet.
+    
+    Returns:
+        The job thread, or None if a rebuild is already running
+    """
+    def work():
+        graph = _models.get("bid_rigging_graph")
+        if graph is None:
+            return
+        
+        search_index = VendorSearchIndex(graph.vendors, graph.degree)
+        swap_models({"bid_rigging_graph": graph}, vendor_search=search_index)
+    
+    return _start_job("vendor-search", work)
 
 
 def get_all_models():
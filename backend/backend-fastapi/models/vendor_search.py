@@ -0,0 +1,159 @@
+"""
+Vendor search and autocomplete index over the vendor name table.
+
+Names are normalized (case-folded, punctuation collapsed to spaces) and
+indexed two ways at load time:
+    - sorted full names and a sorted word list for prefix autocomplete
+    - a trigram inverted index for substring queries of 3+ characters
+Vendor codes are matched by prefix directly on the sorted code array.
+
+Matches are grouped into tiers (exact code, exact name, name prefix, code
+prefix, word prefix, substring) and ordered by connection count within a
+tier. Every tier reads only its best connected candidates, so a query that
+matches a very common fragment (e.g. a legal form like "тов") stays fast.
+"""
+import bisect
+import re
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+# Rank classes, best first
+EXACT_CODE, EXACT_NAME, NAME_PREFIX, CODE_PREFIX, WORD_PREFIX, SUBSTRING = range(6)
+
+
+def normalize(text: str) -> str:
+    """Case-fold and collapse everything but letters and digits to single spaces."""
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+
+def trigrams(text: str) -> set:
+    """Distinct character trigrams of a normalized string."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class VendorSearchIndex:
+    """
+    Search index over a VendorTable.
+
+    Args:
+        vendors: VendorTable of the collusion graph
+        degree: Connection count per vendor id (used to order matches)
+    """
+
+    def __init__(self, vendors, degree):
+        self.vendors = vendors
+        self.degree = np.asarray(degree)
+
+        named = np.flatnonzero(vendors.has_name)
+        # Best connected vendors first, so positions are in relevance order
+        named = named[np.argsort(-self.degree[named], kind="stable")]
+        self.rank_order = named.astype(np.int32)
+        self.names = [normalize(vendors.name(int(index))) for index in named]
+
+        by_name = sorted(range(len(self.names)), key=self.names.__getitem__)
+        self.sorted_names = [self.names[position] for position in by_name]
+        self.name_positions = np.array(by_name, dtype=np.int32)
+
+        postings = {}
+        words = []
+        for position, name in enumerate(self.names):
+            for gram in trigrams(name):
+                postings.setdefault(gram, []).append(position)
+            for word in set(name.split()):
+                words.append((word, position))
+
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        words.sort()
+        self.words = [word for word, _ in words]
+        self.word_positions = np.array([position for _, position in words], dtype=np.int32)
+
+    @staticmethod
+    def _prefix_range(keys: list, prefix: str) -> tuple:
+        start = bisect.bisect_left(keys, prefix)
+        return start, bisect.bisect_left(keys, prefix + "\U0010ffff", lo=start)
+
+    def _code_matches(self, query: str, limit: int) -> np.ndarray:
+        """Best connected vendor ids whose code starts with the raw query."""
+        codes = self.vendors.codes
+        key = query.encode("utf-8")
+        if len(key) > codes.dtype.itemsize:
+            return np.zeros(0, dtype=np.int64)
+        start = int(np.searchsorted(codes, key, side="left"))
+        end = int(np.searchsorted(codes, key + b"\xff", side="left"))
+        matches = np.arange(start, end)
+        return matches[np.argsort(-self.degree[matches], kind="stable")[:limit]]
+
+    def _substring_matches(self, text: str, limit: int, exclude: set) -> list:
+        """Best connected index positions whose name contains the text."""
+        lists = []
+        for gram in trigrams(text):
+            ids = self.postings.get(gram)
+            if ids is None:
+                return []
+            lists.append(ids)
+
+        lists.sort(key=len)
+        candidates = lists[0]
+        for ids in lists[1:]:
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+
+        matches = []
+        for position in candidates.tolist():
+            if position not in exclude and text in self.names[position]:
+                matches.append(position)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """
+        Find vendors by code prefix or partial name.
+
+        Each match tier contributes its `limit` best connected vendors, and
+        the substring tier is only searched when the others come up short.
+
+        Args:
+            query: Raw search text
+            limit: Max number of results
+
+        Returns:
+            Vendor ids, best match first
+        """
+        query = query.strip()
+        text = normalize(query)
+        ranked = {}
+
+        def add(index: int, match_class: int):
+            if match_class < ranked.get(index, SUBSTRING + 1):
+                ranked[index] = match_class
+
+        if query:
+            exact = self.vendors.vendor_index(query)
+            if exact is not None:
+                add(exact, EXACT_CODE)
+            for index in self._code_matches(query, limit).tolist():
+                add(index, CODE_PREFIX)
+
+        positions = {}
+        if text:
+            start, end = self._prefix_range(self.sorted_names, text)
+            for position in np.sort(self.name_positions[start:end])[:limit].tolist():
+                positions[position] = EXACT_NAME if self.names[position] == text else NAME_PREFIX
+            exact_end = bisect.bisect_right(self.sorted_names, text, lo=start, hi=end)
+            for position in self.name_positions[start:exact_end].tolist():
+                positions[position] = EXACT_NAME
+
+            start, end = self._prefix_range(self.words, text)
+            for position in np.unique(self.word_positions[start:end])[:limit].tolist():
+                positions.setdefault(position, WORD_PREFIX)
+
+            if len(positions) < limit and len(text) >= 3:
+                for position in self._substring_matches(text, limit, positions.keys()):
+                    positions[position] = SUBSTRING
+
+        for position, match_class in positions.items():
+            add(int(self.rank_order[position]), match_class)
+
+        return sorted(ranked, key=lambda index: (ranked[index], -int(self.degree[index]), index))[:limit]
@@ -1,14 +1,293 @@
 """
 Bid Rigging & Collusion Detection Router.
-Uses NetworkX graph to detect cartels and collusion patterns.
+Uses the CSR collusion graph (models/collusion_graph.py) to detect cartels
+and collusion patterns.
 """
-from fastapi import APIRouter, HTTPException
-import networkx as nx
+import base64
+import os
+import signal
+import threading
+from typing import Optional
 
-from models.loader import get_model
-from schemas import BidRiggingRequest, BidRiggingResponse, ConnectionInfo
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
 
-router = APIRouter(prefix="/bidrigging", tags=["Bid Rigging Detection"])
+from admin import require_admin
+from executor import run_blocking
+from metrics import TimedRoute, observe_batch, stage
+from models.cartel_index import MIN_CARTEL_SIZE, build_cartel_index, get_cartel_size
+from models.collusion_graph import ego_network
+from models.loader import get_model, get_models, refresh_graph_features, refresh_vendor_search, swap_models
+from schemas import (
+    BidRiggingBatchRequest,
+    BidRiggingBatchResponse,
+    BidRiggingRequest,
+    BidRiggingResponse,
+    CollusionEdge,
+    ConnectionInfo,
+    EgoNetworkNode,
+    EgoNetworkResponse,
+    GraphFeatureInfo,
+    LotIngestRequest,
+    LotIngestResponse,
+    VendorScreeningResult,
+    VendorSearchResponse,
+    VendorSearchResult
+)
+
+router = APIRouter(prefix="/bidrigging", tags=["Bid Rigging Detection"], route_class=TimedRoute)
+
+# Lot risk score = 100 x weighted mix of collusion edge density among the
+# participants and the share of participants sharing a cartel with another
+EDGE_DENSITY_WEIGHT = 0.5
+SHARED_CARTEL_WEIGHT = 0.5
+LOT_HIGH_RISK_SCORE = 50
+LOT_MEDIUM_RISK_SCORE = 20
+
+# Ego network caps (hard limits on the query parameters)
+EGO_MAX_HOPS = 3
+EGO_MAX_NODES = 2000
+EGO_MAX_EDGES = 10000
+
+# Serializes ingestion in this process (the journal lock serializes processes)
+_ingest_lock = threading.Lock()
+
+
+def get_top_connections(graph, index: int, limit: int = 10) -> list[ConnectionInfo]:
+    """Get a vendor's strongest connections (most co-bids first)."""
+    vendors = graph.vendors
+    
+    # CSR rows are pre-sorted by weight, so the top `limit` is a slice
+    neighbors, weights = graph.top_neighbors(index, limit)
+    
+    top_connections = []
+    for neighbor, weight in zip(neighbors.tolist(), weights.tolist()):
+        neighbor_name = vendors.name(neighbor, "Unknown")
+        top_connections.append(ConnectionInfo(
+            vendor_id=vendors.code(neighbor),
+            vendor_name=neighbor_name[:50] if neighbor_name else None,
+            connection_weight=weight
+        ))
+    return top_connections
+
+
+def get_vendor_page(graph, limit: int, start: int) -> list[dict]:
+    """Get one page of vendors with their connection counts (a view of node_order, no copy)."""
+    vendors = graph.vendors
+    
+    page = []
+    for index in graph.node_order[start:start + limit].tolist():
+        name = vendors.name(index, "Unknown")
+        page.append({
+            "vendor_id": vendors.code(index),
+            "vendor_name": name[:100] if name else "Unknown",
+            "connection_count": int(graph.degree[index])
+        })
+    return page
+
+
+def encode_cursor(vendor_id: str) -> str:
+    """Opaque list cursor for the page after a vendor."""
+    return base64.urlsafe_b64encode(vendor_id.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(graph, cursor: str) -> int:
+    """Get the node_order position a list cursor continues from (400 if invalid)."""
+    try:
+        vendor_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    except ValueError:
+        vendor_id = None
+    index = graph.node_index(vendor_id) if vendor_id else None
+    if index is None:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return graph.node_position(index) + 1
+
+
+def get_graph_features(graph):
+    """Get the precomputed features of this graph, or None if missing or stale."""
+    features = get_model("graph_features")
+    if features is None or features.fingerprint != graph.fingerprint():
+        return None
+    return features
+
+
+def vendor_risk_level(is_in_cartel: bool, group_size, total_connections: int) -> str:
+    """
+    Risk level of a single vendor from its cartel membership and connections.
+    
+    `group_size` is the vendor's Louvain community size when graph features
+    are available (giant components make the component size meaningless),
+    else its cartel (component) size.
+    """
+    if is_in_cartel and group_size >= 10:
+        return "🔴 HIGH (Large Cartel Detected)"
+    elif is_in_cartel:
+        return "🟡 MEDIUM (Cartel Member)"
+    elif total_connections > 50:
+        return "🟡 MEDIUM (Many Connections)"
+    return "🟢 LOW (Normal Bidding Pattern)"
+
+
+def screen_participants(graph, cartel_index, vendor_ids: list[str]) -> dict:
+    """
+    Screen a lot's participants in one pass over their CSR rows.
+    
+    Args:
+        graph: CSRGraph
+        cartel_index: Cartel index of the graph
+        vendor_ids: Participant codes (duplicates are ignored)
+        
+    Returns:
+        Dict with per-vendor results, pairwise collusion edges, participants
+        grouped by shared cartel and the lot-level risk score
+    """
+    vendor_ids = list(dict.fromkeys(vendor_ids))
+    vendors = graph.vendors
+    features = get_graph_features(graph)
+    
+    results = []
+    members = {}
+    for vendor_id in vendor_ids:
+        index = graph.node_index(vendor_id)
+        if index is None:
+            results.append(VendorScreeningResult(
+                vendor_id=vendor_id,
+                vendor_name=vendors.get(vendor_id),
+                in_network=False,
+                total_connections=0,
+                is_in_cartel=False,
+                cartel_size=None,
+                risk_level=vendor_risk_level(False, None, 0)
+            ))
+            continue
+        
+        members[index] = vendor_id
+        total_connections = int(graph.degree[index])
+        cartel_size = get_cartel_size(cartel_index, vendor_id)
+        is_in_cartel = cartel_size is not None and cartel_size >= MIN_CARTEL_SIZE
+        vendor_features = GraphFeatureInfo(**features.for_vendor(index)) if features is not None else None
+        group_size = vendor_features.community_size if vendor_features is not None else cartel_size
+        name = vendors.name(index, "Unknown")
+        results.append(VendorScreeningResult(
+            vendor_id=vendor_id,
+            vendor_name=name[:100] if name else None,
+            in_network=True,
+            total_connections=total_connections,
+            is_in_cartel=is_in_cartel,
+            cartel_size=cartel_size,
+            risk_level=vendor_risk_level(is_in_cartel, group_size, total_connections),
+            graph_features=vendor_features
+        ))
+    
+    # Edges among participants: neighbors of each participant that are participants too
+    ids = np.fromiter(members, dtype=np.int64, count=len(members))
+    edges = []
+    for index in ids.tolist():
+        row = slice(graph.indptr[index], graph.indptr[index + 1])
+        neighbors = graph.indices[row]
+        hits = np.flatnonzero(np.isin(neighbors, ids))
+        for neighbor, weight in zip(neighbors[hits].tolist(), graph.weights[row][hits].tolist()):
+            if index < neighbor:
+                edges.append(CollusionEdge(
+                    vendor_a=members[index],
+                    vendor_b=members[neighbor],
+                    connection_weight=weight
+                ))
+    edges.sort(key=lambda edge: edge.connection_weight, reverse=True)
+    
+    # Participants that share a cartel (a component of at least MIN_CARTEL_SIZE vendors)
+    by_component = {}
+    for index in ids.tolist():
+        by_component.setdefault(int(graph.component[index]), []).append(members[index])
+    shared_cartels = [
+        group for group in by_component.values()
+        if len(group) > 1 and get_cartel_size(cartel_index, group[0]) >= MIN_CARTEL_SIZE
+    ]
+    
+    n_pairs = len(vendor_ids) * (len(vendor_ids) - 1) // 2
+    edge_density = len(edges) / n_pairs if n_pairs else 0.0
+    shared_share = sum(len(group) for group in shared_cartels) / len(vendor_ids)
+    lot_risk_score = round(100 * (EDGE_DENSITY_WEIGHT * edge_density + SHARED_CARTEL_WEIGHT * shared_share), 2)
+    
+    if lot_risk_score >= LOT_HIGH_RISK_SCORE:
+        lot_risk_level = "🔴 HIGH (Colluding Participants)"
+    elif lot_risk_score >= LOT_MEDIUM_RISK_SCORE:
+        lot_risk_level = "🟡 MEDIUM (Linked Participants)"
+    else:
+        lot_risk_level = "🟢 LOW (Independent Bidders)"
+    
+    return {
+        "vendors": results,
+        "collusion_edges": edges,
+        "shared_cartels": shared_cartels,
+        "lot_risk_score": lot_risk_score,
+        "lot_risk_level": lot_risk_level
+    }
+
+
+def publish_graph(base, updater, graph) -> dict:
+    """
+    Publish an updated graph with its cartel index over the graph it was built from.
+    
+    Returns:
+        The cartel index, or None if a reload published another graph meanwhile
+    """
+    cartel_index = build_cartel_index(graph)
+    if not swap_models(
+        {"bid_rigging_graph": base, "graph_updater": updater},
+        bid_rigging_graph=graph,
+        vendor_names=graph.vendors,
+        cartel_index=cartel_index
+    ):
+        return None
+    return cartel_index
+
+
+def ingest_lots(lots) -> dict:
+    """
+    Apply new lots to the graph and publish the updated snapshot (runs on the blocking pool).
+    
+    The lots are appended to the lot journal before the new graph is
+    published, so they are replayed on the next load even if this process
+    stops right after answering.
+    """
+    lots = [(lot.lot_id, lot.participant_codes, lot.participant_names) for lot in lots]
+    with _ingest_lock:
+        base, updater = get_models("bid_rigging_graph", "graph_updater")
+        with updater.locked():
+            # First catch up with the lots journaled by other serve.py workers
+            updater.replay()
+            graph, stats = updater.ingest(lots)
+            updater.record()
+        
+        cartel_index = publish_graph(base, updater, graph)
+        if cartel_index is not None:
+            # Only now mark the lots as ingested: if anything above raised,
+            # the next replay() or a retry of the same lots applies them
+            stats.update(updater.commit())
+        else:
+            # A reload published another graph meanwhile. Its updater reads
+            # the journal, which now holds these lots too: catch it up
+            while cartel_index is None:
+                base, updater = get_models("bid_rigging_graph", "graph_updater")
+                with updater.locked():
+                    updater.replay()
+                cartel_index = publish_graph(base, updater, updater.graph)
+            stats.update(pending_pairs=len(updater.pair_counts), pairs_evicted=0)
+    
+    if stats["lots_ingested"]:
+        supervisor_pid = os.getenv("FRAUD_API_SUPERVISOR_PID")
+        if supervisor_pid:
+            # serve.py reloads the graph (replaying the journal) in the parent
+            # and replaces the workers, so every worker serves these lots
+            os.kill(int(supervisor_pid), signal.SIGUSR1)
+        else:
+            # The centrality and communities are rebuilt in the background
+            refresh_graph_features()
+        refresh_vendor_search()
+    
+    stats.update(cartel_index["stats"])
+    return stats
 
 
 @router.post("/analyze", response_model=BidRiggingResponse)
@@ -21,10 +300,9 @@ async def analyze_vendor(request: BidRiggingRequest):
     - Cartel membership (connected components)
     - Suspicious connection patterns
     """
-    graph = get_model("bid_rigging_graph")
-    vendor_names = get_model("vendor_names")
+    graph, vendor_names, cartel_index = get_models("bid_rigging_graph", "vendor_names", "cartel_index")
     
-    if graph is None or vendor_names is None:
+    if graph is None or vendor_names is None or cartel_index is None:
         raise HTTPException(
             status_code=503, 
             detail="Bid rigging models not loaded"
@@ -33,62 +311,35 @@ async def analyze_vendor(request: BidRiggingRequest):
     vendor_id = request.vendor_id
     
     # Check if vendor exists in graph
-    if vendor_id not in graph:
+    index = graph.node_index(vendor_id)
+    if index is None:
         raise HTTPException(
             status_code=404,
             detail=f"Vendor {vendor_id} not found in network"
         )
     
     # Get vendor name
-    vendor_name = vendor_names.get(vendor_id, "Unknown")
+    vendor_name = vendor_names.name(index, "Unknown")
     
-    # Get connections (neighbors in the graph)
-    neighbors = list(graph.neighbors(vendor_id))
-    total_connections = len(neighbors)
+    # Get connections (precomputed degree)
+    total_connections = int(graph.degree[index])
     
-    # Find the cartel (connected component) this vendor belongs to
-    connected_components = list(nx.connected_components(graph))
-    vendor_cartel = None
-    cartel_size = None
-    
-    for component in connected_components:
-        if vendor_id in component:
-            vendor_cartel = component
-            cartel_size = len(component)
-            break
+    # Look up the cartel (connected component) this vendor belongs to
+    cartel_size = get_cartel_size(cartel_index, vendor_id)
     
     # Is this a large cartel? (>= 3 members is suspicious per the notebook)
-    is_in_cartel = cartel_size is not None and cartel_size >= 3
+    is_in_cartel = cartel_size is not None and cartel_size >= MIN_CARTEL_SIZE
     
     # Get top connections with weights
-    top_connections = []
-    edges_with_weights = []
-    
-    for neighbor in neighbors:
-        edge_data = graph.get_edge_data(vendor_id, neighbor)
-        weight = edge_data.get("weight", 1) if edge_data else 1
-        edges_with_weights.append((neighbor, weight))
+    top_connections = get_top_connections(graph, index)
     
-    # Sort by weight (most co-bids) and take top 10
-    edges_with_weights.sort(key=lambda x: x[1], reverse=True)
-    
-    for neighbor, weight in edges_with_weights[:10]:
-        neighbor_name = vendor_names.get(neighbor, "Unknown")
-        top_connections.append(ConnectionInfo(
-            vendor_id=neighbor,
-            vendor_name=neighbor_name[:50] if neighbor_name else None,
-            connection_weight=weight
-        ))
+    # Precomputed centrality and tight community (O(1) array reads)
+    features = get_graph_features(graph)
+    vendor_features = GraphFeatureInfo(**features.for_vendor(index)) if features is not None else None
     
     # Determine risk level
-    if is_in_cartel and cartel_size >= 10:
-        risk_level = "🔴 HIGH (Large Cartel Detected)"
-    elif is_in_cartel:
-        risk_level = "🟡 MEDIUM (Cartel Member)"
-    elif total_connections > 50:
-        risk_level = "🟡 MEDIUM (Many Connections)"
-    else:
-        risk_level = "🟢 LOW (Normal Bidding Pattern)"
+    group_size = vendor_features.community_size if vendor_features is not None else cartel_size
+    risk_level = vendor_risk_level(is_in_cartel, group_size, total_connections)
     
     return BidRiggingResponse(
         vendor_id=vendor_id,
@@ -97,57 +348,184 @@ async def analyze_vendor(request: BidRiggingRequest):
         is_in_cartel=is_in_cartel,
         cartel_size=cartel_size,
         top_connections=top_connections,
-        risk_level=risk_level
+        risk_level=risk_level,
+        graph_features=vendor_features
     )
 
 
+@router.post("/analyze-batch", response_model=BidRiggingBatchResponse)
+async def analyze_vendor_batch(request: BidRiggingBatchRequest):
+    """
+    Screen all participants of a tender in one request.
+    
+    Returns each participant's cartel membership, the collusion edges between
+    the participants themselves, participants grouped by shared cartel and a
+    lot-level risk score (0-100).
+    """
+    graph, cartel_index = get_models("bid_rigging_graph", "cartel_index")
+    
+    if graph is None or cartel_index is None:
+        raise HTTPException(status_code=503, detail="Bid rigging models not loaded")
+    
+    observe_batch(len(request.vendor_ids))
+    with stage("screen"):
+        screening = screen_participants(graph, cartel_index, request.vendor_ids)
+    
+    return BidRiggingBatchResponse(lot_id=request.lot_id, **screening)
+
+
 @router.get("/network-stats")
 async def get_network_stats():
     """
     Get overall statistics about the bid rigging network.
     """
-    graph = get_model("bid_rigging_graph")
+    cartel_index = get_model("cartel_index")
     
-    if graph is None:
+    if cartel_index is None:
         raise HTTPException(status_code=503, detail="Bid rigging graph not loaded")
     
-    # Get connected components (potential cartels)
-    connected_components = list(nx.connected_components(graph))
-    large_cartels = [c for c in connected_components if len(c) >= 3]
-    
-    return {
-        "total_vendors": graph.number_of_nodes(),
-        "total_connections": graph.number_of_edges(),
-        "total_cartels": len(large_cartels),
-        "largest_cartel_size": max(len(c) for c in connected_components) if connected_components else 0
-    }
+    # Network-wide stats are precomputed when the graph is loaded
+    return dict(cartel_index["stats"])
 
 
 @router.get("/list-vendors")
-async def list_vendors(limit: int = 50, offset: int = 0):
+async def list_vendors(
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
     """
     List vendors in the network with pagination.
+    
+    Pass the returned `next_cursor` as `cursor` to get the next page. The
+    cursor points at the last vendor of the page rather than at an offset,
+    so pages neither skip nor repeat vendors when lots are ingested.
     """
-    graph = get_model("bid_rigging_graph")
-    vendor_names = get_model("vendor_names")
+    graph, vendor_names = get_models("bid_rigging_graph", "vendor_names")
     
     if graph is None or vendor_names is None:
         raise HTTPException(status_code=503, detail="Bid rigging models not loaded")
     
-    nodes = list(graph.nodes())[offset:offset + limit]
+    start = offset if cursor is None else decode_cursor(graph, cursor)
+    vendors = get_vendor_page(graph, limit, start)
     
-    vendors = []
-    for node in nodes:
-        name = vendor_names.get(node, "Unknown")
-        vendors.append({
-            "vendor_id": node,
-            "vendor_name": name[:100] if name else "Unknown",
-            "connection_count": len(list(graph.neighbors(node)))
-        })
+    total = graph.number_of_nodes()
+    next_start = start + len(vendors)
     
     return {
         "vendors": vendors,
-        "total": graph.number_of_nodes(),
+        "total": total,
         "limit": limit,
-        "offset": offset
+        "offset": offset,
+        "next_cursor": encode_cursor(vendors[-1]["vendor_id"]) if vendors and next_start < total else None
     }
+
+
+@router.get("/search", response_model=VendorSearchResponse)
+async def search_vendors(
+    q: str = Query(..., min_length=1, max_length=200, description="Vendor code prefix or part of a name"),
+    limit: int = Query(10, ge=1, le=100)
+):
+    """
+    Search vendors by code prefix or partial name (autocomplete).
+    
+    Ranking: exact code, exact name, name prefix, code prefix, word prefix,
+    then any substring; ties go to vendors with more connections.
+    """
+    search_index = get_model("vendor_search")
+    
+    if search_index is None:
+        raise HTTPException(status_code=503, detail="Bid rigging models not loaded")
+    
+    vendors = search_index.vendors
+    results = []
+    for index in search_index.search(q, limit):
+        name = vendors.name(index)
+        connection_count = int(search_index.degree[index])
+        results.append(VendorSearchResult(
+            vendor_id=vendors.code(index),
+            vendor_name=name[:100] if name else None,
+            connection_count=connection_count,
+            in_network=connection_count > 0
+        ))
+    
+    return VendorSearchResponse(query=q, results=results)
+
+
+@router.get("/ego-network", response_model=EgoNetworkResponse)
+async def get_ego_network(
+    vendor_id: str = Query(..., description="Center vendor code"),
+    hops: int = Query(2, ge=1, le=EGO_MAX_HOPS),
+    min_weight: int = Query(1, ge=1, description="Min co-bids for an edge to be followed"),
+    max_nodes: int = Query(200, ge=1, le=EGO_MAX_NODES),
+    max_edges: int = Query(1000, ge=0, le=EGO_MAX_EDGES)
+):
+    """
+    Get a vendor's k-hop collusion neighborhood as a compact edge list.
+    
+    Each hop keeps the strongest connections first and stops at max_nodes,
+    so hubs with thousands of connections cost no more than small vendors.
+    """
+    graph = get_model("bid_rigging_graph")
+    
+    if graph is None:
+        raise HTTPException(status_code=503, detail="Bid rigging graph not loaded")
+    
+    index = graph.node_index(vendor_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"Vendor {vendor_id} not found in network")
+    
+    with stage("bfs"):
+        ego = ego_network(graph, index, hops, max_nodes, max_edges, min_weight)
+    
+    vendors = graph.vendors
+    features = get_graph_features(graph)
+    nodes = []
+    for node, hop in zip(ego["nodes"].tolist(), ego["hops"].tolist()):
+        name = vendors.name(node)
+        community = int(features.community[node]) if features is not None else -1
+        nodes.append(EgoNetworkNode(
+            vendor_id=vendors.code(node),
+            vendor_name=name[:100] if name else None,
+            hop=hop,
+            connection_count=int(graph.degree[node]),
+            community_id=community if community >= 0 else None
+        ))
+    
+    edges = np.stack([ego["sources"], ego["targets"], ego["weights"]], axis=1).tolist()
+    
+    return EgoNetworkResponse(
+        vendor_id=vendor_id,
+        hops=hops,
+        min_weight=min_weight,
+        nodes=nodes,
+        edges=edges,
+        truncated=ego["truncated"]
+    )
+
+
+@router.post("/ingest-lots", response_model=LotIngestResponse, dependencies=[Depends(require_admin)])
+async def ingest_procurement_lots(request: LotIngestRequest):
+    """
+    Add new procurement lots to the collusion network without retraining.
+    
+    Co-bid counts are updated per vendor pair; pairs reaching the notebook's
+    threshold become edges and cartels are merged incrementally. Lots whose
+    lot_id was already ingested are skipped. Lookups keep being served from
+    the previous graph until the update is published.
+    
+    Ingested lots are kept in a journal next to the graph artifact and
+    replayed when the graph is loaded, so restarts and reloads keep them.
+    Under serve.py the supervisor then reloads the graph and replaces its
+    workers, so all of them serve the new lots.
+    
+    Requires the X-Admin-Token header (see admin.py).
+    """
+    if get_model("bid_rigging_graph") is None:
+        raise HTTPException(status_code=503, detail="Bid rigging models not loaded")
+    
+    if not request.lots:
+        raise HTTPException(status_code=400, detail="At least one lot is required")
+    
+    observe_batch(len(request.lots))
+    return LotIngestResponse(**await run_blocking(ingest_lots, request.lots))
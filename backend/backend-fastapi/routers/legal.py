@@ -2,68 +2,114 @@
 Legal Document Scanner Router.
 Uses TF-IDF + Logistic Regression to detect suspicious document language.
 """
+import codecs
+import heapq
+import os
 import re
 import string
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 
-from models.loader import get_model
-from schemas import LegalDocumentRequest, LegalDocumentResponse
+from cache import ResultCache, content_key
+from executor import EXECUTOR_KIND, run_inference
+from metrics import TimedRoute, model_call, observe_batch, stage
+from models.loader import get_model, get_models
+from schemas import (
+    LegalDocumentRequest,
+    LegalDocumentResponse,
+    LegalSection,
+    LegalSectionsResponse
+)
 
-router = APIRouter(prefix="/legal", tags=["Legal Document Scanner"])
+router = APIRouter(prefix="/legal", tags=["Legal Document Scanner"], route_class=TimedRoute)
 
+# Risk scores for repeated documents, keyed by a hash of the cleaned text.
+# With a process executor each worker keeps its own cache.
+_result_cache = ResultCache(
+    max_bytes=int(os.getenv("LEGAL_CACHE_MAX_BYTES", 16 * 1024 * 1024)),
+    ttl_seconds=float(os.getenv("LEGAL_CACHE_TTL_SECONDS", 3600))
+)
 
-def clean_text(text: str) -> str:
-    """Clean and preprocess text for analysis."""
-    text = str(text).lower()
-    text = re.sub(r'\[.*?\]', '', text)
-    text = re.sub('[%s]' % re.escape(string.punctuation), '', text)
-    text = re.sub(r'\w*\d\w*', '', text)
-    return text
+# Process executor only: pid -> cache stats each worker returned with its last result
+_worker_cache_stats = {}
 
+# Counters summed over the process workers' caches
+SUMMED_CACHE_STATS = ("entries", "bytes", "hits", "misses", "evictions", "invalidations")
 
-@router.post("/analyze", response_model=LegalDocumentResponse)
-async def analyze_document(request: LegalDocumentRequest):
+# Section scoring: overlapping windows, vectorized SECTION_BATCH_SIZE at a time
+SECTION_WINDOW_CHARS = 2000
+SECTION_OVERLAP_CHARS = 400
+SECTION_BATCH_SIZE = 256
+
+
+# Precompiled pieces of the text normalizer
+_BRACKETED = re.compile(r'\[.*?\]')
+_PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+_TOKEN_CHAR = r'[\w%s]' % re.escape(string.punctuation)
+# A run of word/punctuation characters containing a digit. Once punctuation is
+# stripped such a run becomes one word with a digit, so the whole run goes.
+# The lookbehind anchors matches at run starts, keeping the scan linear.
+_DIGIT_TOKEN = re.compile(r'(?<!%s)%s*?\d%s*+' % (_TOKEN_CHAR, _TOKEN_CHAR, _TOKEN_CHAR))
+
+
+def clean_text(text: str) -> str:
     """
-    Analyze a document for suspicious or fabricated language.
+    Clean and preprocess text for analysis.
     
-    The model uses TF-IDF vectorization and Logistic Regression to detect
-    sensationalist, urgent, or vague language common in fraudulent documents.
+    Same output as lowercasing, then removing [bracketed] spans, then
+    punctuation, then any word containing a digit, but in fewer passes.
     """
-    nlp_model = get_model("legal_nlp")
-    vectorizer = get_model("text_vectorizer")
-    
-    if nlp_model is None or vectorizer is None:
+    text = str(text).lower()
+    if '[' in text:
+        text = _BRACKETED.sub('', text)
+    return _DIGIT_TOKEN.sub('', text).translate(_PUNCTUATION_TABLE)
+
+
+def check_legal_models():
+    """Raise 503 if the NLP model or vectorizer is not loaded."""
+    if get_model("legal_nlp") is None or get_model("text_vectorizer") is None:
         raise HTTPException(
             status_code=503, 
             detail="Legal NLP model or vectorizer not loaded"
         )
+
+
+def score_texts(nlp_model, vectorizer, cleaned_texts: list[str]):
+    """
+    Score cleaned texts with one TF-IDF transform and one predict_proba call.
     
-    # Clean and vectorize the text
-    cleaned = clean_text(request.text)
-    
-    # Validate that cleaned text is not empty
-    if not cleaned or len(cleaned.strip()) == 0:
-        raise HTTPException(status_code=400, detail="Document text is empty or contains only special characters")
-    
-    vec_input = vectorizer.transform([cleaned])
-    
-    # Get prediction probability
-    risk_score = nlp_model.predict_proba(vec_input)[0][1] * 100
-    risk_score = round(risk_score, 2)
-    
-    # Determine status
+    Args:
+        nlp_model: Fitted LogisticRegression
+        vectorizer: Fitted TfidfVectorizer
+        cleaned_texts: Texts already passed through clean_text
+        
+    Returns:
+        Array of risk scores (0-100), one per text
+    """
+    with model_call("text_vectorizer", "transform"):
+        vec_input = vectorizer.transform(cleaned_texts)
+    with model_call("legal_nlp", "predict_proba"):
+        return nlp_model.predict_proba(vec_input)[:, 1] * 100
+
+
+def risk_status(risk_score: float):
+    """Map a rounded risk score to (status, is_suspicious)."""
     if risk_score > 70:
-        status = "🔴 HIGH RISK (Likely Fabricated)"
-        is_suspicious = True
-    elif risk_score > 40:
-        status = "🟡 SUSPICIOUS (Review Language)"
-        is_suspicious = True
-    else:
-        status = "🟢 SAFE (Professional Tone)"
-        is_suspicious = False
-    
-    # Get excerpt (first 100 chars)
-    excerpt = request.text[:100] + "..." if len(request.text) > 100 else request.text
+        return "🔴 HIGH RISK (Likely Fabricated)", True
+    if risk_score > 40:
+        return "🟡 SUSPICIOUS (Review Language)", True
+    return "🟢 SAFE (Professional Tone)", False
+
+
+def make_excerpt(text: str) -> str:
+    """Get the first 100 characters of a text as an excerpt."""
+    return text[:100] + "..." if len(text) > 100 else text
+
+
+def build_document_response(text: str, risk_score) -> LegalDocumentResponse:
+    """Build the response for one document from its raw text and risk score."""
+    risk_score = round(risk_score, 2)
+    status, is_suspicious = risk_status(risk_score)
+    excerpt = make_excerpt(text)
     
     return LegalDocumentResponse(
         excerpt=excerpt,
@@ -73,19 +119,271 @@ async def analyze_document(request: LegalDocumentRequest):
     )
 
 
+def is_empty(cleaned: str) -> bool:
+    """Check whether a document has no text left after cleaning."""
+    return not cleaned or len(cleaned.strip()) == 0
+
+
+def score_documents(texts: list[str]) -> list:
+    """
+    Clean and score raw document texts (runs on the inference pool).
+    
+    Args:
+        texts: Raw document texts
+        
+    Returns:
+        Risk score per document, or None for documents that are empty after cleaning
+    """
+    nlp_model, vectorizer = get_models("legal_nlp", "text_vectorizer")
+    
+    with stage("clean"):
+        cleaned_texts = [clean_text(text) for text in texts]
+    if any(is_empty(cleaned) for cleaned in cleaned_texts):
+        return [None if is_empty(cleaned) else 0.0 for cleaned in cleaned_texts]
+    
+    # Drop cached scores computed with a previous model or vectorizer
+    generation = _result_cache.bind(nlp_model, vectorizer)
+    
+    keys = [content_key(cleaned) for cleaned in cleaned_texts]
+    risk_scores = [_result_cache.get(key, generation) for key in keys]
+    
+    # Score each distinct uncached text once
+    misses = {}
+    for key, cleaned, risk_score in zip(keys, cleaned_texts, risk_scores):
+        if risk_score is None:
+            misses.setdefault(key, cleaned)
+    
+    if misses:
+        scored = dict(zip(misses, score_texts(nlp_model, vectorizer, list(misses.values()))))
+        for key, risk_score in scored.items():
+            _result_cache.put(key, risk_score, generation)
+        risk_scores = [scored[key] if risk_score is None else risk_score for key, risk_score in zip(keys, risk_scores)]
+    
+    return risk_scores
+
+
+def score_documents_with_stats(texts: list[str]) -> tuple:
+    """score_documents for process pool workers, also returning the worker's pid and cache stats."""
+    return score_documents(texts), os.getpid(), _result_cache.stats()
+
+
+async def score_requests(documents: list[LegalDocumentRequest]) -> list:
+    """Score documents on the inference pool, rejecting empty ones with 400."""
+    observe_batch(len(documents))
+    texts = [doc.text for doc in documents]
+    if EXECUTOR_KIND == "process":
+        risk_scores, pid, stats = await run_inference(score_documents_with_stats, texts)
+        _worker_cache_stats[pid] = stats
+    else:
+        risk_scores = await run_inference(score_documents, texts)
+    if any(risk_score is None for risk_score in risk_scores):
+        raise HTTPException(status_code=400, detail="Document text is empty or contains only special characters")
+    return risk_scores
+
+
+def score_sections(sections: list[str]) -> list:
+    """
+    Clean and score document sections as one sparse batch (runs on the inference pool).
+    
+    Returns:
+        Risk score per section, or None for sections that are empty after cleaning
+    """
+    nlp_model, vectorizer = get_models("legal_nlp", "text_vectorizer")
+    
+    cleaned_sections = [clean_text(section) for section in sections]
+    scored = [i for i, cleaned in enumerate(cleaned_sections) if not is_empty(cleaned)]
+    
+    risk_scores = [None] * len(sections)
+    if scored:
+        batch_scores = score_texts(nlp_model, vectorizer, [cleaned_sections[i] for i in scored])
+        for i, risk_score in zip(scored, batch_scores):
+            risk_scores[i] = risk_score
+    return risk_scores
+
+
+async def iter_stream_windows(body, window: int, overlap: int):
+    """
+    Split a streamed UTF-8 body into overlapping (start, text) windows.
+    
+    At most one window plus one incoming chunk is held in memory.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    step = window - overlap
+    buffer = ""
+    start = 0
+    
+    async for chunk in body:
+        buffer += decoder.decode(chunk)
+        while len(buffer) >= window:
+            yield start, buffer[:window]
+            buffer = buffer[step:]
+            start += step
+    
+    buffer += decoder.decode(b"", final=True)
+    if start == 0 or len(buffer) > overlap:
+        yield start, buffer
+
+
+async def rank_sections(windows, top_k: int):
+    """
+    Score windows in sparse batches, keeping only the top_k riskiest.
+    
+    Returns:
+        Tuple of (top sections sorted by risk, sections analyzed, total chars)
+    """
+    heap = []
+    batch = []
+    sections_analyzed = 0
+    total_chars = 0
+    
+    async def flush():
+        nonlocal sections_analyzed
+        observe_batch(len(batch))
+        risk_scores = await run_inference(score_sections, [text for _, text in batch])
+        for (start, text), risk_score in zip(batch, risk_scores):
+            if risk_score is None:
+                continue
+            sections_analyzed += 1
+            # Ties favour the earlier section
+            item = (risk_score, -start, start + len(text), make_excerpt(text))
+            if len(heap) < top_k:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heappushpop(heap, item)
+        batch.clear()
+    
+    async for start, text in windows:
+        total_chars = start + len(text)
+        batch.append((start, text))
+        if len(batch) >= SECTION_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+    
+    top_sections = []
+    for risk_score, neg_start, end, excerpt in sorted(heap, reverse=True):
+        risk_score = round(risk_score, 2)
+        top_sections.append(LegalSection(
+            start=-neg_start,
+            end=end,
+            excerpt=excerpt,
+            risk_score=risk_score,
+            status=risk_status(risk_score)[0]
+        ))
+    return top_sections, sections_analyzed, total_chars
+
+
+@router.post("/analyze", response_model=LegalDocumentResponse)
+async def analyze_document(request: LegalDocumentRequest):
+    """
+    Analyze a document for suspicious or fabricated language.
+    
+    The model uses TF-IDF vectorization and Logistic Regression to detect
+    sensationalist, urgent, or vague language common in fraudulent documents.
+    """
+    check_legal_models()
+    
+    risk_score = (await score_requests([request]))[0]
+    return build_document_response(request.text, risk_score)
+
+
 @router.post("/batch-analyze")
 async def batch_analyze_documents(documents: list[LegalDocumentRequest]):
     """
     Analyze multiple documents at once.
     Returns risk assessment for each document.
+    
+    All documents are vectorized into a single sparse matrix and scored
+    with one predict_proba call.
     """
-    results = []
-    for doc in documents:
-        result = await analyze_document(doc)
-        results.append(result)
+    check_legal_models()
+    
+    risk_scores = await score_requests(documents) if documents else []
+    results = [
+        build_document_response(doc.text, risk_score)
+        for doc, risk_score in zip(documents, risk_scores)
+    ]
     
     return {
         "results": results,
         "total_analyzed": len(results),
         "suspicious_count": sum(1 for r in results if r.is_suspicious)
     }
+
+
+@router.post("/analyze-sections", response_model=LegalSectionsResponse)
+async def analyze_document_sections(
+    request: Request,
+    top_k: int = Query(5, ge=1, le=50),
+    window: int = Query(SECTION_WINDOW_CHARS, ge=200, le=50000),
+    overlap: int = Query(SECTION_OVERLAP_CHARS, ge=0)
+):
+    """
+    Analyze a long document section by section.
+    
+    The request body is the raw document text (UTF-8, e.g. text/plain) and
+    is read as a stream. The text is split into overlapping windows that are
+    vectorized in sparse batches, so a single fabricated clause in a long
+    contract is not diluted by the rest of the document. Returns the top_k
+    riskiest sections with their character offsets.
+    """
+    check_legal_models()
+    
+    if overlap >= window:
+        raise HTTPException(status_code=400, detail="overlap must be smaller than window")
+    
+    windows = iter_stream_windows(request.stream(), window, overlap)
+    top_sections, sections_analyzed, total_chars = await rank_sections(windows, top_k)
+    
+    if sections_analyzed == 0:
+        raise HTTPException(status_code=400, detail="Document text is empty or contains only special characters")
+    
+    risk_score = top_sections[0].risk_score
+    status, is_suspicious = risk_status(risk_score)
+    
+    return LegalSectionsResponse(
+        total_chars=total_chars,
+        sections_analyzed=sections_analyzed,
+        risk_score=risk_score,
+        status=status,
+        is_suspicious=is_suspicious,
+        top_sections=top_sections
+    )
+
+
+def process_cache_stats() -> dict:
+    """
+    Sum the cache stats last reported by the live process pool workers.
+    
+    Workers replaced by a reload or a crash are dropped, along with their caches.
+    """
+    for pid in list(_worker_cache_stats):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            _worker_cache_stats.pop(pid, None)
+    
+    worker_stats = list(_worker_cache_stats.values())
+    stats = {name: sum(worker[name] for worker in worker_stats) for name in SUMMED_CACHE_STATS}
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        **stats,
+        "max_bytes": _result_cache.max_bytes,
+        "ttl_seconds": _result_cache.ttl_seconds,
+        "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+        "workers": len(worker_stats)
+    }
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Get hit/miss/eviction counters for the document result cache.
+    
+    With INFERENCE_EXECUTOR=process every worker has its own cache: the
+    counters are summed over the workers, as of their last scored request,
+    and max_bytes is the budget of each one.
+    """
+    if EXECUTOR_KIND == "process":
+        return process_cache_stats()
+    return _result_cache.stats()
@@ -2,9 +2,16 @@
 Welfare/Healthcare Fraud Detection Router.
 Uses Random Forest Classifier to detect ghost beneficiaries and overbilling.
 """
+import json
+
 import pandas as pd
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
+from batching import MicroBatcher
+from executor import run_inference
+from metrics import TimedRoute, model_call, observe_batch, stage
 from models.loader import get_model
 from schemas import (
     WelfareFraudRequest,
@@ -13,7 +20,7 @@ from schemas import (
     WelfareClaim
 )
 
-router = APIRouter(prefix="/welfare", tags=["Welfare Fraud Detection"])
+router = APIRouter(prefix="/welfare", tags=["Welfare Fraud Detection"], route_class=TimedRoute)
 
 # Average values from training data for comparison
 # These are approximate based on the training notebook
@@ -21,25 +28,21 @@ AVG_TOTAL_COST = 10000.0
 AVG_DURATION_DAYS = 6.0
 
 
-@router.post("/analyze", response_model=WelfareFraudResponse)
-async def analyze_claims(request: WelfareFraudRequest):
+def score_claims(claims: list[WelfareClaim]):
     """
-    Analyze welfare/healthcare claims for fraud.
+    Score a batch of claims with the Random Forest (runs on the inference pool).
     
-    The model uses Random Forest to detect ghost beneficiaries, overbilling,
-    and statistically impossible transactions.
+    Args:
+        claims: Claims to score
+        
+    Returns:
+        Tuple of (results, high_risk_count)
     """
     model = get_model("welfare_fraud")
-    if model is None:
-        raise HTTPException(status_code=503, detail="Welfare fraud model not loaded")
-    
-    # Validate that claims list is not empty
-    if not request.claims or len(request.claims) == 0:
-        raise HTTPException(status_code=400, detail="At least one claim is required for analysis")
     
     # Build DataFrame from claims
     data = []
-    for claim in request.claims:
+    for claim in claims:
         data.append({
             "Duration_Days": claim.duration_days,
             "Total_Cost": claim.total_cost,
@@ -48,18 +51,21 @@ async def analyze_claims(request: WelfareFraudRequest):
             "IPAnnualReimbursementAmt": claim.ip_annual_reimbursement_amt
         })
     
-    df = pd.DataFrame(data)
+    with stage("dataframe"):
+        df = pd.DataFrame(data)
     
     # Get predictions and probabilities
-    predictions = model.predict(df)
-    probabilities = model.predict_proba(df)[:, 1]  # Probability of fraud
+    with model_call("welfare_fraud", "predict"):
+        predictions = model.predict(df)
+    with model_call("welfare_fraud", "predict_proba"):
+        probabilities = model.predict_proba(df)[:, 1]  # Probability of fraud
     
     # Build results
     results = []
     high_risk_count = 0
     
     for i, (pred, prob) in enumerate(zip(predictions, probabilities)):
-        claim = request.claims[i]
+        claim = claims[i]
         risk_score = round(prob * 100, 2)
         
         # Determine status
@@ -93,6 +99,37 @@ async def analyze_claims(request: WelfareFraudRequest):
             reason=" | ".join(reasons)
         ))
     
+    return results, high_risk_count
+
+
+def score_single_claims(claims: list[WelfareClaim]) -> list[WelfareFraudResult]:
+    """Score independent single-claim checks as one batch."""
+    results, _ = score_claims(claims)
+    return results
+
+
+_single_batcher = MicroBatcher(score_single_claims)
+
+
+@router.post("/analyze", response_model=WelfareFraudResponse)
+async def analyze_claims(request: WelfareFraudRequest):
+    """
+    Analyze welfare/healthcare claims for fraud.
+    
+    The model uses Random Forest to detect ghost beneficiaries, overbilling,
+    and statistically impossible transactions.
+    """
+    model = get_model("welfare_fraud")
+    if model is None:
+        raise HTTPException(status_code=503, detail="Welfare fraud model not loaded")
+    
+    # Validate that claims list is not empty
+    if not request.claims or len(request.claims) == 0:
+        raise HTTPException(status_code=400, detail="At least one claim is required for analysis")
+    
+    observe_batch(len(request.claims))
+    results, high_risk_count = await run_inference(score_claims, request.claims)
+    
     return WelfareFraudResponse(
         results=results,
         total_analyzed=len(results),
@@ -100,12 +137,106 @@ async def analyze_claims(request: WelfareFraudRequest):
     )
 
 
+class RequestStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body iterator consumes the request body.
+    
+    The stock StreamingResponse listens for client disconnects on `receive`
+    while streaming, which would steal the request body messages we are
+    still reading; a disconnect surfaces as ClientDisconnect from
+    `request.stream()` instead.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_ndjson_lines(body):
+    """Yield (line_number, line) for each non-empty line of a streamed NDJSON body."""
+    buffer = b""
+    line_number = 0
+    async for chunk in body:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
+    if buffer.strip():
+        yield line_number + 1, buffer
+
+
+async def stream_claim_results(body, chunk_size: int):
+    """Score streamed claims chunk by chunk, yielding NDJSON result lines and a summary trailer."""
+    total_analyzed = 0
+    high_risk_count = 0
+    chunk = []
+    
+    async def flush():
+        nonlocal total_analyzed, high_risk_count
+        observe_batch(len(chunk))
+        results, chunk_high_risk = await run_inference(score_claims, list(chunk))
+        total_analyzed += len(results)
+        high_risk_count += chunk_high_risk
+        chunk.clear()
+        return "".join(result.model_dump_json() + "\n" for result in results)
+    
+    try:
+        async for line_number, line in iter_ndjson_lines(body):
+            try:
+                chunk.append(WelfareClaim.model_validate_json(line))
+            except ValidationError as e:
+                if chunk:
+                    yield await flush()
+                error = {"error": f"Invalid claim on line {line_number}", "detail": e.errors(include_url=False)}
+                yield json.dumps(error, default=str) + "\n"
+                return
+            
+            if len(chunk) >= chunk_size:
+                yield await flush()
+        
+        if chunk:
+            yield await flush()
+    except HTTPException as e:
+        # Headers are already sent, so surface executor backpressure as an error line
+        yield json.dumps({"error": e.detail, "status_code": e.status_code}) + "\n"
+        return
+    
+    summary = {"total_analyzed": total_analyzed, "high_risk_count": high_risk_count}
+    yield json.dumps({"summary": summary}) + "\n"
+
+
+@router.post("/analyze-stream")
+async def analyze_claims_stream(request: Request, chunk_size: int = Query(1000, ge=1, le=100000)):
+    """
+    Analyze a large batch of claims as a stream.
+    
+    The request body is newline-delimited JSON with one WelfareClaim per line.
+    Claims are scored in chunks of `chunk_size` and each WelfareFraudResult is
+    streamed back as one NDJSON line, followed by a final
+    `{"summary": {"total_analyzed": ..., "high_risk_count": ...}}` trailer line.
+    """
+    model = get_model("welfare_fraud")
+    if model is None:
+        raise HTTPException(status_code=503, detail="Welfare fraud model not loaded")
+    
+    return RequestStreamingResponse(
+        stream_claim_results(request.stream(), chunk_size),
+        media_type="application/x-ndjson"
+    )
+
+
 @router.post("/check-single")
 async def check_single_claim(claim: WelfareClaim):
     """
     Quick check for a single welfare claim.
     Returns simplified fraud assessment.
+    
+    Concurrent checks are micro-batched into one Random Forest pass.
     """
-    request = WelfareFraudRequest(claims=[claim])
-    response = await analyze_claims(request)
-    return response.results[0] if response.results else None
+    if get_model("welfare_fraud") is None:
+        raise HTTPException(status_code=503, detail="Welfare fraud model not loaded")
+    
+    return await _single_batcher.submit(claim)
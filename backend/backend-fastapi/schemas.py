@@ -2,7 +2,7 @@
 Pydantic schemas for request/response validation.
 """
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 # ============== Spending Anomaly Schemas ==============
@@ -76,6 +76,25 @@ class LegalDocumentResponse(BaseModel):
     is_suspicious: bool
 
 
+class LegalSection(BaseModel):
+    """Risk assessment for one section (window) of a long document."""
+    start: int = Field(..., description="Character offset where the section starts")
+    end: int = Field(..., description="Character offset where the section ends")
+    excerpt: str
+    risk_score: float
+    status: str
+
+
+class LegalSectionsResponse(BaseModel):
+    """Response for section-level analysis of a long document."""
+    total_chars: int
+    sections_analyzed: int
+    risk_score: float = Field(..., description="Highest section risk score")
+    status: str
+    is_suspicious: bool
+    top_sections: List[LegalSection]
+
+
 # ============== Welfare Fraud Schemas ==============
 
 class WelfareClaim(BaseModel):
@@ -123,6 +142,16 @@ class ConnectionInfo(BaseModel):
     connection_weight: int
 
 
+class GraphFeatureInfo(BaseModel):
+    """Precomputed centrality and community features of a vendor."""
+    weighted_degree: float
+    pagerank: float
+    pagerank_percentile: float
+    clustering: float
+    community_id: Optional[int]
+    community_size: Optional[int]
+
+
 class BidRiggingResponse(BaseModel):
     """Response for bid rigging analysis."""
     vendor_id: str
@@ -132,12 +161,124 @@ class BidRiggingResponse(BaseModel):
     cartel_size: Optional[int]
     top_connections: List[ConnectionInfo]
     risk_level: str
+    graph_features: Optional[GraphFeatureInfo] = None
+
+
+class BidRiggingBatchRequest(BaseModel):
+    """Request for screening a tender's participant list."""
+    vendor_ids: List[str] = Field(..., min_length=1, max_length=1000, description="Participant codes of the lot")
+    lot_id: Optional[str] = Field(None, description="Optional lot id, echoed back")
+
+
+class VendorScreeningResult(BaseModel):
+    """Cartel membership of one participant."""
+    vendor_id: str
+    vendor_name: Optional[str]
+    in_network: bool
+    total_connections: int
+    is_in_cartel: bool
+    cartel_size: Optional[int]
+    risk_level: str
+    graph_features: Optional[GraphFeatureInfo] = None
+
+
+class CollusionEdge(BaseModel):
+    """A collusion link between two participants of the same lot."""
+    vendor_a: str
+    vendor_b: str
+    connection_weight: int
+
+
+class BidRiggingBatchResponse(BaseModel):
+    """Response for screening a tender's participant list."""
+    lot_id: Optional[str]
+    vendors: List[VendorScreeningResult]
+    collusion_edges: List[CollusionEdge]
+    shared_cartels: List[List[str]]
+    lot_risk_score: float
+    lot_risk_level: str
+
+
+class VendorSearchResult(BaseModel):
+    """A vendor matching a search query."""
+    vendor_id: str
+    vendor_name: Optional[str]
+    connection_count: int
+    in_network: bool
+
+
+class VendorSearchResponse(BaseModel):
+    """Response for vendor search."""
+    query: str
+    results: List[VendorSearchResult]
+
+
+class ProcurementLot(BaseModel):
+    """A procurement lot and the vendors that bid on it."""
+    lot_id: str = Field(..., description="Procurement lot id")
+    participant_codes: List[str] = Field(..., description="Codes of the vendors that bid on the lot")
+    participant_names: Optional[Dict[str, str]] = Field(None, description="Optional participant_code -> name for new vendors")
+
+
+class LotIngestRequest(BaseModel):
+    """Request for incremental collusion graph updates."""
+    lots: List[ProcurementLot]
+
+
+class LotIngestResponse(BaseModel):
+    """Response for incremental collusion graph updates."""
+    lots_ingested: int
+    lots_skipped: int
+    pairs_counted: int
+    edges_added: int
+    edges_updated: int
+    pending_pairs: int
+    pairs_evicted: int
+    total_vendors: int
+    total_connections: int
+    total_cartels: int
+    largest_cartel_size: int
+
+
+class EgoNetworkNode(BaseModel):
+    """A vendor in an ego network."""
+    vendor_id: str
+    vendor_name: Optional[str]
+    hop: int = Field(..., description="BFS distance from the center vendor")
+    connection_count: int
+    community_id: Optional[int] = None
+
+
+class EgoNetworkResponse(BaseModel):
+    """Bounded k-hop neighborhood of a vendor, ready for rendering."""
+    vendor_id: str
+    hops: int
+    min_weight: int
+    nodes: List[EgoNetworkNode]
+    edges: List[List[int]] = Field(..., description="[source, target, weight] with source/target as positions in nodes")
+    truncated: bool = Field(..., description="True if a node or edge cap cut the network short")
 
 
 # ============== Health Check Schema ==============
 
+class ModelStatus(BaseModel):
+    """Loading state and active version of one model group."""
+    state: str = Field(..., description="pending (lazy, not requested yet), loading, ready or failed")
+    version: int = Field(..., description="Active version, incremented on every successful (re)load")
+    loaded_at: Optional[str] = Field(None, description="UTC time the active version was published")
+    load_seconds: Optional[float] = Field(None, description="Load and warmup duration of the active version")
+    reloading: bool = False
+    error: Optional[str] = Field(None, description="Error of the last failed load")
+
+
 class HealthCheckResponse(BaseModel):
     """Health check response."""
     status: str
     models_loaded: List[str]
     models_failed: List[str]
+    models: Dict[str, ModelStatus] = {}
+
+
+class ModelReloadResponse(BaseModel):
+    """Response for a hot model reload request."""
+    models: Dict[str, ModelStatus]
@@ -0,0 +1,237 @@
+"""
+Production launcher: load the models once, then fork uvicorn workers that share them.
+
+`uvicorn --workers N` starts N fresh interpreters, and each one unpickles its
+own copy of the graph, the vendor table and the forests. This launcher loads
+every model group in the parent process, freezes the garbage collector, and
+forks the workers from there, so they share the parent's memory pages.
+
+Most of the model memory is numpy buffers: the CSR graph and vendor table,
+the graph features, and the tree arrays of the forests. These buffers
+carry no reference counts, so workers read them without ever copying the
+pages. Models loaded from artifacts (python -m models.artifacts) are
+read-only memory maps, so they are also shared through the page cache across
+restarts. gc.freeze() keeps the collector from writing to the remaining
+Python objects (vectorizer vocabulary, search index names), so only the
+pages a worker actually touches get copied. Scaling to all cores costs
+close to one model footprint.
+
+The parent supervises the workers:
+    - a worker that dies is replaced
+    - SIGHUP (or an admin POST /reload on any worker) reloads the models in the parent
+      and replaces the workers one generation at a time; old workers finish
+      their in-flight requests before exiting
+    - SIGUSR1 (sent by a worker after POST /bidrigging/ingest-lots) does the
+      same for the bid rigging models only: the parent replays the lot
+      journal, so every new worker serves the ingested lots
+    - SIGTERM / SIGINT shut every worker down gracefully
+
+Run from the backend-fastapi folder:
+    python serve.py --workers 4 --port 8000
+
+With INFERENCE_EXECUTOR=process, each worker's inference processes are
+forked from it in turn: they inherit the same models and load nothing
+(see executor._init_process_worker).
+
+Metrics at /metrics are per worker. The worker that ingests lots serves
+them right away; the others do once they are replaced.
+"""
+import argparse
+import gc
+import os
+import signal
+import sys
+import threading
+import time
+import warnings
+
+import uvicorn
+
+# Read by the app to route /reload and lot ingestion reloads to this process
+SUPERVISOR_PID_ENV = "FRAUD_API_SUPERVISOR_PID"
+
+# Seconds a replaced worker gets to finish in-flight requests before SIGKILL
+GRACEFUL_TIMEOUT = 30
+
+
+def load_models(groups=None):
+    """
+    Load model groups (and missing graph features) in the parent process.
+
+    Args:
+        groups: Group names to load (default: all)
+    """
+    from models.loader import get_model_status, load_all_models, refresh_graph_features
+
+    started = time.perf_counter()
+    load_all_models(groups)
+    # Compute missing features once here rather than in every worker
+    thread = refresh_graph_features(persist=True) if groups is None or "bidrigging" in groups else None
+    if thread is not None:
+        thread.join()
+
+    failed = [group for group, status in get_model_status().items() if status["state"] != "ready"]
+    if failed:
+        print(f"⚠️ Model groups not loaded: {', '.join(failed)}")
+
+    # Move everything loaded so far out of the collector's reach, so
+    # collections in the workers do not write to the shared pages
+    gc.collect()
+    gc.freeze()
+    print(f"📦 Models loaded in the parent in {time.perf_counter() - started:.1f}s")
+
+
+def run_worker(config: uvicorn.Config, sock):
+    """Serve on the inherited socket until told to stop (runs in a forked child)."""
+    for signum in (signal.SIGHUP, signal.SIGUSR1, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+        signal.signal(signum, signal.SIG_DFL)
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    finally:
+        os._exit(0)
+
+
+class Supervisor:
+    """
+    Forks and supervises the worker processes.
+
+    Args:
+        config: uvicorn config of the workers (app already imported)
+        workers: Number of worker processes
+    """
+
+    def __init__(self, config: uvicorn.Config, workers: int):
+        self.config = config
+        self.workers = workers
+        self.sock = config.bind_socket()
+        self.children = {}
+        self.generation = 0
+        self.reload_requested = False
+        # Groups to reload on their own (SIGUSR1 after lot ingestion)
+        self.reload_groups = set()
+        self.stopping = False
+
+    def spawn(self):
+        if threading.active_count() > 1:
+            print(f"⚠️ Forking with {threading.active_count() - 1} Python thread(s) running")
+        with warnings.catch_warnings():
+            # Native allocator threads (jemalloc) trigger the generic warning; they are fork-safe
+            warnings.simplefilter("ignore", DeprecationWarning)
+            pid = os.fork()
+        if pid == 0:
+            run_worker(self.config, self.sock)
+        self.children[pid] = self.generation
+        print(f"🚀 Started worker {pid} (generation {self.generation})")
+
+    def stop_workers(self, pids: list, timeout: float = GRACEFUL_TIMEOUT):
+        """SIGTERM workers (uvicorn drains in-flight requests), then SIGKILL stragglers."""
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + timeout
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            for pid in list(remaining):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    remaining.discard(pid)
+                    self.children.pop(pid, None)
+            time.sleep(0.1)
+
+        for pid in remaining:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.children.pop(pid, None)
+
+    def reload(self, groups=None):
+        """
+        Reload models in the parent and roll the workers over to them.
+
+        Args:
+            groups: Group names to reload (default: all)
+        """
+        print(f"🔄 Reloading {', '.join(groups) if groups else 'all'} models...")
+        # Let the previous versions be collected once the old workers are gone
+        gc.unfreeze()
+        load_models(groups)
+        old = list(self.children)
+        self.generation += 1
+        for _ in range(self.workers):
+            self.spawn()
+        self.stop_workers(old)
+        print(f"✅ Workers replaced (generation {self.generation})")
+
+    def reap(self):
+        """Collect exited workers and replace the ones that were not asked to stop."""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation = self.children.pop(pid, None)
+            if generation == self.generation and not self.stopping:
+                print(f"❌ Worker {pid} exited with status {status}, restarting it")
+                self.spawn()
+
+    def run(self):
+        os.environ[SUPERVISOR_PID_ENV] = str(os.getpid())
+
+        def request_reload(signum, frame):
+            self.reload_requested = True
+
+        def request_graph_reload(signum, frame):
+            self.reload_groups.add("bidrigging")
+
+        def request_stop(signum, frame):
+            self.stopping = True
+
+        signal.signal(signal.SIGHUP, request_reload)
+        signal.signal(signal.SIGUSR1, request_graph_reload)
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload_groups.clear()
+                self.reload()
+            elif self.reload_groups:
+                groups = sorted(self.reload_groups)
+                self.reload_groups.clear()
+                self.reload(groups)
+            self.reap()
+            time.sleep(0.5)
+
+        print("👋 Stopping workers...")
+        self.stop_workers(list(self.children))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API with shared-memory workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs os.fork(); use `uvicorn main:app --workers N` on this platform")
+
+    # Already loaded models are kept by the app's startup in each worker
+    load_models()
+
+    from main import app
+
+    config = uvicorn.Config(app, host=args.host, port=args.port, log_level=args.log_level, lifespan="on")
+    Supervisor(config, args.workers).run()
@@ -0,0 +1,8 @@
+"""
+Shared test setup: make the app modules importable when pytest is run from
+the backend-fastapi folder or the repository root.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,97 @@
+"""
+Differential test of routers.legal.clean_text against the original
+three-regex normalizer it replaced.
+
+The TF-IDF vectorizer was fitted on text cleaned by the original function,
+so the precompiled version must produce exactly the same output for every
+input. Run from the backend-fastapi folder with:
+    python -m pytest tests
+"""
+import random
+import re
+import string
+
+import pytest
+
+from routers.legal import clean_text
+
+SEED = 20240917
+N_RANDOM = 50_000
+
+# Characters that exercise the tricky parts: ASCII and Unicode digits, word
+# characters glued to punctuation, brackets, case folding that changes length
+ALPHABET = (
+    list("abcXYZ019_ \t\n[]")
+    + list(string.punctuation)
+    + ["é", "ß", "İ", "٣", "²", "Ⅻ", "€", "—", "«", "»", "ї", "Є", " ", "😀"]
+)
+
+
+def reference_clean_text(text: str) -> str:
+    """The original implementation (lowercase, brackets, punctuation, digit words)."""
+    text = str(text).lower()
+    text = re.sub(r'\[.*?\]', '', text)
+    text = re.sub('[%s]' % re.escape(string.punctuation), '', text)
+    text = re.sub(r'\w*\d\w*', '', text)
+    return text
+
+
+EDGE_CASES = [
+    "",
+    " ",
+    "[]",
+    "[",
+    "]",
+    "[[nested] brackets]",
+    "[unclosed bracket 123",
+    "closed] then [open",
+    "[a][b] c [d]e",
+    "abc123",
+    "123abc",
+    "a1b2c3 plain",
+    "vendor_12 shall",
+    "4.2(b) section",
+    "1,000 units",
+    "$1,000.00!!!",
+    "co-op-2024-final",
+    "e-mail: user42@example.com",
+    "a.1.b c",
+    "ab.cd1 ef",
+    "word. 5 word",
+    "١٢٣ arabic-indic digits",
+    "x² superscript",
+    "Ⅻ roman numeral",
+    "ÉCOLE Straße İstanbul",
+    "ТОВ «БУДІНВЕСТ-2» 12/03/2021",
+    "tab\t9\tnewline\n8\n",
+    "emoji 😀1 end",
+    "non breaking 7 space",
+    "_",
+    "__1__",
+    "!!!",
+    "Pursuant to Section 4.2(b) [see annex] the Vendor_12 shall deliver 1,000 units; urgent!!! ",
+]
+
+
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_edge_cases_match_reference(text):
+    assert clean_text(text) == reference_clean_text(text)
+
+
+def test_random_corpus_matches_reference():
+    rng = random.Random(SEED)
+    mismatches = []
+    for _ in range(N_RANDOM):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+        if clean_text(text) != reference_clean_text(text):
+            mismatches.append(text)
+    assert not mismatches, f"{len(mismatches)} mismatches, first: {mismatches[0]!r}"
+
+
+def test_long_document_matches_reference():
+    text = EDGE_CASES[-1] * 2000 + "a" * 5000 + " word" * 2000
+    assert clean_text(text) == reference_clean_text(text)
+
+
+def test_non_string_input_is_converted():
+    assert clean_text(12345) == reference_clean_text(12345) == ""
@@ -0,0 +1,234 @@
+"""
+Differential tests of the CSR collusion graph against NetworkX.
+
+The bid rigging router used to answer from the NetworkX graph directly. The
+CSR engine in models/collusion_graph.py must give the same vendor analysis
+and network statistics on random graphs with many tied co-bid weights, and
+its bounded ego networks must agree with NetworkX shortest paths.
+Run from the backend-fastapi folder with:
+    python -m pytest tests
+"""
+import asyncio
+import random
+
+import networkx as nx
+import pytest
+
+import models.loader as loader
+from models.cartel_index import build_cartel_index
+from models.collusion_graph import csr_from_networkx, ego_network
+from routers.bidrigging import analyze_vendor, get_network_stats
+from schemas import BidRiggingRequest
+
+SEEDS = [7, 20240917, 31337]
+
+
+def random_collusion_graph(seed: int, n_vendors: int = 400) -> tuple:
+    """Random co-bid graph with hubs, small cartels, isolated pairs and partial names."""
+    rng = random.Random(seed)
+    codes = [f"V{rng.randrange(10**6):06d}-{i}" for i in range(n_vendors)]
+    rng.shuffle(codes)
+
+    graph = nx.Graph()
+    hubs = codes[:5]
+    for code in codes[5:]:
+        # Most vendors bid with a hub or two, some only within small groups
+        if rng.random() < 0.6:
+            for hub in rng.sample(hubs, rng.randint(1, 2)):
+                graph.add_edge(code, hub, weight=rng.randint(3, 6))
+        else:
+            other = rng.choice(codes)
+            if other != code:
+                graph.add_edge(code, other, weight=rng.randint(3, 5))
+
+    names = {}
+    for code in codes:
+        roll = rng.random()
+        if roll < 0.7:
+            names[code] = f"Vendor {code} " + "x" * rng.randint(0, 120)
+        elif roll < 0.75:
+            names[code] = ""
+    # Named vendors that never became graph nodes
+    names.update({f"N{i}": f"Named only {i}" for i in range(20)})
+    return graph, names
+
+
+def reference_analyze(graph, vendor_names: dict, vendor_id: str) -> dict:
+    """The original NetworkX /bidrigging/analyze, returning the response fields."""
+    vendor_name = vendor_names.get(vendor_id, "Unknown")
+    neighbors = list(graph.neighbors(vendor_id))
+    total_connections = len(neighbors)
+
+    cartel_size = None
+    for component in nx.connected_components(graph):
+        if vendor_id in component:
+            cartel_size = len(component)
+            break
+    is_in_cartel = cartel_size is not None and cartel_size >= 3
+
+    edges_with_weights = []
+    for neighbor in neighbors:
+        edge_data = graph.get_edge_data(vendor_id, neighbor)
+        weight = edge_data.get("weight", 1) if edge_data else 1
+        edges_with_weights.append((neighbor, weight))
+    edges_with_weights.sort(key=lambda x: x[1], reverse=True)
+
+    top_connections = []
+    for neighbor, weight in edges_with_weights[:10]:
+        neighbor_name = vendor_names.get(neighbor, "Unknown")
+        top_connections.append({
+            "vendor_id": neighbor,
+            "vendor_name": neighbor_name[:50] if neighbor_name else None,
+            "connection_weight": weight
+        })
+
+    if is_in_cartel and cartel_size >= 10:
+        risk_level = "🔴 HIGH (Large Cartel Detected)"
+    elif is_in_cartel:
+        risk_level = "🟡 MEDIUM (Cartel Member)"
+    elif total_connections > 50:
+        risk_level = "🟡 MEDIUM (Many Connections)"
+    else:
+        risk_level = "🟢 LOW (Normal Bidding Pattern)"
+
+    return {
+        "vendor_id": vendor_id,
+        "vendor_name": vendor_name[:100] if vendor_name else None,
+        "total_connections": total_connections,
+        "is_in_cartel": is_in_cartel,
+        "cartel_size": cartel_size,
+        "top_connections": top_connections,
+        "risk_level": risk_level,
+        "graph_features": None
+    }
+
+
+def reference_network_stats(graph) -> dict:
+    """The original NetworkX /bidrigging/network-stats."""
+    connected_components = list(nx.connected_components(graph))
+    return {
+        "total_vendors": graph.number_of_nodes(),
+        "total_connections": graph.number_of_edges(),
+        "total_cartels": sum(1 for c in connected_components if len(c) >= 3),
+        "largest_cartel_size": max(len(c) for c in connected_components) if connected_components else 0
+    }
+
+
+@pytest.fixture
+def published():
+    """Publish models in the loader registry for the duration of a test."""
+    saved = loader._models
+
+    def publish(**models):
+        loader._models = {**saved, **models}
+
+    yield publish
+    loader._models = saved
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_analyze_matches_networkx(seed, published):
+    nx_graph, names = random_collusion_graph(seed)
+    graph = csr_from_networkx(nx_graph, names)
+    published(bid_rigging_graph=graph, vendor_names=graph.vendors, cartel_index=build_cartel_index(graph))
+
+    for vendor_id in nx_graph.nodes():
+        response = asyncio.run(analyze_vendor(BidRiggingRequest(vendor_id=vendor_id)))
+        assert response.model_dump() == reference_analyze(nx_graph, names, vendor_id)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_network_stats_match_networkx(seed, published):
+    nx_graph, names = random_collusion_graph(seed)
+    graph = csr_from_networkx(nx_graph, names)
+    published(cartel_index=build_cartel_index(graph))
+
+    assert asyncio.run(get_network_stats()) == reference_network_stats(nx_graph)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_networkx_subset_matches(seed):
+    nx_graph, names = random_collusion_graph(seed)
+    graph = csr_from_networkx(nx_graph, names)
+
+    assert list(graph.nodes()) == list(nx_graph.nodes())
+    assert graph.number_of_edges() == nx_graph.number_of_edges()
+    for vendor_id in nx_graph.nodes():
+        assert vendor_id in graph
+        assert graph[vendor_id] == {
+            neighbor: {"weight": data["weight"]} for neighbor, data in nx_graph[vendor_id].items()
+        }
+        for neighbor in nx_graph.neighbors(vendor_id):
+            assert graph.get_edge_data(vendor_id, neighbor) == nx_graph.get_edge_data(vendor_id, neighbor)
+    for vendor_id in ["N0", "missing"]:
+        assert vendor_id not in graph
+
+
+def reference_ego(nx_graph, center: str, hops: int, min_weight: int) -> tuple:
+    """Hop distances and induced edges of the full ego network, from NetworkX."""
+    strong = nx.Graph()
+    strong.add_nodes_from(nx_graph)
+    strong.add_edges_from((a, b, data) for a, b, data in nx_graph.edges(data=True) if data["weight"] >= min_weight)
+    distances = nx.single_source_shortest_path_length(strong, center, cutoff=hops)
+    edges = {
+        frozenset((a, b)): data["weight"]
+        for a, b, data in strong.subgraph(distances).edges(data=True)
+    }
+    return distances, edges
+
+
+def ego_as_codes(graph, ego: dict) -> tuple:
+    """Ego network result as ({code: hop}, {frozenset(pair): weight}, weights in order)."""
+    codes = [graph.vendors.code(index) for index in ego["nodes"].tolist()]
+    edges = {
+        frozenset((codes[source], codes[target])): weight
+        for source, target, weight in zip(ego["sources"].tolist(), ego["targets"].tolist(), ego["weights"].tolist())
+    }
+    return dict(zip(codes, ego["hops"].tolist())), edges, ego["weights"].tolist()
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("hops,min_weight", [(1, 1), (2, 1), (3, 4), (2, 6)])
+def test_ego_network_matches_networkx(seed, hops, min_weight):
+    nx_graph, names = random_collusion_graph(seed)
+    graph = csr_from_networkx(nx_graph, names)
+
+    for center in random.Random(seed).sample(list(nx_graph.nodes()), 40):
+        distances, edges = reference_ego(nx_graph, center, hops, min_weight)
+        ego = ego_network(graph, graph.node_index(center), hops, max_nodes=10_000, max_edges=100_000,
+                          min_weight=min_weight)
+        hop_of, ego_edges, weights = ego_as_codes(graph, ego)
+
+        assert hop_of == distances
+        assert ego_edges == edges
+        assert len(weights) == len(edges)
+        assert weights == sorted(weights, reverse=True)
+        assert not ego["truncated"]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("max_nodes,max_edges", [(5, 100_000), (40, 100_000), (10_000, 15), (25, 10)])
+def test_capped_ego_network_is_a_true_subset(seed, max_nodes, max_edges):
+    nx_graph, names = random_collusion_graph(seed)
+    graph = csr_from_networkx(nx_graph, names)
+
+    for center in random.Random(seed).sample(list(nx_graph.nodes()), 40):
+        distances, edges = reference_ego(nx_graph, center, 3, 1)
+        ego = ego_network(graph, graph.node_index(center), 3, max_nodes=max_nodes, max_edges=max_edges)
+        hop_of, ego_edges, weights = ego_as_codes(graph, ego)
+
+        # Every returned vendor is at its true distance, every edge is real
+        assert len(hop_of) <= max_nodes
+        assert all(distances[code] == hop for code, hop in hop_of.items())
+        assert all(edges[pair] == weight for pair, weight in ego_edges.items())
+        assert len(ego_edges) == len(weights) <= max_edges
+        assert weights == sorted(weights, reverse=True)
+
+        # A cut is reported, and never drops a closer vendor for a farther one
+        induced = {pair: weight for pair, weight in edges.items() if pair <= hop_of.keys()}
+        cut = len(hop_of) < len(distances) or len(ego_edges) < len(induced)
+        assert ego["truncated"] == cut
+        if len(hop_of) < len(distances):
+            assert max(hop_of.values()) <= min(hop for code, hop in distances.items() if code not in hop_of)
+        if len(ego_edges) < len(induced):
+            assert min(weights) >= max(weight for pair, weight in induced.items() if pair not in ego_edges)
@@ -0,0 +1,138 @@
+"""
+Tests of the compiled forests in models/forest.py and their mmap artifacts.
+
+The flat array evaluator must score exactly like sklearn on the probe batch
+that compile_forest checks. Forests loaded from an artifact must score like
+the pickled estimator on small batches (flat arrays) and on batches above
+COMPILED_MAX_ROWS (handed off to the estimator, unpickled on first use).
+Run from the backend-fastapi folder with:
+    python -m pytest tests
+"""
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import IsolationForest, RandomForestClassifier
+
+from models.artifacts import export_forest, load_forest
+from models.forest import (
+    COMPILED_MAX_ROWS,
+    CompiledIsolationForest,
+    CompiledRandomForest,
+    compile_forest,
+    make_probe
+)
+
+SEED = 20240917
+COLUMNS = ["amount", "duration", "count", "ratio", "balance"]
+LARGE_BATCH = 4 * COMPILED_MAX_ROWS + 17
+
+
+def make_frame(n_rows: int, seed: int = SEED) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.normal(size=(n_rows, len(COLUMNS))) * [1000, 30, 5, 1, 200], columns=COLUMNS)
+
+
+@pytest.fixture(scope="module")
+def isolation_forest():
+    return IsolationForest(n_estimators=50, max_samples=256, random_state=0).fit(make_frame(2000))
+
+
+@pytest.fixture(scope="module")
+def random_forest():
+    X = make_frame(2000)
+    y = (X["amount"] + 20 * X["duration"] > 500).astype(int)
+    return RandomForestClassifier(n_estimators=30, max_depth=8, random_state=0).fit(X, y)
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"max_features": 0.6, "bootstrap": True},
+    {"max_samples": 64, "contamination": 0.05}
+])
+def test_compiled_isolation_forest_matches_sklearn(params):
+    estimator = IsolationForest(n_estimators=40, random_state=1, **params).fit(make_frame(1500))
+    probe = make_probe(estimator)
+    compiled = compile_forest(estimator)
+    assert isinstance(compiled, CompiledIsolationForest)
+
+    # The probe goes through the flat arrays in blocks the hand-off never takes
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        expected = estimator.decision_function(probe)
+    actual = np.concatenate([
+        compiled.decision_function(probe[start:start + COMPILED_MAX_ROWS])
+        for start in range(0, len(probe), COMPILED_MAX_ROWS)
+    ])
+    np.testing.assert_allclose(actual, expected, rtol=1e-7, atol=1e-9)
+    np.testing.assert_array_equal(np.where(actual < 0, -1, 1), compiled.predict(probe))
+
+
+@pytest.mark.parametrize("params", [{}, {"max_depth": 3}, {"max_features": None, "min_samples_leaf": 5}])
+def test_compiled_random_forest_matches_sklearn(params):
+    X = make_frame(1500)
+    y = np.digitize(X["amount"] + 20 * X["duration"], [-500, 500])
+    estimator = RandomForestClassifier(n_estimators=25, random_state=1, **params).fit(X, y)
+    probe = make_probe(estimator)
+    compiled = compile_forest(estimator)
+    assert isinstance(compiled, CompiledRandomForest)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        expected = estimator.predict_proba(probe)
+    actual = np.concatenate([
+        compiled.predict_proba(probe[start:start + COMPILED_MAX_ROWS])
+        for start in range(0, len(probe), COMPILED_MAX_ROWS)
+    ])
+    np.testing.assert_allclose(actual, expected, rtol=1e-7, atol=1e-9)
+
+
+def export_and_load(estimator, tmp_path, filename):
+    """Pickle an estimator, export its artifact and load it back as the loader does."""
+    joblib.dump(estimator, tmp_path / filename)
+    export_forest(estimator, tmp_path / "artifact", [tmp_path / filename])
+    return load_forest(tmp_path / "artifact", tmp_path), joblib.load(tmp_path / filename)
+
+
+@pytest.mark.parametrize("n_rows", [1, COMPILED_MAX_ROWS, LARGE_BATCH])
+def test_isolation_forest_artifact_matches_pickle(isolation_forest, tmp_path, n_rows):
+    artifact_model, pickled = export_and_load(isolation_forest, tmp_path, "spending_anomaly_model.pkl")
+    X = make_frame(n_rows, SEED + 1)
+
+    expected = pickled.decision_function(X)
+    # The spending router scores compiled models with a bare matrix
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", UserWarning)
+        actual = artifact_model.decision_function(X.to_numpy())
+        from_pickle = compile_forest(pickled).decision_function(X.to_numpy())
+
+    np.testing.assert_allclose(actual, expected, rtol=1e-7, atol=1e-9)
+    np.testing.assert_allclose(from_pickle, expected, rtol=1e-7, atol=1e-9)
+    # Only batches above COMPILED_MAX_ROWS load the sklearn estimator
+    assert (artifact_model.estimator is not None) == (n_rows > COMPILED_MAX_ROWS)
+
+
+@pytest.mark.parametrize("n_rows", [1, COMPILED_MAX_ROWS, LARGE_BATCH])
+def test_random_forest_artifact_matches_pickle(random_forest, tmp_path, n_rows):
+    artifact_model, pickled = export_and_load(random_forest, tmp_path, "fraud_detection_model.pkl")
+    X = make_frame(n_rows, SEED + 2)
+
+    expected = pickled.predict_proba(X)
+    np.testing.assert_allclose(artifact_model.predict_proba(X), expected, rtol=1e-7, atol=1e-9)
+    np.testing.assert_allclose(compile_forest(pickled).predict_proba(X), expected, rtol=1e-7, atol=1e-9)
+    np.testing.assert_array_equal(artifact_model.predict(X), pickled.predict(X))
+    assert (artifact_model.estimator is not None) == (n_rows > COMPILED_MAX_ROWS)
+
+
+def test_artifact_without_pickle_uses_flat_arrays(isolation_forest, tmp_path):
+    artifact_model, pickled = export_and_load(isolation_forest, tmp_path, "spending_anomaly_model.pkl")
+    X = make_frame(LARGE_BATCH, SEED + 3)
+    (tmp_path / "spending_anomaly_model.pkl").unlink()
+
+    artifact_model = load_forest(tmp_path / "artifact", tmp_path)
+    np.testing.assert_allclose(
+        artifact_model.decision_function(X.to_numpy()), pickled.decision_function(X), rtol=1e-7, atol=1e-9
+    )
+    assert artifact_model.estimator is None
@@ -0,0 +1,173 @@
+"""
+Differential tests of incremental lot ingestion against a full rebuild.
+
+Random lots are ingested in batches with GraphUpdater; the result must equal
+the CSR graph converted from a NetworkX graph rebuilt the way the notebook
+does (a pair becomes an edge once its co-bid count reaches THRESHOLD), and
+replaying the lot journal must rebuild the same graph.
+Run from the backend-fastapi folder with:
+    python -m pytest tests
+"""
+import itertools
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from models.cartel_index import build_cartel_index
+from models.collusion_graph import csr_from_networkx
+from models.graph_updates import THRESHOLD, GraphUpdater, LotJournal
+
+SEEDS = [3, 20240917, 4242]
+
+
+def base_graph(rng: random.Random) -> tuple:
+    """Offline graph: a few components with co-bid weights at or above the threshold."""
+    graph = nx.Graph()
+    for i in range(60):
+        for j in rng.sample(range(60), 2):
+            if i != j:
+                graph.add_edge(f"B{i}", f"B{j}", weight=rng.randint(THRESHOLD, THRESHOLD + 3))
+    names = {f"B{i}": f"Base vendor {i}" for i in range(0, 60, 2)}
+    return graph, names
+
+
+def random_lots(rng: random.Random, n_lots: int, first_id: int) -> list:
+    """Lots over a small vendor pool (so pairs repeat), with some repeated lot ids."""
+    pool = [f"B{i}" for i in range(60)] + [f"N{i}" for i in range(40)]
+    lots = []
+    for k in range(n_lots):
+        lot_id = f"L{rng.randrange(first_id, first_id + k + 1)}" if rng.random() < 0.1 else f"L{first_id + k}"
+        codes = rng.sample(pool[:25] + pool[60:75], rng.randint(2, 5))
+        if rng.random() < 0.2:
+            codes.append(codes[0])
+        names = {code: f"Name {code} {lot_id}" for code in codes if rng.random() < 0.3}
+        lots.append((lot_id, codes, names))
+    return lots
+
+
+class ReferenceGraph:
+    """Full rebuild: NetworkX graph plus co-bid counts of sub-threshold pairs."""
+
+    def __init__(self, graph, names):
+        self.graph = graph.copy()
+        self.names = dict(names)
+        self.counts = {}
+        self.seen = set()
+
+    def ingest(self, lots):
+        for lot_id, codes, names in lots:
+            if lot_id in self.seen:
+                continue
+            self.seen.add(lot_id)
+            self.names.update(names)
+            for a, b in itertools.combinations(sorted(set(map(str, codes))), 2):
+                if self.graph.has_edge(a, b):
+                    self.graph[a][b]["weight"] += 1
+                    continue
+                self.counts[a, b] = self.counts.get((a, b), 0) + 1
+                if self.counts[a, b] >= THRESHOLD:
+                    self.graph.add_edge(a, b, weight=self.counts.pop((a, b)))
+
+    def csr(self):
+        return csr_from_networkx(self.graph, self.names)
+
+
+def assert_same_graph(graph, expected):
+    """
+    Same vendors, nodes, weighted adjacency and components.
+
+    Rows must be sorted by weight, but the order among equal weights is not
+    compared: a re-weighted edge keeps its place in the CSR row, while a
+    rebuild orders ties by when NetworkX first saw the edge.
+    """
+    assert list(graph.vendors.codes) == list(expected.vendors.codes)
+    for index in range(len(expected.vendors)):
+        assert graph.vendors.name(index) == expected.vendors.name(index)
+    assert list(graph.nodes()) == list(expected.nodes())
+    np.testing.assert_array_equal(graph.indptr, expected.indptr)
+    np.testing.assert_array_equal(graph.weights, expected.weights)
+    np.testing.assert_array_equal(graph.degree, expected.degree)
+    for index in range(len(expected.vendors)):
+        row = slice(graph.indptr[index], graph.indptr[index + 1])
+        assert sorted(zip(graph.indices[row].tolist(), graph.weights[row].tolist())) == sorted(
+            zip(expected.indices[row].tolist(), expected.weights[row].tolist())
+        )
+
+    # Component labels may differ; the partition must not
+    def partition(g):
+        groups = {}
+        for index in g.node_order.tolist():
+            groups.setdefault(int(g.component[index]), set()).add(index)
+        return {frozenset(group) for group in groups.values()}
+
+    assert partition(graph) == partition(expected)
+    assert build_cartel_index(graph)["stats"] == build_cartel_index(expected)["stats"]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_ingestion_matches_full_rebuild(seed):
+    rng = random.Random(seed)
+    nx_graph, names = base_graph(rng)
+    reference = ReferenceGraph(nx_graph, names)
+    updater = GraphUpdater(csr_from_networkx(nx_graph, names))
+
+    first_id = 0
+    for _ in range(8):
+        lots = random_lots(rng, rng.randint(1, 40), first_id)
+        first_id += len(lots)
+        graph, stats = updater.ingest(lots)
+        updater.commit()
+        reference.ingest(lots)
+
+        assert stats["lots_ingested"] + stats["lots_skipped"] == len(lots)
+        assert_same_graph(graph, reference.csr())
+        assert dict(updater.pair_counts) == reference.counts
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_uncommitted_ingest_changes_nothing(seed):
+    rng = random.Random(seed)
+    nx_graph, names = base_graph(rng)
+    reference = ReferenceGraph(nx_graph, names)
+    updater = GraphUpdater(csr_from_networkx(nx_graph, names))
+
+    # A failed publish: staged but never committed
+    updater.ingest(random_lots(rng, 30, 0))
+    lots = random_lots(rng, 30, 1000)
+    graph, _ = updater.ingest(lots)
+    updater.commit()
+    reference.ingest(lots)
+    assert_same_graph(graph, reference.csr())
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_journal_replay_matches_incremental(seed, tmp_path):
+    rng = random.Random(seed)
+    nx_graph, names = base_graph(rng)
+    base = csr_from_networkx(nx_graph, names)
+    journal = LotJournal(tmp_path / "ingested_lots.jsonl", base.fingerprint())
+    updater = GraphUpdater(base, journal=journal)
+
+    first_id = 0
+    for _ in range(5):
+        lots = random_lots(rng, rng.randint(1, 40), first_id)
+        first_id += len(lots)
+        with updater.locked():
+            updater.replay()
+            updater.ingest(lots)
+            updater.record()
+        updater.commit()
+
+    replayed = GraphUpdater(base, journal=LotJournal(journal.path, base.fingerprint()))
+    replayed.replay()
+    assert_same_graph(replayed.graph, updater.graph)
+    assert replayed.seen_lots == updater.seen_lots
+    assert dict(replayed.pair_counts) == dict(updater.pair_counts)
+
+    # A journal of another base graph is ignored
+    other = GraphUpdater(base, journal=LotJournal(journal.path, "another graph"))
+    assert other.journal.stale()
+    assert other.replay() == 0
+    assert other.graph is base
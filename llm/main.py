@@ -9,11 +9,19 @@ This API provides endpoints for:
 """
 
 import os
+import hmac
+import json
+import time
+import base64
 import pickle
+import hashlib
+from collections import OrderedDict
 from typing import Optional, List
 from contextlib import asynccontextmanager
 
 import httpx
+import numpy as np
+import pandas as pd
 from fastapi import FastAPI, HTTPException, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -25,9 +33,26 @@ load_dotenv()
 # ============== Models Storage ==============
 models = {}
 
+# Co-bid graph indexed for vectorized pair lookups (see build_graph_index)
+graph_index = {}
+
+# Pooled connections to the Node auth backend (opened in lifespan)
+auth_client: Optional[httpx.AsyncClient] = None
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Load ML models on startup"""
+    """Load ML models and open the auth client on startup"""
+    global auth_client
+    
+    if AUTH_VERIFY == "local" and not JWT_SECRET:
+        raise RuntimeError("AUTH_VERIFY=local requires JWT_SECRET")
+    auth_client = httpx.AsyncClient(
+        base_url=NODE_AUTH_URL,
+        timeout=AUTH_TIMEOUT,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+    )
+    print(f"🔐 Token verification: {AUTH_VERIFY}")
+    
     print("🔄 Loading ML models...")
     
     model_files = {
@@ -52,11 +77,22 @@ async def lifespan(app: FastAPI):
         else:
             print(f"  ⚠️ Model file not found: {filename}")
     
+    if "bid_rigging" in models:
+        try:
+            graph_index.update(build_graph_index(models["bid_rigging"]))
+            print(f"  ✅ Indexed {len(graph_index['edge_keys'])} co-bid edges")
+        except Exception as e:
+            print(f"  ⚠️ Failed to index bid rigging graph: {e}")
+    
     print("✅ Models loaded successfully!")
     yield
     
     # Cleanup on shutdown
     models.clear()
+    graph_index.clear()
+    token_cache.clear()
+    profile_cache.clear()
+    await auth_client.aclose()
     print("🛑 Models unloaded")
 
 # ============== FastAPI App ==============
@@ -82,9 +118,122 @@ app.add_middleware(
 
 # ============== Auth Dependency ==============
 NODE_AUTH_URL = os.getenv("NODE_AUTH_URL", "http://localhost:5000/api")
+AUTH_TIMEOUT = float(os.getenv("AUTH_TIMEOUT", 5))
+
+# Signing key shared with the Node backend (JWT_SECRET there). When set,
+# tokens are verified locally and the auth service is not called at all.
+JWT_SECRET = os.getenv("JWT_SECRET")
+AUTH_VERIFY = os.getenv("AUTH_VERIFY", "local" if JWT_SECRET else "remote").lower()
+
+# Verified tokens are cached until the token expires, for at most AUTH_CACHE_TTL
+# seconds (so a deactivated account is rejected again within that time)
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", 300))
+
+# sha256(token) -> (user, expires_at); only touched from the event loop, so no lock
+token_cache = OrderedDict()
+
+# AUTH_VERIFY=local: user id -> (profile from /auth/me, expires_at), same size and TTL
+profile_cache = OrderedDict()
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def decode_jwt(token: str, secret: Optional[str] = None) -> dict:
+    """
+    Decode the claims of a JWT and check its expiry.
+    
+    Args:
+        token: Encoded JWT
+        secret: HS256 signing key; when given, the signature is verified too
+        
+    Returns:
+        Token claims
+        
+    Raises:
+        ValueError: If the token is malformed, wrongly signed, expired or not yet valid
+    """
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = json.loads(_b64url_decode(header_b64))
+        claims = json.loads(_b64url_decode(payload_b64))
+        signature = _b64url_decode(signature_b64)
+    except ValueError:
+        raise ValueError("Malformed token") from None
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise ValueError("Malformed token")
+    
+    if secret is not None:
+        # jsonwebtoken signs with HS256 by default
+        if header.get("alg") != "HS256":
+            raise ValueError("Unsupported token algorithm")
+        expected = hmac.new(secret.encode(), f"{header_b64}.{payload_b64}".encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(signature, expected):
+            raise ValueError("Invalid token signature")
+    
+    now = time.time()
+    if isinstance(claims.get("exp"), (int, float)) and claims["exp"] <= now:
+        raise ValueError("Token expired")
+    if isinstance(claims.get("nbf"), (int, float)) and claims["nbf"] > now:
+        raise ValueError("Token not yet valid")
+    return claims
+
+def get_cached_user(cache: OrderedDict, key) -> Optional[dict]:
+    """Get a cached user, or None if it is not cached or has expired"""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    
+    user, expires_at = entry
+    if expires_at <= time.time():
+        del cache[key]
+        return None
+    
+    cache.move_to_end(key)
+    return user
+
+def cache_user(cache: OrderedDict, key, user: dict, exp: Optional[float]):
+    """Cache a user until `exp` (at most AUTH_CACHE_TTL), evicting the least recently used over AUTH_CACHE_SIZE"""
+    expires_at = time.time() + AUTH_CACHE_TTL
+    if isinstance(exp, (int, float)):
+        expires_at = min(expires_at, exp)
+    
+    cache[key] = (user, expires_at)
+    cache.move_to_end(key)
+    while len(cache) > AUTH_CACHE_SIZE:
+        cache.popitem(last=False)
+
+async def fetch_user(token: str) -> Optional[dict]:
+    """
+    Get the user of a token from the Node.js auth backend (/auth/me).
+    
+    Raises:
+        HTTPException: 401 if the token is rejected, 503 if the backend is unreachable
+    """
+    try:
+        response = await auth_client.get(
+            "/auth/me",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+    except httpx.RequestError:
+        raise HTTPException(status_code=503, detail="Auth service unavailable")
+    
+    if response.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    return response.json().get("data", {}).get("user")
 
 async def verify_token(authorization: Optional[str] = Header(None)):
-    """Verify JWT token with Node.js auth backend"""
+    """
+    Verify JWT token locally or with the Node.js auth backend.
+    
+    With AUTH_VERIFY=local the signature and expiry are checked here. The
+    Node backend only signs the user `id` in, so the profile (email, shown
+    as analyzed_by) is fetched from /auth/me once per user and cached by id
+    for AUTH_CACHE_TTL; a deactivated account is rejected at that refresh.
+    If the auth backend is unreachable the request is served with just the
+    id (analyzed_by "unknown").
+    """
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header missing")
     
@@ -92,20 +241,41 @@ async def verify_token(authorization: Optional[str] = Header(None)):
         raise HTTPException(status_code=401, detail="Invalid authorization format")
     
     token = authorization.split(" ")[1]
+    key = hashlib.sha256(token.encode()).digest()
     
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{NODE_AUTH_URL}/auth/me",
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid or expired token")
-            
-            return response.json().get("data", {}).get("user")
-    except httpx.RequestError:
-        raise HTTPException(status_code=503, detail="Auth service unavailable")
+    user = get_cached_user(token_cache, key)
+    if user is not None:
+        return user
+    
+    if AUTH_VERIFY == "local":
+        try:
+            claims = decode_jwt(token, JWT_SECRET)
+        except ValueError:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        
+        user_id = claims.get("id")
+        user = get_cached_user(profile_cache, user_id)
+        if user is None:
+            try:
+                user = await fetch_user(token)
+            except HTTPException as e:
+                if e.status_code != 503:
+                    raise
+                user = None
+            if user and user_id is not None:
+                cache_user(profile_cache, user_id, user, None)
+            user = user or {"id": user_id}
+    else:
+        user = await fetch_user(token)
+        try:
+            # Only to read `exp`: the auth service has checked the signature
+            claims = decode_jwt(token)
+        except ValueError:
+            claims = {}
+    
+    if user:
+        cache_user(token_cache, key, user, claims.get("exp"))
+    return user
 
 # ============== Request/Response Models ==============
 class BidData(BaseModel):
@@ -142,6 +312,130 @@ class PredictionResponse(BaseModel):
     details: Optional[dict] = None
     risk_level: Optional[str] = None
 
+# ============== Bid Rigging Scoring ==============
+# Largest number of bidder pairs scored in one request (k bidders on a project make k*(k-1)/2 pairs)
+MAX_BID_PAIRS = int(os.getenv("MAX_BID_PAIRS", 5_000_000))
+
+def build_graph_index(graph) -> dict:
+    """
+    Index the co-bid graph for vectorized pair lookups.
+    
+    Args:
+        graph: NetworkX co-bid graph with `weight` (number of shared lots) on edges
+        
+    Returns:
+        Dict with node_index (vendor_id -> position), n_nodes, and the sorted
+        edge keys (low * n_nodes + high) with their co-bid weights
+    """
+    node_index = {str(node): i for i, node in enumerate(graph.nodes())}
+    n_nodes = len(node_index)
+    
+    edges = np.fromiter(
+        (
+            value
+            for u, v, weight in graph.edges(data="weight", default=1)
+            for value in (node_index[str(u)], node_index[str(v)], weight)
+        ),
+        dtype=np.int64,
+        count=3 * graph.number_of_edges()
+    ).reshape(-1, 3)
+    keys = np.minimum(edges[:, 0], edges[:, 1]) * n_nodes + np.maximum(edges[:, 0], edges[:, 1])
+    order = np.argsort(keys)
+    
+    return {
+        "node_index": node_index,
+        "n_nodes": n_nodes,
+        "edge_keys": keys[order],
+        "edge_weights": edges[order, 2]
+    }
+
+def score_bids(bids: List[BidData], index: dict, threshold: float) -> List[dict]:
+    """
+    Score each project's bidders against the co-bid graph in one vectorized pass.
+    
+    A project's collusion score is the share of its bidder pairs that are
+    linked in the graph (vendors that repeatedly bid on the same lots).
+    Vendors missing from the graph count as unlinked.
+    
+    Args:
+        bids: Submitted bids, for any number of projects
+        index: Graph index from build_graph_index
+        threshold: Collusion score at which a project is flagged
+        
+    Returns:
+        One result dict per project, highest collusion score first
+    """
+    project_codes, projects = pd.factorize(pd.Series([b.project_id for b in bids]))
+    vendor_codes, vendors = pd.factorize(pd.Series([b.vendor_id for b in bids]))
+    n_projects, n_vendors = len(projects), len(vendors)
+    node_index = index["node_index"]
+    graph_ids = np.array([node_index.get(vendor, -1) for vendor in vendors], dtype=np.int64)
+    
+    # Distinct bidders, sorted by project
+    bidder_keys = np.unique(project_codes.astype(np.int64) * n_vendors + vendor_codes)
+    bidder_project = bidder_keys // n_vendors
+    bidder_graph_id = graph_ids[bidder_keys % n_vendors]
+    bidders = np.bincount(bidder_project, minlength=n_projects)
+    possible_pairs = bidders * (bidders - 1) // 2
+    if possible_pairs.sum() > MAX_BID_PAIRS:
+        raise ValueError(f"Too many bidder pairs to score (max {MAX_BID_PAIRS})")
+    
+    # Every bidder paired with the bidders after it in the same project
+    group_end = np.repeat(np.cumsum(bidders), bidders)
+    partners = group_end - np.arange(len(bidder_keys)) - 1
+    first = np.repeat(np.arange(len(bidder_keys)), partners)
+    second = first + 1 + np.arange(len(first)) - np.repeat(np.cumsum(partners) - partners, partners)
+    pair_project = bidder_project[first]
+    a, b = bidder_graph_id[first], bidder_graph_id[second]
+    
+    # Co-bid weight of each pair (0 when not linked or a vendor is unknown)
+    edge_keys, edge_weights = index["edge_keys"], index["edge_weights"]
+    pair_weights = np.zeros(len(first), dtype=np.int64)
+    known = (a >= 0) & (b >= 0)
+    if len(edge_keys) and known.any():
+        keys = np.minimum(a[known], b[known]) * index["n_nodes"] + np.maximum(a[known], b[known])
+        positions = np.minimum(np.searchsorted(edge_keys, keys), len(edge_keys) - 1)
+        pair_weights[known] = np.where(edge_keys[positions] == keys, edge_weights[positions], 0)
+    
+    linked_pairs = np.bincount(pair_project, weights=pair_weights > 0, minlength=n_projects).astype(np.int64)
+    co_bids = np.bincount(pair_project, weights=pair_weights, minlength=n_projects).astype(np.int64)
+    known_bidders = np.bincount(bidder_project, weights=bidder_graph_id >= 0, minlength=n_projects).astype(np.int64)
+    bid_counts = np.bincount(project_codes, minlength=n_projects)
+    scores = np.divide(linked_pairs, possible_pairs, out=np.zeros(n_projects), where=possible_pairs > 0)
+    
+    # Strongest pair of each project: first pair after sorting by project, then weight descending
+    order = np.lexsort((-pair_weights, pair_project))
+    strongest = np.full(n_projects, -1)
+    pair_projects, starts = np.unique(pair_project[order], return_index=True)
+    strongest[pair_projects] = order[starts]
+    
+    vendor_names = models.get("vendor_names", {})
+    nodes = list(node_index)
+    results = []
+    for p in np.argsort(-scores, kind="stable").tolist():
+        pair = int(strongest[p])
+        strongest_pair = None
+        if pair >= 0 and pair_weights[pair] > 0:
+            pair_vendors = [nodes[bidder_graph_id[first[pair]]], nodes[bidder_graph_id[second[pair]]]]
+            strongest_pair = {
+                "vendor_ids": pair_vendors,
+                "vendor_names": [vendor_names.get(vendor) for vendor in pair_vendors],
+                "co_bids": int(pair_weights[pair])
+            }
+        results.append({
+            "project_id": projects[p],
+            "bids": int(bid_counts[p]),
+            "vendors": int(bidders[p]),
+            "known_vendors": int(known_bidders[p]),
+            "linked_pairs": int(linked_pairs[p]),
+            "possible_pairs": int(possible_pairs[p]),
+            "co_bids": int(co_bids[p]),
+            "collusion_score": round(float(scores[p]), 3),
+            "flagged": bool(linked_pairs[p] > 0 and scores[p] >= threshold),
+            "strongest_pair": strongest_pair
+        })
+    return results
+
 # ============== Health Check ==============
 @app.get("/health")
 async def health_check():
@@ -149,7 +443,10 @@ async def health_check():
     return {
         "status": "healthy",
         "models_loaded": list(models.keys()),
-        "auth_backend": NODE_AUTH_URL
+        "auth_backend": NODE_AUTH_URL,
+        "auth_verify": AUTH_VERIFY,
+        "cached_tokens": len(token_cache),
+        "cached_profiles": len(profile_cache)
     }
 
 # ============== Public Endpoints ==============
@@ -176,38 +473,38 @@ async def analyze_bid_rigging(
     """
     Analyze bids for potential bid rigging or collusion patterns.
     Requires authentication.
+    
+    Bids are grouped by project_id and each project's bidders are checked
+    against the co-bid graph; projects whose share of linked bidder pairs
+    reaches the threshold are flagged.
     """
-    if "bid_rigging" not in models:
+    if "bid_rigging" not in models or not graph_index:
         raise HTTPException(status_code=503, detail="Bid rigging model not loaded")
     
+    if not request.bids:
+        raise HTTPException(status_code=400, detail="At least one bid is required")
+    
     try:
-        # Process bids using the model
-        # This is a placeholder - adapt to your actual model
-        bid_data = [
-            {
-                "vendor": b.vendor_id,
-                "amount": b.bid_amount,
-                "project": b.project_id
-            }
-            for b in request.bids
-        ]
-        
-        # Example analysis (replace with actual model inference)
-        total_bids = len(request.bids)
-        unique_vendors = len(set(b.vendor_id for b in request.bids))
+        threshold = 0.7 if request.threshold is None else request.threshold
+        projects = score_bids(request.bids, graph_index, threshold)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        flagged = [project for project in projects if project["flagged"]]
+        max_score = max(project["collusion_score"] for project in projects)
         
-        # Simple heuristic (replace with actual model)
-        if unique_vendors < 3 and total_bids > 5:
+        if flagged:
             risk_level = "HIGH"
-            confidence = 0.85
-            prediction = "Potential collusion detected"
-        elif unique_vendors < 5:
+            confidence = max_score
+            prediction = f"Potential collusion detected in {len(flagged)} of {len(projects)} projects"
+        elif any(project["linked_pairs"] for project in projects):
             risk_level = "MEDIUM"
-            confidence = 0.65
-            prediction = "Some concentration patterns found"
+            confidence = 1 - max_score
+            prediction = "Some bidders have co-bid before"
         else:
             risk_level = "LOW"
-            confidence = 0.90
+            confidence = 1.0
             prediction = "No significant collusion patterns"
         
         return PredictionResponse(
@@ -216,8 +513,11 @@ async def analyze_bid_rigging(
             confidence=confidence,
             risk_level=risk_level,
             details={
-                "total_bids": total_bids,
-                "unique_vendors": unique_vendors,
+                "total_bids": len(request.bids),
+                "unique_vendors": len({b.vendor_id for b in request.bids}),
+                "flagged_projects": len(flagged),
+                "threshold": threshold,
+                "projects": projects,
                 "analyzed_by": user.get("email", "unknown")
             }
         )
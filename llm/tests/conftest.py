@@ -0,0 +1,14 @@
+"""
+Shared test setup: make the service module importable when pytest is run from
+the llm folder or the repository root.
+
+The module is registered as llm_main, so it does not clash with the
+backend-fastapi main.py when both test folders run in one session.
+"""
+import importlib.util
+import sys
+from pathlib import Path
+
+_spec = importlib.util.spec_from_file_location("llm_main", Path(__file__).resolve().parent.parent / "main.py")
+sys.modules["llm_main"] = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(sys.modules["llm_main"])
@@ -0,0 +1,128 @@
+"""
+Differential tests of the vectorized bid rigging scoring in main.py.
+
+/api/analyze/bid-rigging scores all projects of an upload in one vectorized
+pass. score_bids must give the same results as scoring each project's bidder
+pairs one by one against the NetworkX graph, on random uploads with repeated
+bids, vendors missing from the graph and many tied co-bid weights.
+Run from the llm folder with:
+    python -m pytest tests
+"""
+import itertools
+import random
+
+import networkx as nx
+import pytest
+
+import llm_main as main
+from llm_main import BidData, build_graph_index, score_bids
+
+SEEDS = [5, 20240917, 8675309]
+
+
+def random_graph(rng: random.Random, n_vendors: int = 300) -> nx.Graph:
+    """Random co-bid graph with a few dense clusters and tied weights."""
+    graph = nx.Graph()
+    graph.add_nodes_from(f"V{i}" for i in range(n_vendors))
+    for cluster in range(0, n_vendors, 15):
+        members = [f"V{i}" for i in range(cluster, min(cluster + 15, n_vendors))]
+        for a, b in itertools.combinations(members, 2):
+            if rng.random() < 0.3:
+                graph.add_edge(a, b, weight=rng.randint(3, 6))
+    return graph
+
+
+def random_bids(rng: random.Random, n_bids: int, n_projects: int, n_vendors: int = 300) -> list:
+    """Bids over clustered vendors, some unknown to the graph, some repeated."""
+    bids = []
+    for _ in range(n_bids):
+        project = rng.randrange(n_projects)
+        if rng.random() < 0.1:
+            vendor = f"X{rng.randrange(50)}"
+        else:
+            # Projects mostly draw from one cluster, so many pairs are linked
+            cluster = (project * 15) % n_vendors if rng.random() < 0.7 else rng.randrange(0, n_vendors, 15)
+            vendor = f"V{cluster + rng.randrange(15)}"
+        bids.append(BidData(vendor_id=vendor, bid_amount=rng.uniform(1e3, 1e6), project_id=f"P{project}"))
+    return bids
+
+
+def reference_score_bids(bids: list, graph, threshold: float) -> list:
+    """Score one project at a time, looking up each bidder pair in the NetworkX graph."""
+    vendor_names = main.models.get("vendor_names", {})
+    vendor_order = {}
+    projects = {}
+    for bid in bids:
+        vendor_order.setdefault(bid.vendor_id, len(vendor_order))
+        projects.setdefault(bid.project_id, []).append(bid)
+
+    results = []
+    for project_id, project_bids in projects.items():
+        vendors = sorted({bid.vendor_id for bid in project_bids}, key=vendor_order.get)
+        linked_pairs = co_bids = 0
+        strongest_pair = None
+        for a, b in itertools.combinations(vendors, 2):
+            weight = graph[a][b]["weight"] if graph.has_edge(a, b) else 0
+            linked_pairs += weight > 0
+            co_bids += weight
+            if weight > 0 and (strongest_pair is None or weight > strongest_pair["co_bids"]):
+                strongest_pair = {
+                    "vendor_ids": [a, b],
+                    "vendor_names": [vendor_names.get(a), vendor_names.get(b)],
+                    "co_bids": weight
+                }
+        possible_pairs = len(vendors) * (len(vendors) - 1) // 2
+        score = linked_pairs / possible_pairs if possible_pairs else 0.0
+        results.append({
+            "project_id": project_id,
+            "bids": len(project_bids),
+            "vendors": len(vendors),
+            "known_vendors": sum(vendor in graph for vendor in vendors),
+            "linked_pairs": linked_pairs,
+            "possible_pairs": possible_pairs,
+            "co_bids": co_bids,
+            "collusion_score": round(score, 3),
+            "flagged": linked_pairs > 0 and score >= threshold,
+            "strongest_pair": strongest_pair,
+            "_score": score
+        })
+
+    results.sort(key=lambda result: -result.pop("_score"))
+    return results
+
+
+@pytest.fixture
+def vendor_names(monkeypatch):
+    names = {f"V{i}": f"Vendor {i}" for i in range(0, 300, 3)}
+    monkeypatch.setitem(main.models, "vendor_names", names)
+    return names
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("n_bids,n_projects", [(1, 1), (40, 3), (2000, 400), (10_000, 2000)])
+def test_score_bids_matches_per_project_loop(seed, n_bids, n_projects, vendor_names):
+    rng = random.Random(seed)
+    graph = random_graph(rng)
+    index = build_graph_index(graph)
+    bids = random_bids(rng, n_bids, n_projects)
+
+    for threshold in [0.0, 0.3, 1.0]:
+        assert score_bids(bids, index, threshold) == reference_score_bids(bids, graph, threshold)
+
+
+def test_score_bids_without_graph_edges(vendor_names):
+    graph = nx.Graph()
+    graph.add_nodes_from(["V1", "V2"])
+    bids = [BidData(vendor_id=vendor, bid_amount=1.0, project_id="P") for vendor in ["V1", "V2", "X1"]]
+
+    assert score_bids(bids, build_graph_index(graph), 0.0) == reference_score_bids(bids, graph, 0.0)
+
+
+def test_score_bids_rejects_too_many_pairs(monkeypatch):
+    rng = random.Random(SEEDS[0])
+    index = build_graph_index(random_graph(rng))
+    bids = [BidData(vendor_id=f"V{i}", bid_amount=1.0, project_id="P") for i in range(100)]
+    monkeypatch.setattr(main, "MAX_BID_PAIRS", 100 * 99 // 2 - 1)
+
+    with pytest.raises(ValueError):
+        score_bids(bids, index, 0.5)